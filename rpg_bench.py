@@ -0,0 +1,341 @@
+"""Набор замеров скорости движка без интерфейса.
+
+Замеры воспроизводимы: каждый повтор строит состояние заново с тем же
+seed, поэтому выполняется одна и та же работа. Результат - наносекунды
+на операцию (медиана и минимум по повторам), его можно сохранить в JSON
+и сравнить с отчетом другого коммита:
+
+    python rpg_bench.py --json before.json
+    python rpg_bench.py --compare before.json --threshold 0.1
+
+Замеры:
+    simulate_turn/heroes=N     - ход мира с отрядом из N героев
+    attack/<подкласс>          - NPC.attack по манекену
+    take_damage/<подкласс>     - NPC.take_damage
+    fight/<подкласс>           - раунд NPC.fight с ответным ударом и эффектами
+    generate_content/danger=D  - Location.generate_content
+    log_event/full             - GameWorld.log_event при заполненном журнале
+    snapshot/save/heroes=N     - GameWorld.save большого мира, на одного персонажа
+    snapshot/load/heroes=N     - GameWorld.load того же снимка
+    import/<модуль>            - запуск нового интерпретатора с импортом модуля
+                                 (import/python - пустой запуск для сравнения)
+
+Размер снимка большого мира попадает в отчет (sizes) и сравнивается с
+базой по тому же порогу, что и время. Отдельно проверяется, что импорт
+модулей движка и рабочих процессов не загружает tkinter и Pillow.
+"""
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from rpg_engine import (CLASS_MAP, Event, EventKind, GameWorld, Location, Monster, MonsterType,
+                        create_character, create_party)
+
+# Здоровье манекенов: в микрозамерах боя никто не погибает
+DUMMY_HEALTH = 10 ** 9
+
+# Модули, которые импортируют рабочие процессы, и модули интерфейса
+WORKER_MODULES = ("rpg_engine", "rpg_montecarlo", "rpg_soa", "rpg_game")
+GUI_MODULES = ("tkinter", "PIL")
+
+
+def timed(setup, repeat):
+    """Повторы замера: setup() готовит состояние и возвращает run() -> число операций"""
+    samples = []
+    ops = 0
+    for _ in range(repeat):
+        run = setup()
+        gc.collect()
+        gc.disable()  # Как в timeit: сборка мусора не попадает в замер
+        try:
+            start = time.perf_counter_ns()
+            ops = run()
+            elapsed = time.perf_counter_ns() - start
+        finally:
+            gc.enable()
+        samples.append(elapsed / ops)
+    return ops, samples
+
+
+# ---------- Замеры ----------
+def turn_bench(heroes, turns, seed):
+    def setup():
+        world = GameWorld(seed=seed, event_log_capacity=1000)
+        world.add_multiple_npcs(create_party(heroes, rng=world.spawn_rng("party")))
+        world.start_simulation()
+
+        def run():
+            for _ in range(turns):
+                world.simulate_turn()
+            return turns
+        return run
+    return setup
+
+
+def combat_bench(operation, class_name, subclass, count, seed):
+    def setup():
+        world = GameWorld(seed=seed, event_log_capacity=1)
+        rng = random.Random(f"{seed}:{subclass}")
+        hero = create_character(class_name, subclass, subclass, rng)
+        monster = Monster("Манекен", MonsterType.ORC, 10, rng)
+        for entity in (hero, monster):
+            entity.refresh_stats()
+            entity.health = entity.max_health = DUMMY_HEALTH
+            world.effects.bind(entity)
+        hero.state = "fighting"
+        hero.target = monster
+
+        if operation == "attack":
+            def run():
+                for _ in range(count):
+                    hero.attack(monster)
+                return count
+        elif operation == "take_damage":
+            def run():
+                for _ in range(count):
+                    hero.take_damage(25)
+                return count
+        else:
+            # Раунд боя вместе со срабатыванием эффектов, как в ходе мира
+            def run():
+                tick = world.effects.tick
+                for _ in range(count):
+                    hero.fight(world)
+                    tick()
+                return count
+        return run
+    return setup
+
+
+def content_bench(danger_level, count, seed):
+    def setup():
+        rng = random.Random(f"{seed}:content:{danger_level}")
+        locations = [Location(f"Замер {i}", danger_level, rng, populate=False) for i in range(count)]
+
+        def run():
+            for location in locations:
+                location.generate_content()
+            return count
+        return run
+    return setup
+
+
+def log_bench(capacity, count, seed):
+    def setup():
+        world = GameWorld(seed=seed, event_log_capacity=capacity)
+        event = Event(EventKind.OMEN, effect="Замер")
+        for _ in range(capacity):
+            world.log_event(event)
+
+        def run():
+            log_event = world.log_event
+            for _ in range(count):
+                log_event(event)
+            return count
+        return run
+    return setup
+
+
+def snapshot_benches(heroes, seed, sizes):
+    """Сохранение и загрузка снимка мира с heroes героями и монстрами в каждой
+    локации; мир строится один раз на оба замера, размер файла пишется в sizes"""
+    fd, path = tempfile.mkstemp(suffix=".rpgw")
+    os.close(fd)
+    atexit.register(os.remove, path)
+    name = f"heroes={heroes}"
+    cache = []
+
+    def build():
+        if not cache:
+            world = GameWorld(seed=seed, event_log_capacity=1000)
+            world.generate_locations(heroes // 5)
+            for location in world.locations:
+                location.generate_content()
+            world.add_multiple_npcs(create_party(heroes, rng=world.spawn_rng("party")))
+            world.start_simulation()
+            for _ in range(5):
+                world.simulate_turn()
+            world.save(path)
+            sizes[f"snapshot/{name}"] = os.path.getsize(path)
+            cache.append((world, len(world.entities())))
+        return cache[0]
+
+    def save_setup():
+        world, count = build()
+
+        def run():
+            world.save(path)
+            return count
+        return run
+
+    def load_setup():
+        _, count = build()
+
+        def run():
+            GameWorld.load(path)
+            return count
+        return run
+    return [(f"snapshot/save/{name}", save_setup), (f"snapshot/load/{name}", load_setup)]
+
+
+def python_command(code):
+    """Новый интерпретатор в каталоге движка, без влияния текущего процесса"""
+    return [sys.executable, "-c", code], os.path.dirname(os.path.abspath(__file__))
+
+
+def import_bench(module, count):
+    def setup():
+        command, cwd = python_command(f"import {module}" if module else "pass")
+
+        def run():
+            for _ in range(count):
+                subprocess.run(command, cwd=cwd, check=True)
+            return count
+        return run
+    return setup
+
+
+def gui_modules_loaded(module):
+    """Модули интерфейса, которые тянет за собой импорт module"""
+    command, cwd = python_command(
+        f"import sys, {module}; print(' '.join(m for m in {GUI_MODULES!r} if m in sys.modules))")
+    output = subprocess.run(command, cwd=cwd, check=True, capture_output=True, text=True).stdout
+    return output.split()
+
+
+def collect(party_sizes=(1, 10, 100, 1000), turns=200, combat_ops=20000, content_ops=2000,
+            log_ops=200000, import_ops=10, snapshot_heroes=20000, sizes=None, seed=0):
+    """Все замеры набора: список пар (имя, setup); размеры файлов - в sizes"""
+    benches = [(f"simulate_turn/heroes={size}", turn_bench(size, turns, seed)) for size in party_sizes]
+    subclasses = [(class_name, subclass, cls.__name__) for class_name, group in CLASS_MAP.items()
+                  for subclass, cls in group.items()]
+    for operation in ("attack", "take_damage", "fight"):
+        for class_name, subclass, name in subclasses:
+            benches.append((f"{operation}/{name}", combat_bench(operation, class_name, subclass,
+                                                                 combat_ops, seed)))
+    for danger_level in range(1, 6):
+        benches.append((f"generate_content/danger={danger_level}",
+                        content_bench(danger_level, content_ops, seed)))
+    benches.append(("log_event/full", log_bench(1000, log_ops, seed)))
+    if snapshot_heroes:
+        benches.extend(snapshot_benches(snapshot_heroes, seed, {} if sizes is None else sizes))
+    benches.append(("import/python", import_bench(None, import_ops)))
+    for module in WORKER_MODULES:
+        benches.append((f"import/{module}", import_bench(module, import_ops)))
+    return benches
+
+
+def run_suite(benches, repeat=5, only=None):
+    results = {}
+    for name, setup in benches:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        ops, samples = timed(setup, repeat)
+        results[name] = {
+            "ops": ops,
+            "median_ns": statistics.median(samples),
+            "min_ns": min(samples),
+            "samples_ns": samples
+        }
+    return results
+
+
+def compare(results, baseline, threshold, sizes=None):
+    """Отношение медиан и размеров к базовому отчету; рост больше threshold - регрессия"""
+    rows = []
+    for name, row in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = row["median_ns"] / old["median_ns"]
+        rows.append((name, ratio, ratio > 1 + threshold))
+    for name, size in (sizes or {}).items():
+        old = baseline.get("sizes", {}).get(name)
+        if old:
+            ratio = size / old
+            rows.append((name, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_report(report, comparison=None):
+    ratios = {name: (ratio, regressed) for name, ratio, regressed in comparison or ()}
+    print(f"{'Замер':<34}{'нс/оп':>14}{'мин':>14}" + (f"{'к базе':>10}" if comparison else ""))
+    for name, row in report["results"].items():
+        line = f"{name:<34}{row['median_ns']:>14.0f}{row['min_ns']:>14.0f}"
+        if name in ratios:
+            ratio, regressed = ratios[name]
+            line += f"{ratio:>9.2f}x" + (" !" if regressed else "")
+        print(line)
+    for name, size in report["sizes"].items():
+        line = f"{name:<34}{size / 2 ** 20:>11.1f} МБ"
+        if name in ratios:
+            ratio, regressed = ratios[name]
+            line += f"{'':>14}{ratio:>9.2f}x" + (" !" if regressed else "")
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры скорости движка")
+    parser.add_argument("--seed", type=int, default=0, help="seed всех замеров")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--turns", type=int, default=200, help="ходов в замере simulate_turn")
+    parser.add_argument("--party", type=int, nargs="+", default=[1, 10, 100, 1000],
+                        help="размеры отряда для simulate_turn")
+    parser.add_argument("--ops", type=int, default=20000, help="операций в микрозамерах боя")
+    parser.add_argument("--snapshot-heroes", type=int, default=20000,
+                        help="героев в мире для замеров снимка (0 - без них)")
+    parser.add_argument("--only", nargs="+", help="только замеры, в имени которых есть подстрока")
+    parser.add_argument("--json", help="сохранить отчет в JSON")
+    parser.add_argument("--compare", help="базовый отчет JSON для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="допустимое замедление относительно базы (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    sizes = {}
+    benches = collect(tuple(args.party), args.turns, args.ops, snapshot_heroes=args.snapshot_heroes,
+                      sizes=sizes, seed=args.seed)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "seed": args.seed,
+            "repeat": args.repeat
+        },
+        "results": run_suite(benches, args.repeat, args.only),
+        "sizes": sizes,
+        "gui_imports": {module: gui_modules_loaded(module) for module in WORKER_MODULES}
+    }
+
+    comparison = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            comparison = compare(report["results"], json.load(f), args.threshold, sizes)
+    print_report(report, comparison)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for module, loaded in report["gui_imports"].items():
+        if loaded:
+            print(f"Импорт {module} загружает модули интерфейса: {', '.join(loaded)}")
+    regressions = [name for name, _, regressed in comparison or () if regressed]
+    if regressions:
+        print(f"Регрессии (медленнее или больше более чем на {args.threshold:.0%}): "
+              f"{', '.join(regressions)}")
+    if regressions or any(report["gui_imports"].values()):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
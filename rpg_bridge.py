@@ -0,0 +1,119 @@
+"""Мост между потоком симуляции и главным циклом интерфейса.
+
+Поток симуляции публикует неизменяемые снимки мира и пачки событий в
+ограниченную очередь, а интерфейс забирает их с фиксированной частотой
+кадров. Если интерфейс не успевает, ходы склеиваются: события копятся
+у производителя, а в очередь уходит только последний снимок.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+
+class SimulationBridge:
+    def __init__(self, maxsize=4, max_pending_events=1000):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.published_seq = 0
+        self.pending_events = deque(maxlen=max_pending_events)
+
+    def publish(self, world):
+        """Вызывается в потоке симуляции после каждого хода"""
+        events = world.event_log.events_since(self.published_seq)
+        if events:
+            self.published_seq = events[-1][0]
+            self.pending_events.extend(events)
+
+        if self.queue.full():
+            return False
+        try:
+            self.queue.put_nowait((world.snapshot(), list(self.pending_events)))
+        except queue.Full:
+            return False
+        self.pending_events.clear()
+        return True
+
+    def drain(self):
+        """Вызывается в главном потоке: последний снимок и все новые события"""
+        snapshot = None
+        events = []
+        while True:
+            try:
+                snapshot, batch = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            events.extend(batch)
+        return snapshot, events
+
+    def reset(self, seq=0):
+        """Сброс перед новым запуском симуляции"""
+        self.drain()
+        self.pending_events.clear()
+        self.published_seq = seq
+
+
+class TurnScheduler:
+    """Темп ходов симуляции, не связанный с частотой кадров интерфейса.
+
+    rate - ходов в секунду; None означает "без ограничений".
+    """
+
+    def __init__(self, rate=1.0):
+        self.rate = rate
+        self._next = None
+        self._wakeup = threading.Event()
+
+    def set_rate(self, rate):
+        self.rate = rate
+        self._next = None
+        self._wakeup.set()
+
+    def wake(self):
+        """Прервать ожидание, например при остановке симуляции"""
+        self._wakeup.set()
+
+    def wait(self):
+        """Пауза до следующего хода с учетом времени, ушедшего на сам ход"""
+        if self.rate is None:
+            self._next = None
+            return
+
+        interval = 1.0 / self.rate
+        now = time.perf_counter()
+        # После долгого хода не пытаемся догонять отставание пачкой ходов
+        if self._next is None or now - self._next > interval:
+            self._next = now
+        self._next += interval
+
+        delay = self._next - now
+        if delay > 0:
+            self._wakeup.clear()
+            self._wakeup.wait(delay)
+
+
+class RateMeter:
+    """Скользящая оценка ходов в секунду по счетчику ходов"""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.rate = 0.0
+        self._last_count = None
+        self._last_time = None
+
+    def reset(self):
+        """Новый отсчет, например после загрузки мира с другим счетчиком ходов"""
+        self.rate = 0.0
+        self._last_count = None
+        self._last_time = None
+
+    def update(self, count, now=None):
+        now = time.perf_counter() if now is None else now
+        if self._last_time is None or count < self._last_count:
+            self._last_count, self._last_time = count, now
+            return self.rate
+
+        elapsed = now - self._last_time
+        if elapsed >= self.window:
+            self.rate = (count - self._last_count) / elapsed
+            self._last_count, self._last_time = count, now
+        return self.rate
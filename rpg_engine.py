@@ -0,0 +1,2337 @@
+import random
+import itertools
+import copy
+import gc
+import heapq
+import io
+import json
+import os
+import pickle
+import struct
+import zlib
+from array import array
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from enum import Enum
+import time
+import argparse
+
+
+# ========== БАЗОВЫЕ КЛАССЫ ==========
+class StatusEffect(Enum):
+    POISONED = "Отравление"
+    BURNING = "Горение"
+    FROZEN = "Заморозка"
+    BLESSED = "Благословение"
+    REGENERATION = "Регенерация"
+    SHIELDED = "Щит"
+    STUNNED = "Оглушение"
+
+
+class SpellType(Enum):
+    FIREBALL = "Огненный шар"
+    ICE_SHACKLES = "Оковы льда"
+    HEAL = "Исцеление"
+    LIGHTNING = "Молния"
+    HOLY_LIGHT = "Священный свет"
+    POISON_CLOUD = "Ядовитое облако"
+    SHIELD = "Магический щит"
+    STUN = "Оглушение"
+
+
+class ArtifactType(Enum):
+    WEAPON = "Оружие"
+    ARMOR = "Броня"
+    POTION = "Зелье"
+    SCROLL = "Свиток"
+    RING = "Кольцо"
+    AMULET = "Амулет"
+    RELIC = "Реліквія"
+    TOME = "Том"
+
+
+class MonsterType(Enum):
+    GOBLIN = "Гоблин"
+    ORC = "Орк"
+    TROLL = "Тролль"
+    DRAGON = "Дракон"
+    UNDEAD = "Нежить"
+    DEMON = "Демон"
+    ELEMENTAL = "Элементаль"
+
+
+class Artifact:
+    __slots__ = ("name", "type", "power", "bonus_type")
+
+    def __init__(self, name, artifact_type, power, bonus_type):
+        self.name = name
+        self.type = artifact_type
+        self.power = power
+        self.bonus_type = bonus_type
+
+    def __str__(self):
+        return f"{self.type.value}: {self.name} ({self.bonus_type} +{self.power})"
+
+# ========== СОБЫТИЯ ==========
+class EventKind(Enum):
+    """Вид события: категория для окраски и шаблон текста"""
+    SYSTEM = ("system", "{effect}")
+    OMEN = ("default", "{effect}")
+    JOIN = ("default", "К партии присоединяется {actor.name} ({effect})")
+    EXP = ("level", "{actor.name} получает {amount} опыта.")
+    LEVEL_UP = ("level", "{actor.name} достигает {amount} уровня!")
+    STATUS_ADDED = ("status", "{actor.name} получает эффект '{effect.value}' ({amount} ходов)")
+    STATUS_EXPIRED = ("status", "Эффект '{effect.value}' на {actor.name} рассеивается")
+    POISON_TICK = ("status", "{actor.name} страдает от отравления")
+    BURN_TICK = ("status", "{actor.name} горит!")
+    REGEN_TICK = ("heal", "{actor.name} восстанавливается благодаря регенерации")
+    SHIELD_TICK = ("status", "{actor.name} защищен магическим щитом")
+    STUN_TICK = ("status", "{actor.name} оглушен и пропускает ход")
+    DEFEATED = ("death", "{actor.name} повержен!")
+    DAMAGE = ("combat", "{actor.name} теряет {amount} здоровья. Осталось: {extra} HP")
+    HEAL = ("heal", "{actor.name} восстанавливает {amount} здоровья.")
+    STUNNED_ATTACK = ("status", "{actor.name} оглушен и не может атаковать!")
+    ATTACK = ("combat", "{actor.name} атакует {target.name} ({amount} урона): {detail}")
+    CRIT_ATTACK = ("combat", "{actor.name} атакует {target.name} (Критический удар! {amount} урона): {detail}")
+    POWER_ATTACK = ("combat", "{actor.name} мощно атакует {target.name}: {detail}")
+    RAGE_ATTACK = ("combat", "{actor.name} впадает в ярость! {detail}")
+    BACKSTAB = ("combat", "{actor.name} бьёт в спину: {detail}")
+    QUICK_ATTACK = ("combat", "{actor.name} атакует {target.name}: {detail}")
+    POISON_STRIKE = ("combat", "{detail} и отравляет {target.name}")
+    SHOT = ("combat", "{actor.name} стреляет в {target.name} ({amount} урона): {detail}")
+    CRIT_SHOT = ("combat", "{actor.name} стреляет в {target.name} (Критический выстрел! {amount} урона): {detail}")
+    HEADSHOT = ("death", "{actor.name} убивает {target.name} одним точным выстрелом!")
+    MONSTER_ATTACK = ("monster", "{actor.name} использует {effect}! {detail}")
+    SPELL_UNKNOWN = ("spell", "{actor.name} не знает это заклинание")
+    SPELL_STUNNED = ("spell", "{actor.name} оглушен и не может кастовать!")
+    SPELL_NOT_IMPLEMENTED = ("spell", "Заклинание не реализовано")
+    NO_MANA = ("spell", "Недостаточно маны")
+    CAST = ("spell", "{actor.name} кастует {effect.value}")
+    CAST_DAMAGE = ("spell", "{actor.name} кастует {effect.value}. {target.name} получает {amount} урона!")
+    CAST_FREEZE = ("spell", "{actor.name} кастует {effect.value}. {target.name} заморожен!")
+    LIGHTNING = ("spell", "{actor.name} поражает {target.name} молнией ({amount} урона)")
+    MAGIC_SHIELD = ("spell", "{actor.name} создает магический щит")
+    POISON_CLOUD = ("spell", "{actor.name} создает ядовитое облако вокруг {target.name}")
+    HEAL_SPELL = ("heal", "{actor.name} исцеляет {target.name}: {detail}")
+    SELF_HEAL_SPELL = ("heal", "{actor.name} исцеляет себя: {detail}")
+    BANISH = ("spell", "{actor.name} изгоняет нечисть: {detail}")
+    HOLY_LIGHT_MISS = ("spell", "{actor.name} излучает священный свет, но ничего не происходит")
+    STUN = ("spell", "{actor.name} оглушает {target.name}")
+    HOLY_FIRE = ("spell", "{actor.name} сжигает нежить священным огнем: {amount} урона")
+    FIREBALL = ("spell", "{actor.name} метает огненный шар: {amount} урона")
+    ICE_REGEN = ("spell", "{actor.name} сковывает {target.name} льдом и дает регенерацию")
+    POISON_ARROW = ("spell", "{actor.name} стреляет отравленной стрелой в {target.name}")
+    POISON_BOMB = ("spell", "{actor.name} бросает ядовитую бомбу в {target.name}")
+    BLAST = ("spell", "{actor.name} бросает взрывную смесь: {amount} урона")
+    BARRIER = ("spell", "{actor.name} создает защитный барьер вокруг {target.name}")
+    SELF_BARRIER = ("spell", "{actor.name} создает защитный барьер")
+    DIE = ("death", "{actor.name} умирает!")
+    EXPLORE = ("default", "{actor.name} исследует {effect}")
+    FIND_ARTIFACT = ("loot", "{actor.name} находит {effect}!")
+    ENCOUNTER = ("monster", "{actor.name} встречает {target.name} и готовится к бою!")
+    FIND_GOLD = ("loot", "{actor.name} находит {amount} золота!")
+    VICTORY = ("combat", "{actor.name} побеждает {target.name}!")
+    LOOT_GOLD = ("loot", "{actor.name} забирает {amount} золота у {target.name}")
+    KILLED = ("death", "{actor.name} был убит {target.name}!")
+    USE_POTION = ("heal", "{actor.name} использует {effect}!")
+    REST_FLAVOR = ("default", "{actor.name} {effect}")
+    RESUME = ("default", "{actor.name} возобновляет исследование.")
+    DECIDE_REST = ("default", "{actor.name} решает отдохнуть.")
+    TAKE_BREAK = ("default", "{actor.name} решает сделать перерыв.")
+    CONTINUE = ("default", "{actor.name} решает продолжить исследование.")
+    CANNOT_EQUIP = ("default", "{effect.name} нельзя экипировать")
+    EQUIP = ("loot", "{actor.name} экипирует {effect.name}")
+    SELL = ("loot", "{actor.name} продает {effect.name} за {amount} золота")
+    BREW = ("loot", "{actor.name} создает {effect.name} во время отдыха")
+    SPAWN = ("monster", "В локации {effect} появился {target.name}")
+
+    def __init__(self, category, template):
+        self.category = category
+        self.template = template
+
+
+class Event:
+    """Запись о событии. Текст собирается только при выводе через str()"""
+    __slots__ = ("kind", "actor", "target", "actor_id", "target_id", "amount", "effect", "extra", "detail")
+
+    def __init__(self, kind, actor=None, target=None, amount=None, effect=None, extra=None, detail=None):
+        self.kind = kind
+        self.actor = actor
+        self.target = target
+        # id на момент события: возрожденный монстр получает новый
+        self.actor_id = actor.id if actor is not None else None
+        self.target_id = target.id if target is not None else None
+        self.amount = amount
+        self.effect = effect
+        self.extra = extra
+        self.detail = detail
+
+    @property
+    def category(self):
+        return self.kind.category
+
+    def __str__(self):
+        return self.kind.template.format(
+            actor=self.actor, target=self.target, amount=self.amount,
+            effect=self.effect, extra=self.extra, detail=self.detail
+        )
+
+    def __repr__(self):
+        return f"Event({self.kind.name}, {self})"
+
+    def to_dict(self):
+        """Плоская запись события для хроники (JSON/CSV), пустые поля опускаются"""
+        record = {"kind": self.kind.name, "category": self.kind.category}
+        if self.actor is not None:
+            record["actor_id"] = self.actor_id
+            record["actor"] = self.actor.name
+        if self.target is not None:
+            record["target_id"] = self.target_id
+            record["target"] = self.target.name
+        if self.amount is not None:
+            record["amount"] = self.amount
+        if self.effect is not None:
+            record["effect"] = _plain(self.effect)
+        if self.extra is not None:
+            record["extra"] = _plain(self.extra)
+        if self.detail is not None:
+            record["detail"] = _plain(self.detail)
+        record["text"] = str(self)
+        return record
+
+
+def _plain(value):
+    """Значение поля события в виде, пригодном для JSON"""
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+REST_FLAVORS = (
+    "размышляет о жизни...",
+    "чистит свое снаряжение",
+    "перекусывает"
+)
+
+WORLD_OMENS = (
+    "Над миром проносится странный ветер...",
+    "Где-то вдалеке слышен странный шум",
+    "Небо на мгновение становится красным",
+    "Земля слегка дрожит под ногами",
+    "В воздухе ощущается магическая энергия"
+)
+
+
+# ========== ИГРОВЫЕ ДАННЫЕ ==========
+# Встроенные значения таблиц. Ключи - имена перечислений, поэтому тот же
+# формат читается из JSON/TOML: load_game_data() накладывает файл поверх
+# этих значений, а переменная окружения RPG_DATA задает файл при импорте.
+DEFAULT_GAME_DATA = {
+    "artifact_names": {
+        "WEAPON": ["Меч", "Топор", "Кинжал", "Посох", "Лук", "Молот"],
+        "ARMOR": ["Доспех", "Щит", "Шлем", "Перчатки", "Сапоги"],
+        "POTION": ["Зелье здоровья", "Зелье маны", "Яд", "Эликсир"],
+        "SCROLL": ["Свиток огня", "Свиток льда", "Свиток молнии"],
+        "RING": ["Кольцо силы", "Кольцо защиты", "Кольцо магии"],
+        "AMULET": ["Амулет здоровья", "Амулет маны", "Амулет защиты"],
+        "RELIC": ["Реліквія древних", "Священный артефакт"],
+        "TOME": ["Том знаний", "Гримуар"]
+    },
+    # choose - наложить один случайный эффект из списка вместо всех
+    "monster_attacks": {
+        "DRAGON": {"name": "Огненное дыхание", "damage": 50},
+        "UNDEAD": {"name": "Проклятие", "damage": 30, "statuses": [["POISONED", 3]]},
+        "DEMON": {"name": "Адское пламя", "damage": 40, "statuses": [["BURNING", 2]]},
+        "TROLL": {"name": "Мощный удар", "damage": 35},
+        "GOBLIN": {"name": "Грязный трюк", "damage": 20},
+        "ORC": {"name": "Берсеркерская ярость", "damage": 30},
+        "ELEMENTAL": {"name": "Стихийный удар", "damage": 45,
+                      "statuses": [["FROZEN", 2], ["BURNING", 2]], "choose": True}
+    },
+    # Заклинания по классам; подкласс наследует записи родителя. cost - мана,
+    # damage/heal - базовые значения, statuses - эффекты на получателя,
+    # self_status - эффект на себя, only - типы монстров, по которым
+    # заклинание действует, undead_mult - повторный удар по нежити,
+    # stun_blocks - оглушение срывает заклинание. targeting: target - только
+    # по цели, self - на себя, target_or_self - на себя, если цели нет.
+    # event/self_event/miss_event/bonus_event - виды событий результата.
+    "spells": {
+        "Mage": {
+            "FIREBALL": {"cost": 20, "damage": 25, "statuses": [["BURNING", 3]], "stun_blocks": True,
+                         "event": "CAST_DAMAGE"},
+            "ICE_SHACKLES": {"cost": 20, "statuses": [["FROZEN", 2]], "stun_blocks": True,
+                             "event": "CAST_FREEZE"}
+        },
+        "Archmage": {
+            "LIGHTNING": {"cost": 30, "damage": 40, "event": "LIGHTNING"},
+            "SHIELD": {"cost": 25, "self_status": ["SHIELDED", 3], "targeting": "self",
+                       "event": "MAGIC_SHIELD"}
+        },
+        "Necromancer": {"POISON_CLOUD": {"cost": 35, "statuses": [["POISONED", 4]], "event": "POISON_CLOUD"}},
+        "Paladin": {
+            "HEAL": {"heal": 30, "event": "HEAL_SPELL"},
+            "HOLY_LIGHT": {"damage": 50, "only": ["UNDEAD"], "event": "BANISH", "miss_event": "HOLY_LIGHT_MISS"}
+        },
+        "Shadowdancer": {"STUN": {"statuses": [["STUNNED", 2]], "event": "STUN"}},
+        "Priest": {
+            "HEAL": {"cost": 25, "heal": 40, "targeting": "target_or_self",
+                     "event": "HEAL_SPELL", "self_event": "SELF_HEAL_SPELL"},
+            "HOLY_LIGHT": {"cost": 40, "damage": 35, "only": ["UNDEAD", "DEMON"],
+                           "event": "BANISH", "miss_event": "HOLY_LIGHT_MISS"}
+        },
+        "Inquisitor": {"FIREBALL": {"cost": 30, "damage": 30, "undead_mult": 1.5,
+                                    "event": "FIREBALL", "bonus_event": "HOLY_FIRE"}},
+        "Druid": {"ICE_SHACKLES": {"cost": 25, "statuses": [["FROZEN", 2], ["REGENERATION", 3]],
+                                   "event": "ICE_REGEN"}},
+        "Ranger": {"POISON_CLOUD": {"statuses": [["POISONED", 4]], "event": "POISON_ARROW"}},
+        "Alchemist": {"POISON_CLOUD": {"statuses": [["POISONED", 5]], "event": "POISON_BOMB"}},
+        "Bomber": {"FIREBALL": {"damage": 40, "statuses": [["BURNING", 3]], "event": "BLAST"}},
+        "Transmuter": {"SHIELD": {"statuses": [["SHIELDED", 4]], "targeting": "target_or_self",
+                                  "event": "BARRIER", "self_event": "SELF_BARRIER"}}
+    },
+    # Заклинания, которые класс знает и применяет в бою: полный список,
+    # класс без своей записи берет ближайшую по MRO. Заклинания из spells,
+    # заданные самому классу или его предкам ниже этой записи, добавляются
+    # к списку. Известное заклинание без записи в spells тратит ход впустую.
+    "known_spells": {
+        "Mage": ["FIREBALL", "ICE_SHACKLES"],
+        "Archmage": ["FIREBALL", "ICE_SHACKLES", "LIGHTNING", "SHIELD"],
+        "Necromancer": ["FIREBALL", "ICE_SHACKLES", "POISON_CLOUD"],
+        "Paladin": ["HEAL", "HOLY_LIGHT"],
+        "Assassin": ["POISON_CLOUD"],
+        "Shadowdancer": ["STUN"],
+        "Priest": ["HEAL", "HOLY_LIGHT"],
+        "Inquisitor": ["HEAL", "HOLY_LIGHT", "FIREBALL"],
+        "Druid": ["HEAL", "HOLY_LIGHT", "ICE_SHACKLES"],
+        "Ranger": ["POISON_CLOUD"],
+        "Alchemist": ["POISON_CLOUD"],
+        "Bomber": ["POISON_CLOUD", "FIREBALL"],
+        "Transmuter": ["HEAL", "SHIELD"]
+    }
+}
+
+BONUS_TYPES = ("HP", "Мана", "Урон", "Защита", "Крит", "Скорость", "Регенерация")
+ARTIFACT_TYPES = tuple(ArtifactType)
+MONSTER_TYPES = tuple(MonsterType)
+UNKNOWN_ARTIFACT_NAMES = ("Таинственный предмет",)
+
+MonsterAttack = namedtuple("MonsterAttack", "name damage statuses choose")
+DEFAULT_MONSTER_ATTACK = MonsterAttack("Атака", 25, (), False)
+
+SpellDef = namedtuple(
+    "SpellDef",
+    "cost damage heal statuses self_status only undead_mult stun_blocks "
+    "targeting event self_event miss_event bonus_event",
+    defaults=(0, 0, 0, (), None, None, 0.0, False, "target", EventKind.CAST, None, None, None)
+)
+SPELL_TARGETING = ("target", "self", "target_or_self")
+SPELL_EVENTS = ("event", "self_event", "miss_event", "bonus_event")
+
+# Разобранные таблицы для горячего пути. load_game_data() обновляет их на
+# месте, поэтому ссылки из других модулей остаются действительными.
+GAME_DATA = {}
+ARTIFACT_NAMES = {}   # ArtifactType -> кортеж названий
+MONSTER_ATTACKS = {}  # MonsterType -> MonsterAttack
+SPELLS = {}           # (имя класса, SpellType) -> SpellDef
+SPELL_LISTS = {}      # Имя класса -> кортеж SpellType из known_spells
+_SPELL_CACHE = {}     # (класс, SpellType) -> SpellDef с учетом наследования
+_KNOWN_SPELLS = {}    # Класс -> кортеж известных ему заклинаний
+
+
+def _enum_member(enum, name):
+    try:
+        return enum[name]
+    except KeyError:
+        raise ValueError(f"Неизвестное значение {enum.__name__} в данных игры: {name}") from None
+
+
+def _merge_data(base, override):
+    """Рекурсивное наложение словаря override на base"""
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge_data(base[key], value)
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+
+def _read_data(path):
+    if path.lower().endswith(".toml"):
+        # Импорт по требованию: парсер TOML заметно удлиняет запуск рабочих процессов
+        try:
+            import tomllib  # Python 3.11+
+        except ImportError:
+            raise RuntimeError("Для данных в TOML нужен Python 3.11+") from None
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _parse_statuses(entries):
+    return tuple((_enum_member(StatusEffect, effect), duration) for effect, duration in entries)
+
+
+def load_game_data(source=None):
+    """Загрузка таблиц: встроенные значения, поверх них - файл JSON/TOML или словарь"""
+    data = copy.deepcopy(DEFAULT_GAME_DATA)
+    if source:
+        _merge_data(data, _read_data(source) if isinstance(source, str) else source)
+
+    artifact_names = {
+        _enum_member(ArtifactType, name): tuple(names)
+        for name, names in data["artifact_names"].items()
+    }
+    monster_attacks = {
+        _enum_member(MonsterType, name): MonsterAttack(
+            attack["name"], attack["damage"], _parse_statuses(attack.get("statuses", ())),
+            attack.get("choose", False))
+        for name, attack in data["monster_attacks"].items()
+    }
+    spells = {}
+    for class_name, class_spells in data["spells"].items():
+        for spell_name, entry in class_spells.items():
+            profile = dict(entry)
+            if "statuses" in profile:
+                profile["statuses"] = _parse_statuses(profile["statuses"])
+            if "self_status" in profile:
+                effect, duration = profile["self_status"]
+                profile["self_status"] = (_enum_member(StatusEffect, effect), duration)
+            if "only" in profile:
+                profile["only"] = tuple(_enum_member(MonsterType, name) for name in profile["only"])
+            for field in SPELL_EVENTS:
+                if field in profile:
+                    profile[field] = _enum_member(EventKind, profile[field])
+            if profile.get("targeting", "target") not in SPELL_TARGETING:
+                raise ValueError(f"Неизвестный способ выбора цели: {profile['targeting']}")
+            try:
+                spells[class_name, _enum_member(SpellType, spell_name)] = SpellDef(**profile)
+            except TypeError:
+                raise ValueError(f"Неизвестные поля заклинания {class_name}.{spell_name}: "
+                                 f"{sorted(set(profile) - set(SpellDef._fields))}") from None
+    spell_lists = {
+        class_name: tuple(_enum_member(SpellType, name) for name in names)
+        for class_name, names in data["known_spells"].items()
+    }
+
+    # Таблицы заменяются только после успешного разбора всего файла
+    GAME_DATA.clear()
+    GAME_DATA.update(data)
+    ARTIFACT_NAMES.clear()
+    ARTIFACT_NAMES.update(artifact_names)
+    MONSTER_ATTACKS.clear()
+    MONSTER_ATTACKS.update(monster_attacks)
+    SPELLS.clear()
+    SPELLS.update(spells)
+    SPELL_LISTS.clear()
+    SPELL_LISTS.update(spell_lists)
+    _SPELL_CACHE.clear()
+    _KNOWN_SPELLS.clear()
+    return data
+
+
+def spell_for(cls, spell):
+    """Заклинание класса с учетом наследования; поиск по MRO один раз на пару"""
+    key = (cls, spell)
+    if key not in _SPELL_CACHE:
+        _SPELL_CACHE[key] = next(
+            (SPELLS[name, spell] for name in (klass.__name__ for klass in cls.__mro__)
+             if (name, spell) in SPELLS), None)
+    return _SPELL_CACHE[key]
+
+
+def known_spells_for(cls):
+    """Известные заклинания: ближайший список known_spells и записи spells ниже него"""
+    known = _KNOWN_SPELLS.get(cls)
+    if known is None:
+        spells = {}
+        names = []
+        for klass in cls.__mro__:
+            names.append(klass.__name__)
+            listed = SPELL_LISTS.get(klass.__name__)
+            if listed is not None:
+                spells = dict.fromkeys(listed)
+                break
+        for name in reversed(names):
+            for class_name, spell in SPELLS:
+                if class_name == name:
+                    spells.setdefault(spell)
+        known = _KNOWN_SPELLS[cls] = tuple(spells)
+    return known
+
+
+def dump_game_data(path):
+    """Текущие таблицы в JSON - заготовка для правок без изменения кода"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(GAME_DATA, f, ensure_ascii=False, indent=2)
+
+
+def apply_statuses(target, statuses):
+    for effect, duration in statuses:
+        target.add_status(effect, duration)
+
+
+load_game_data(os.environ.get("RPG_DATA"))
+
+# ========== ИНВЕНТАРЬ ==========
+# Слоты экипировки по типу предмета; остальные типы лежат в сумке
+EQUIP_SLOTS = {
+    ArtifactType.WEAPON: "weapon",
+    ArtifactType.ARMOR: "armor",
+    ArtifactType.RING: "ring",
+    ArtifactType.AMULET: "amulet",
+    ArtifactType.RELIC: "relic"
+}
+BUCKET_CAPACITY = 10  # Предметов одного типа в сумке
+SELL_PRICE = 2  # Золота за единицу силы проданного предмета
+
+
+def sell_price(item):
+    return item.power * SELL_PRICE
+
+
+class Inventory:
+    """Сумка героя: отдельный список на каждый ArtifactType.
+
+    Корзины создаются при первом предмете своего типа, поэтому пустой
+    инвентарь (например, у монстров) почти ничего не стоит. Когда корзина
+    переполнена, add() возвращает самый слабый предмет - его продают.
+    """
+    __slots__ = ("capacity", "buckets")
+
+    def __init__(self, capacity=BUCKET_CAPACITY):
+        self.capacity = capacity
+        self.buckets = {}
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def __iter__(self):
+        for bucket in self.buckets.values():
+            yield from bucket
+
+    def bucket(self, artifact_type):
+        """Предметы одного типа без копирования; пустой кортеж, если их нет"""
+        return self.buckets.get(artifact_type, ())
+
+    def add(self, item):
+        """Положить предмет; возвращает вытесненный предмет или None"""
+        bucket = self.buckets.setdefault(item.type, [])
+        bucket.append(item)
+        if len(bucket) <= self.capacity:
+            return None
+        weakest = min(range(len(bucket)), key=lambda i: bucket[i].power)
+        return self.pop(item.type, weakest)
+
+    def pop(self, artifact_type, index):
+        """Извлечь предмет по номеру в корзине за O(1): на его место встает последний"""
+        bucket = self.buckets[artifact_type]
+        item = bucket[index]
+        last = bucket.pop()
+        if index < len(bucket):
+            bucket[index] = last
+        return item
+
+    def remove(self, item):
+        bucket = self.buckets.get(item.type, [])
+        for i, stored in enumerate(bucket):
+            if stored is item:
+                return self.pop(item.type, i)
+        raise ValueError(f"Предмета нет в инвентаре: {item}")
+
+
+# ========== ХАРАКТЕРИСТИКИ ==========
+class SlotTable:
+    """Маленькая таблица с постоянным набором ключей в __slots__.
+
+    Заменяет словари бонусов и экипировки: у каждого персонажа их по
+    несколько, а объект без __dict__ в несколько раз меньше словаря.
+    Доступ по ключу и items()/values() - как у словаря.
+    """
+    __slots__ = ()
+    default = None
+
+    def __init__(self, values=()):
+        for key in self.__slots__:
+            setattr(self, key, self.default)
+        for key, value in dict(values).items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())})"
+
+    def keys(self):
+        return self.__slots__
+
+    def values(self):
+        return [getattr(self, key) for key in self.__slots__]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def copy(self):
+        table = object.__new__(type(self))
+        for key in self.__slots__:
+            setattr(table, key, getattr(self, key))
+        return table
+
+
+class Stats(SlotTable):
+    """Бонусы характеристик: ключи из BONUS_TYPES"""
+    __slots__ = BONUS_TYPES
+    default = 0
+
+
+class Equipment(SlotTable):
+    """Слоты экипировки: предмет или None"""
+    __slots__ = tuple(EQUIP_SLOTS.values())
+
+
+# ========== КЛАССЫ ПЕРСОНАЖЕЙ ==========
+class NPC:
+    # Без __dict__: поля перечислены здесь, подклассы добавляют только свои
+    __slots__ = (
+        "id", "name", "rng", "health", "max_health", "level", "experience", "inventory",
+        "status_effects", "effects", "is_alive", "current_location", "equipment", "gold",
+        "state", "target", "base_bonuses", "modifiers", "bonuses", "stats_dirty",
+        "known_spells", "kills"
+    )
+    _ids = itertools.count(1)
+
+    def __init__(self, name, rng=None):
+        self.id = next(NPC._ids)
+        self.name = name
+        self.rng = rng or random  # Собственный поток случайных чисел
+        self.health = 100
+        self.max_health = 100
+        self.level = 1
+        self.experience = 0
+        self.inventory = Inventory()
+        self.status_effects = {}  # Эффект -> ход планировщика, после которого он истекает
+        self.effects = None  # Планировщик эффектов мира (StatusScheduler)
+        self.is_alive = True
+        self.current_location = None
+        self.equipment = Equipment()
+        self.gold = self.rng.randint(0, 50)
+        self.state = "exploring"
+        self.target = None
+        # Характеристики: бонусы класса, экипировка и временные модификаторы
+        # хранятся раздельно, а итог в bonuses пересчитывается только при их
+        # изменении, поэтому в бою это обычное чтение слота
+        self.base_bonuses = Stats()
+        self.modifiers = {}  # Ключ -> {характеристика: прибавка}
+        # До первого пересчета итог совпадает с бонусами класса: общий объект,
+        # refresh_stats() заменяет его новым, а монстрам пересчет не нужен
+        self.bonuses = self.base_bonuses
+        self.stats_dirty = True  # Конструкторы подклассов еще меняют base_bonuses
+        self.known_spells = known_spells_for(type(self))  # Общий кортеж класса из SPELLS
+        self.kills = 0
+
+    @staticmethod
+    def _default_state():
+        """Поля нового персонажа, которые не нужно хранить в снимке"""
+        return {
+            "level": 1,
+            "experience": 0,
+            "inventory": None,  # Заменяется новым Inventory в __setstate__
+            "status_effects": {},
+            "effects": None,
+            "is_alive": True,
+            "current_location": None,
+            "equipment": Equipment(),
+            "state": "exploring",
+            "target": None,
+            "base_bonuses": Stats(),
+            "modifiers": {},
+            "bonuses": Stats(),
+            "stats_dirty": False,
+            "kills": 0
+        }
+
+    def __getstate__(self):
+        # Персонажей мира GameWorld.save пишет таблицей (_pack_entities), сюда
+        # попадают только персонажи вне мира, например чужая цель.
+        # В снимок попадают только поля, отличные от значений по умолчанию.
+        # Глобальный модуль random не сериализуется, сохраняем только свои потоки.
+        defaults = NPC_DEFAULTS
+        state = {}
+        for key in _slot_names(type(self)):
+            if key == "known_spells":
+                continue  # Выводится из таблицы SPELLS по классу
+            value = getattr(self, key)
+            if key not in defaults or value != defaults[key]:
+                state[key] = value
+        if state["rng"] is random:
+            state["rng"] = None
+        return state
+
+    def __setstate__(self, state):
+        for key, value in NPC_DEFAULTS.items():
+            setattr(self, key, value)
+        self.inventory = Inventory()
+        self.status_effects = {}
+        self.equipment = Equipment()
+        self.base_bonuses = Stats()
+        self.modifiers = {}
+        self.bonuses = self.base_bonuses
+        for key, value in state.items():
+            setattr(self, key, value)
+        self.known_spells = known_spells_for(type(self))
+        self.rng = self.rng or random
+
+    def refresh_stats(self):
+        """Пересчет итоговых бонусов: класс + экипировка + модификаторы"""
+        totals = self.base_bonuses.copy()
+        for item in self.equipment.values():
+            if item:
+                totals[item.bonus_type] += item.power
+        for stats in self.modifiers.values():
+            for stat, amount in stats.items():
+                totals[stat] += amount
+        self.bonuses = totals
+        self.stats_dirty = False
+
+    def invalidate_stats(self):
+        """Пометка после прямой правки base_bonuses или equipment; пересчет - в начале хода"""
+        self.stats_dirty = True
+
+    def set_modifier(self, key, stats):
+        """Временный модификатор характеристик, например {"Урон": 5}"""
+        self.modifiers[key] = dict(stats)
+        self.refresh_stats()
+
+    def clear_modifier(self, key):
+        if self.modifiers.pop(key, None) is not None:
+            self.refresh_stats()
+
+    def join_party(self):
+        return Event(EventKind.JOIN, self, effect=self.__class__.__name__)
+
+    def gain_exp(self, amount):
+        self.experience += amount
+        if self.experience >= 100 * self.level:
+            return self.level_up()
+        return Event(EventKind.EXP, self, amount=amount)
+
+    def level_up(self):
+        self.level += 1
+        self.max_health += 20 + self.bonuses.HP
+        self.health = self.max_health
+        self.experience = 0
+        return Event(EventKind.LEVEL_UP, self, amount=self.level)
+
+    def add_status(self, effect: StatusEffect, duration: int):
+        if self.effects is not None:
+            self.effects.schedule(self, effect, duration)
+        else:
+            self.status_effects[effect] = duration  # Вне мира хранится длительность, см. StatusScheduler.bind
+        return Event(EventKind.STATUS_ADDED, self, amount=duration, effect=effect)
+
+    def status_durations(self):
+        """Оставшееся число срабатываний каждого эффекта"""
+        if self.effects is None:
+            return dict(self.status_effects)
+        return self.effects.remaining(self)
+
+    def set_statuses(self, durations):
+        """Замена всех эффектов: {эффект: оставшееся число срабатываний}"""
+        self.status_effects = {}
+        for effect, duration in durations.items():
+            self.add_status(effect, duration)
+
+    def take_damage(self, damage):
+        armor_defense = self.equipment.armor.power if self.equipment.armor else 0
+        actual_damage = max(1, damage - (armor_defense // 2 + self.bonuses.Защита))
+
+        if StatusEffect.SHIELDED in self.status_effects:
+            actual_damage = max(0, actual_damage - 10)
+
+        self.health = max(0, self.health - actual_damage)
+        if self.health == 0:
+            self.die()
+            return Event(EventKind.DEFEATED, self)
+        return Event(EventKind.DAMAGE, self, amount=actual_damage, extra=self.health)
+
+    def heal(self, amount):
+        heal_amount = min(self.max_health - self.health, amount + self.bonuses.HP // 2)
+        self.health += heal_amount
+        return Event(EventKind.HEAL, self, amount=heal_amount)
+
+    def attack(self, target):
+        """Базовый метод атаки"""
+        if StatusEffect.STUNNED in self.status_effects:
+            return Event(EventKind.STUNNED_ATTACK, self)
+
+        weapon_power = self.equipment.weapon.power if self.equipment.weapon else 0
+        base_damage = self.rng.randint(5 + weapon_power, 10 + weapon_power * 2)
+
+        # Учет критического урона
+        crit_chance = self.bonuses.Крит / 100
+        if self.rng.random() < crit_chance:
+            base_damage *= 2
+            kind = EventKind.CRIT_ATTACK
+        else:
+            kind = EventKind.ATTACK
+
+        total_damage = base_damage + self.bonuses.Урон
+        result = target.take_damage(total_damage)
+        return Event(kind, self, target, amount=base_damage, detail=result)
+
+    def cast_spell(self, spell: SpellType, target=None):
+        """Применение заклинания по таблице SPELLS: одна проверка вместо цепочки переопределений"""
+        if spell not in self.known_spells:
+            return Event(EventKind.SPELL_UNKNOWN, self, effect=spell)
+        spec = spell_for(type(self), spell)
+        missing = spec is None or (target is None and spec.targeting == "target")
+        if (missing or spec.stun_blocks) and StatusEffect.STUNNED in self.status_effects:
+            return Event(EventKind.SPELL_STUNNED, self, effect=spell)
+        if missing:
+            return Event(EventKind.SPELL_NOT_IMPLEMENTED, self, effect=spell)
+
+        if spec.cost:
+            # У классов без маны (Warrior, Rogue...) платные заклинания из данных не срабатывают
+            if getattr(self, "mana", 0) < spec.cost:
+                return Event(EventKind.NO_MANA, self, effect=spell)
+            self.mana -= spec.cost
+
+        kind = spec.event
+        if spec.targeting == "self" or target is None:
+            recipient = self
+            kind = spec.self_event or kind
+        else:
+            recipient = target
+
+        if spec.only is not None and not (isinstance(recipient, Monster) and recipient.monster_type in spec.only):
+            return Event(spec.miss_event, self, effect=spell)
+
+        amount = result = None
+        if spec.damage:
+            amount = spec.damage + self.bonuses.Урон
+            result = recipient.take_damage(amount)
+            if spec.undead_mult and isinstance(recipient, Monster) and recipient.monster_type == MonsterType.UNDEAD:
+                amount *= spec.undead_mult
+                result = recipient.take_damage(amount)
+                kind = spec.bonus_event
+        if spec.heal:
+            result = recipient.heal(spec.heal + self.bonuses.HP)
+        apply_statuses(recipient, spec.statuses)
+        if spec.self_status:
+            self.add_status(*spec.self_status)
+
+        return Event(kind, self, None if recipient is self else recipient,
+                     amount=amount, effect=spell, detail=result)
+
+    def move_to(self, location):
+        """Переход в локацию с обновлением индексов присутствия"""
+        if self.current_location is not None:
+            self.current_location.leave(self)
+        self.current_location = location
+        if location is not None:
+            location.enter(self)
+
+    def die(self):
+        self.is_alive = False
+        self.state = "dead"
+        if self.current_location is not None:
+            self.current_location.leave(self)
+        return Event(EventKind.DIE, self)
+
+    def explore(self, world):
+        if not self.is_alive:
+            return []
+
+        events = []
+        # Переход в соседнюю локацию; дешевые дороги выбираются чаще
+        if self.current_location is None:
+            self.move_to(self.rng.choice(world.locations))
+        else:
+            self.move_to(self.current_location.choose_next(self.rng))
+        events.append(Event(EventKind.EXPLORE, self, effect=self.current_location.name))
+
+        # Локация пополняется к приходу героя
+        for monster in self.current_location.update(world.turn_count):
+            events.append(Event(EventKind.SPAWN, target=monster, effect=self.current_location.name))
+
+        # Поиск артефактов
+        artifact = self.current_location.get_artifact()
+        if artifact:
+            events.append(Event(EventKind.FIND_ARTIFACT, self, effect=artifact))
+            events.extend(self.pick_up(artifact))
+
+        # Встреча с монстром
+        if self.rng.random() < self.current_location.danger_level * 0.3:
+            monster = self.current_location.get_monster()
+            if monster:
+                world.effects.bind(monster)
+                self.state = "fighting"
+                self.target = monster
+                events.append(Event(EventKind.ENCOUNTER, self, monster))
+
+        # Шанс найти золото
+        if self.rng.random() < 0.3:
+            gold_found = self.rng.randint(1, 20) * self.current_location.danger_level
+            self.gold += gold_found
+            events.append(Event(EventKind.FIND_GOLD, self, amount=gold_found))
+
+        return events
+
+    def fight(self, world):
+        if not self.is_alive or not self.target or not self.target.is_alive:
+            self.state = "exploring"
+            self.target = None
+            return []
+
+        events = []
+
+        # Атака цели
+        if self.known_spells and self.rng.random() < 0.5:
+            spell = self.rng.choice(self.known_spells)
+            events.append(self.cast_spell(spell, self.target))
+        else:
+            events.append(self.attack(self.target))
+
+        # Если цель мертва
+        if not self.target.is_alive:
+            world.bury(self.target)
+            events.extend(self.claim_victory())
+
+        # Ответный удар
+        elif self.rng.random() < 0.8 and self.target.is_alive:
+            if isinstance(self.target, Monster):
+                events.append(self.target.special_attack(self))
+            else:
+                events.append(self.target.attack(self))
+
+            if not self.is_alive:
+                events.append(Event(EventKind.KILLED, self, self.target))
+                if isinstance(self.target, NPC):
+                    self.target.gain_exp(self.rng.randint(15, 25))
+                    self.target.gold += self.gold // 2
+                    events.append(Event(EventKind.LOOT_GOLD, self.target, self, amount=self.gold // 2))
+
+        return events
+
+    def claim_victory(self):
+        """Награда за цель, павшую от удара или от эффектов"""
+        target = self.target
+        self.kills += 1
+        exp_gain = self.rng.randint(10, 30) * target.power // 10
+        events = [Event(EventKind.VICTORY, self, target), self.gain_exp(exp_gain)]
+        self.gold += target.gold
+        events.append(Event(EventKind.LOOT_GOLD, self, target, amount=target.gold))
+        self.state = "exploring"
+        self.target = None
+        return events
+
+    def rest(self):
+        if not self.is_alive:
+            return []
+
+        events = []
+        heal_amount = self.rng.randint(5, 15) + self.bonuses.Регенерация
+        events.append(self.heal(heal_amount))
+
+        # Использование зелий
+        potions = self.inventory.bucket(ArtifactType.POTION)
+        if potions and self.health < self.max_health * 0.5:
+            potion = self.inventory.pop(ArtifactType.POTION, self.rng.randrange(len(potions)))
+            heal_amount = potion.power * 5
+            events.append(Event(EventKind.USE_POTION, self, effect=potion.name))
+            events.append(self.heal(heal_amount))
+
+        # Случайное событие во время отдыха
+        if self.rng.random() < 0.2:
+            events.append(Event(EventKind.REST_FLAVOR, self, effect=self.rng.choice(REST_FLAVORS)))
+
+        # Возвращение к исследованию
+        if self.health > self.max_health * 0.7 or self.rng.random() < 0.5:
+            self.state = "exploring"
+            events.append(Event(EventKind.RESUME, self))
+
+        return events
+
+    def update(self, world):
+        if not self.is_alive:
+            return []
+
+        events = []
+        if self.stats_dirty:
+            self.refresh_stats()
+
+        # Выбор действия в зависимости от состояния
+        if self.state == "exploring":
+            events.extend(self.explore(world))
+        elif self.state == "fighting":
+            events.extend(self.fight(world))
+        elif self.state == "resting":
+            events.extend(self.rest())
+
+        # Проверка необходимости отдыха
+        if self.health < self.max_health * 0.4 and self.state != "fighting":
+            self.state = "resting"
+            events.append(Event(EventKind.DECIDE_REST, self))
+
+        # Случайная смена состояния
+        if self.rng.random() < 0.1:
+            if self.state == "exploring":
+                self.state = "resting"
+                events.append(Event(EventKind.TAKE_BREAK, self))
+            elif self.state == "resting":
+                self.state = "exploring"
+                events.append(Event(EventKind.CONTINUE, self))
+
+        return events
+
+    def equip_artifact(self, artifact):
+        """Надеть предмет из сумки или только что найденный; снятый уходит в сумку"""
+        slot = EQUIP_SLOTS.get(artifact.type)
+        if slot is None:
+            return Event(EventKind.CANNOT_EQUIP, self, effect=artifact)
+
+        old_item = self.equipment[slot]
+        if artifact in self.inventory.bucket(artifact.type):
+            self.inventory.remove(artifact)
+        self.equipment[slot] = artifact
+        self.refresh_stats()
+        if old_item:
+            self.store(old_item)
+        return Event(EventKind.EQUIP, self, effect=artifact)
+
+    def pick_up(self, artifact):
+        """Автоэкипировка: более сильный предмет надевается, худший продается.
+
+        Прочие предметы ложатся в сумку, а при переполнении корзины
+        продается самый слабый. Возвращает события.
+        """
+        slot = EQUIP_SLOTS.get(artifact.type)
+        if slot is None:
+            return self.store(artifact)
+        current = self.equipment[slot]
+        if current is not None and current.power >= artifact.power:
+            return [self.sell(artifact)]
+        self.equipment[slot] = artifact
+        self.refresh_stats()
+        events = [Event(EventKind.EQUIP, self, effect=artifact)]
+        if current is not None:
+            events.append(self.sell(current))
+        return events
+
+    def store(self, item):
+        sold = self.inventory.add(item)
+        return [self.sell(sold)] if sold is not None else []
+
+    def sell(self, item):
+        price = sell_price(item)
+        self.gold += price
+        return Event(EventKind.SELL, self, amount=price, effect=item)
+
+# Через столько ходов погибший монстр возвращается в свою локацию
+MONSTER_RESPAWN_DELAY = 25
+
+# Бюджет пополнения локации начисляется за каждые REGEN_PERIOD ходов
+REGEN_PERIOD = 10
+ARTIFACTS_PER_PERIOD = 0.1  # Артефактов за период на единицу опасности
+MONSTERS_PER_PERIOD = 0.05  # Новых монстров за период на единицу опасности
+
+
+class Location:
+    def __init__(self, name, danger_level, rng=None, respawn_delay=None, monster_cap=None,
+                 populate=True):
+        self.name = name
+        self.rng = rng or random
+        self.danger_level = danger_level
+        self.artifacts = []
+        self.monsters = []  # Живые монстры; порядок не важен, удаление за O(1)
+        self.dead_monsters = deque()  # Погибшие в порядке гибели, ждут возрождения
+        self.respawn_delay = MONSTER_RESPAWN_DELAY if respawn_delay is None else respawn_delay
+        self.monster_cap = 2 + danger_level if monster_cap is None else monster_cap
+        self.artifact_cap = 3 + danger_level
+        # Бюджет пополнения за период; дробные остатки копятся между периодами
+        self.artifact_budget = ARTIFACTS_PER_PERIOD * danger_level
+        self.monster_budget = MONSTERS_PER_PERIOD * danger_level
+        self.artifact_credit = 0.0
+        self.monster_credit = 0.0
+        self.updated_at = 0  # Ход, до которого локация пополнена
+        self.heroes = {}  # Герои в локации по id, обновляются при переходах
+        self.neighbors = {}  # Соседние локации и стоимость пути до них
+        self.exits = ((), ())  # Соседи и накопленные веса для выбора пути (None - пересчитать)
+        if populate:
+            self.generate_content()
+
+    def __getstate__(self):
+        # Дороги сохраняет мир списком номеров (GameWorld.__getstate__):
+        # цепочка соседей в pickle упирается в предел рекурсии
+        state = self.__dict__.copy()
+        if state["rng"] is random:
+            state["rng"] = None
+        state["neighbors"] = {}
+        state["exits"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.rng = self.rng or random
+
+    def generate_content(self):
+        # Генерация артефактов
+        artifact_count = self.rng.randint(0, 3 + self.danger_level)
+        for _ in range(artifact_count):
+            self.artifacts.append(self.make_artifact())
+
+        # Генерация монстров
+        monster_count = self.rng.randint(1, 2 + self.danger_level)
+        for _ in range(monster_count):
+            self.add_monster(self.make_monster())
+
+    def make_artifact(self):
+        artifact_type = self.rng.choice(ARTIFACT_TYPES)
+        power = self.rng.randint(1, 10) * self.danger_level
+        bonus_type = self.rng.choice(BONUS_TYPES)
+        name = self.rng.choice(ARTIFACT_NAMES.get(artifact_type, UNKNOWN_ARTIFACT_NAMES))
+        return Artifact(name, artifact_type, power, bonus_type)
+
+    def make_monster(self):
+        monster_type = self.rng.choice(MONSTER_TYPES)
+        power = self.rng.randint(5, 15) * self.danger_level
+        name = f"{monster_type.value} ур.{self.danger_level}"
+        return Monster(name, monster_type, power, self.rng)
+
+    def get_artifact(self):
+        if self.artifacts:
+            return self.artifacts.pop()
+        return None
+
+    def get_monster(self):
+        if self.monsters:
+            return self.rng.choice(self.monsters)
+        return None
+
+    def add_monster(self, monster):
+        monster.home = self
+        monster.pool_index = len(self.monsters)
+        self.monsters.append(monster)
+
+    def remove_monster(self, monster):
+        """Удаление из живых за O(1): на место монстра встает последний"""
+        last = self.monsters.pop()
+        if last is not monster:
+            self.monsters[monster.pool_index] = last
+            last.pool_index = monster.pool_index
+        monster.pool_index = -1
+
+    def bury(self, monster, turn):
+        """Перенос погибшего монстра в очередь на возрождение; таймер идет с хода гибели"""
+        if monster.pool_index >= 0:
+            self.remove_monster(monster)
+            monster.respawn_at = turn + self.respawn_delay
+            self.dead_monsters.append(monster)
+
+    def update(self, turn):
+        """Догоняющее пополнение, когда в локацию приходит герой.
+
+        За каждый прошедший период начисляется бюджет предметов и монстров,
+        погибшие монстры возвращаются по таймерам. Локации, где никто не
+        бывает, ничего не стоят. Возвращает появившихся монстров.
+        """
+        periods = (turn - self.updated_at) // REGEN_PERIOD
+        if periods <= 0:
+            return []
+        self.updated_at += periods * REGEN_PERIOD
+
+        dead = self.dead_monsters  # По порядку гибели, а значит и по таймерам
+        appeared = []
+        while dead and dead[0].respawn_at <= turn and len(self.monsters) < self.monster_cap:
+            monster = dead.popleft()
+            monster.respawn()
+            self.add_monster(monster)
+            appeared.append(monster)
+
+        self.artifact_credit += self.artifact_budget * periods
+        while self.artifact_credit >= 1 and len(self.artifacts) < self.artifact_cap:
+            self.artifacts.append(self.make_artifact())
+            self.artifact_credit -= 1
+        self.artifact_credit = min(self.artifact_credit, 1.0)  # Сверх лимита бюджет не копится
+
+        self.monster_credit += self.monster_budget * periods
+        while self.monster_credit >= 1 and len(self.monsters) + len(dead) < self.monster_cap:
+            monster = self.make_monster()
+            self.add_monster(monster)
+            appeared.append(monster)
+            self.monster_credit -= 1
+        self.monster_credit = min(self.monster_credit, 1.0)
+        return appeared
+
+    def connect(self, other, cost):
+        """Двусторонняя дорога между локациями"""
+        self.neighbors[other] = cost
+        other.neighbors[self] = cost
+        self.exits = None
+        other.exits = None
+
+    def update_exits(self):
+        locations = list(self.neighbors)
+        weights = list(itertools.accumulate(1 / cost for cost in self.neighbors.values()))
+        self.exits = (locations, weights)
+
+    def choose_next(self, rng):
+        """Соседняя локация с вероятностью, обратной стоимости пути"""
+        if self.exits is None:
+            self.update_exits()  # Веса пересчитываются при первом выборе после новых дорог
+        locations, weights = self.exits
+        if not locations:
+            return self
+        return rng.choices(locations, cum_weights=weights)[0]
+
+    def enter(self, npc):
+        self.heroes[npc.id] = npc
+
+    def leave(self, npc):
+        self.heroes.pop(npc.id, None)
+
+    def occupancy(self):
+        """Число героев и живых монстров в локации"""
+        return len(self.heroes), len(self.monsters)
+
+NPC_DEFAULTS = NPC._default_state()
+
+
+_SLOT_NAMES = {}  # Класс -> поля из __slots__ всей иерархии
+
+
+def _slot_names(cls):
+    """Все поля из __slots__ класса и его предков, для снимков"""
+    names = _SLOT_NAMES.get(cls)
+    if names is None:
+        names = _SLOT_NAMES[cls] = tuple(
+            name for klass in reversed(cls.__mro__)
+            for name in klass.__dict__.get("__slots__", ())
+        )
+    return names
+
+
+# ========== КЛАССЫ ИГРОВЫХ ПЕРСОНАЖЕЙ ==========
+class Mage(NPC):
+    __slots__ = ("mana", "max_mana")
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.mana = 150 + self.rng.randint(0, 50)
+        self.max_mana = self.mana
+        self.base_bonuses["Мана"] += 20
+
+class Archmage(Mage):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Урон"] += 10
+        self.base_bonuses["Мана"] += 30
+
+class Necromancer(Mage):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Регенерация"] += 5
+        self.max_health += 20
+
+class Warrior(NPC):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.max_health = 150 + self.rng.randint(0, 30)
+        self.health = self.max_health
+        self.base_bonuses["Защита"] += 5
+
+    def attack(self, target):
+        weapon_power = self.equipment.weapon.power if self.equipment.weapon else 0
+        damage = self.rng.randint(15 + weapon_power, 25 + weapon_power * 2) + self.bonuses.Урон
+        return Event(EventKind.POWER_ATTACK, self, target, amount=damage, detail=target.take_damage(damage))
+
+
+class Berserker(Warrior):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Урон"] += 15
+        self.base_bonuses["Защита"] -= 3
+        self.max_health += 20
+
+    def attack(self, target):
+        damage_bonus = self.max_health - self.health  # Чем меньше HP, тем сильнее атака
+        weapon_power = self.equipment.weapon.power if self.equipment.weapon else 0
+        damage = self.rng.randint(20 + weapon_power, 30 + weapon_power * 2) + damage_bonus // 2
+        return Event(EventKind.RAGE_ATTACK, self, target, amount=damage, detail=target.take_damage(damage))
+
+
+class Paladin(Warrior):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Защита"] += 10
+        self.max_health += 30
+
+class Rogue(NPC):
+    __slots__ = ("stealth",)
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.stealth = True
+        self.base_bonuses["Крит"] += 15
+        self.base_bonuses["Скорость"] += 5
+
+    def attack(self, target):
+        if self.stealth:
+            weapon_power = self.equipment.weapon.power if self.equipment.weapon else 0
+            damage = self.rng.randint(20 + weapon_power * 2, 35 + weapon_power * 2) + self.bonuses.Урон
+            self.stealth = False
+            return Event(EventKind.BACKSTAB, self, target, amount=damage, detail=target.take_damage(damage))
+        else:
+            weapon_power = self.equipment.weapon.power if self.equipment.weapon else 0
+            damage = self.rng.randint(10 + weapon_power, 15 + weapon_power) + self.bonuses.Урон
+            self.stealth = self.rng.random() < 0.5  # 50% шанс скрыться
+            return Event(EventKind.QUICK_ATTACK, self, target, amount=damage, detail=target.take_damage(damage))
+
+
+class Assassin(Rogue):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Урон"] += 20
+        self.base_bonuses["Защита"] -= 5
+
+    def attack(self, target):
+        result = super().attack(target)
+        if not self.stealth and self.rng.random() < 0.3:
+            target.add_status(StatusEffect.POISONED, 3)
+            result = Event(EventKind.POISON_STRIKE, self, target, detail=result)
+        return result
+
+
+class Shadowdancer(Rogue):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Скорость"] += 10
+        self.base_bonuses["Крит"] += 10
+
+class Priest(NPC):
+    __slots__ = ("mana", "max_mana")
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.mana = 100
+        self.max_mana = 100
+        self.base_bonuses["HP"] += 30
+
+class Inquisitor(Priest):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Урон"] += 10
+        self.base_bonuses["Мана"] += 20
+
+class Druid(Priest):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Регенерация"] += 10
+        self.max_health += 20
+
+class Archer(NPC):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Крит"] += 20
+        self.base_bonuses["Скорость"] += 10
+        self.max_health += 10
+
+    def attack(self, target):
+        weapon_power = self.equipment.weapon.power if self.equipment.weapon else 0
+        base_damage = self.rng.randint(10 + weapon_power, 20 + weapon_power)
+
+        # Учет критического урона
+        crit_chance = (self.bonuses.Крит + 20) / 100  # +20% базовый шанс крита для лучника
+        if self.rng.random() < crit_chance:
+            base_damage *= 2.5  # Больший множитель крита для лучника
+            kind = EventKind.CRIT_SHOT
+        else:
+            kind = EventKind.SHOT
+
+        total_damage = base_damage + self.bonuses.Урон
+        result = target.take_damage(total_damage)
+        return Event(kind, self, target, amount=base_damage, detail=result)
+
+
+class Sniper(Archer):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Урон"] += 15
+        self.base_bonuses["Скорость"] += 5
+        self.base_bonuses["Крит"] += 10
+
+    def attack(self, target):
+        # Снайпер имеет шанс на мгновенное убийство слабых врагов
+        if isinstance(target, Monster) and target.health < target.max_health * 0.3 and self.rng.random() < 0.3:
+            target.health = 0
+            target.die()
+            return Event(EventKind.HEADSHOT, self, target)
+        return super().attack(target)
+
+
+class Ranger(Archer):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Регенерация"] += 5
+        self.max_health += 20
+
+class Alchemist(NPC):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Регенерация"] += 15
+        self.max_health += 50
+
+    def rest(self):
+        events = super().rest()
+        # Алхимик создает зелья во время отдыха
+        if self.rng.random() < 0.5:
+            potion_type = self.rng.choice(["health", "mana"])
+            power = self.rng.randint(5, 15)
+            potion = Artifact(f"Зелье {'здоровья' if potion_type == 'health' else 'маны'}",
+                              ArtifactType.POTION, power, "HP" if potion_type == "health" else "Мана")
+            events.append(Event(EventKind.BREW, self, effect=potion))
+            events.extend(self.store(potion))
+        return events
+
+
+class Bomber(Alchemist):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Урон"] += 10
+        self.max_health -= 20
+
+class Transmuter(Alchemist):
+    __slots__ = ()
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.base_bonuses["Мана"] += 50
+# ========== КЛАСС МОНСТРА ==========
+class Monster(NPC):
+    __slots__ = ("monster_type", "power", "home", "pool_index", "respawn_at")
+
+    def __init__(self, name, monster_type, power, rng=None):
+        super().__init__(name, rng)
+        self.monster_type = monster_type
+        self.power = power
+        self.health = power * 2
+        self.max_health = self.health
+        self.gold = self.rng.randint(5, 20) * power // 10
+        self.home = None  # Локация, в пуле которой живет монстр
+        self.pool_index = -1  # Место в списке живых монстров локации
+        self.respawn_at = None  # Ход возвращения погибшего монстра
+        self.stats_dirty = False  # Бонусов класса у монстров нет
+
+    def respawn(self):
+        """Возвращение погибшего монстра: объект переиспользуется под новым id"""
+        self.id = next(NPC._ids)
+        self.level = 1
+        self.experience = 0
+        self.max_health = self.power * 2
+        self.health = self.max_health
+        self.is_alive = True
+        self.state = "exploring"
+        self.target = None
+        self.status_effects = {}
+        self.gold = self.rng.randint(5, 20) * self.power // 10
+
+    def special_attack(self, target):
+        attack = MONSTER_ATTACKS.get(self.monster_type, DEFAULT_MONSTER_ATTACK)
+        damage = attack.damage + self.rng.randint(0, self.power)
+        result = target.take_damage(damage)
+
+        # Специальные эффекты
+        if attack.statuses:
+            if attack.choose:
+                target.add_status(*attack.statuses[int(self.rng.random() * len(attack.statuses))])
+            else:
+                apply_statuses(target, attack.statuses)
+        return Event(EventKind.MONSTER_ATTACK, self, target, amount=damage, effect=attack.name, detail=result)
+
+
+# ========== ЭФФЕКТЫ ==========
+# Периодические эффекты: вид события, урон и лечение за срабатывание
+# (к лечению добавляется бонус регенерации носителя)
+EFFECT_TICKS = {
+    StatusEffect.POISONED: (EventKind.POISON_TICK, 5, 0),
+    StatusEffect.BURNING: (EventKind.BURN_TICK, 10, 0),
+    StatusEffect.REGENERATION: (EventKind.REGEN_TICK, 0, 5),
+    StatusEffect.SHIELDED: (EventKind.SHIELD_TICK, 0, 0),
+    StatusEffect.STUNNED: (EventKind.STUN_TICK, 0, 0)
+}
+
+
+class StatusScheduler:
+    """Планировщик эффектов мира.
+
+    Эффект с длительностью d срабатывает на d ближайших ходах мира, начиная
+    с текущего. Носитель хранит в status_effects ход истечения, сроки лежат
+    в куче, поэтому снятие истекших стоит O(log n), а периодические эффекты
+    применяются пачками по спискам носителей без обхода всех персонажей.
+    Переназначенный эффект оставляет в куче устаревшую запись, она
+    отбрасывается при извлечении по несовпадению хода.
+    """
+
+    def __init__(self):
+        self.turn = 0  # Число выполненных срабатываний
+        self.expiries = []  # Куча (ход истечения, номер записи, носитель, эффект)
+        self.pushed = 0
+        self.active = {effect: {} for effect in EFFECT_TICKS}  # Эффект -> {носитель: ход истечения}
+
+    def bind(self, entity):
+        """Подключение персонажа; эффекты, полученные вне мира, ставятся в расписание"""
+        if entity.effects is self:
+            return
+        durations, entity.status_effects = entity.status_effects, {}
+        entity.effects = self
+        for effect, duration in durations.items():
+            self.schedule(entity, effect, duration)
+
+    def schedule(self, entity, effect, duration):
+        if duration <= 0:
+            entity.status_effects.pop(effect, None)
+            return
+        expiry = self.turn + duration
+        entity.status_effects[effect] = expiry
+        self.pushed += 1
+        heapq.heappush(self.expiries, (expiry, self.pushed, entity, effect))
+        bucket = self.active.get(effect)
+        if bucket is not None:
+            bucket[entity] = expiry
+
+    def remaining(self, entity):
+        return {effect: expiry - self.turn for effect, expiry in entity.status_effects.items()}
+
+    def tick(self):
+        """Одно срабатывание всех эффектов: (события, погибшие от эффектов)"""
+        self.turn += 1
+        events = []
+        died = []
+        for effect, (kind, damage, heal) in EFFECT_TICKS.items():
+            bucket = self.active[effect]
+            if not bucket:
+                continue
+            for entity, expiry in list(bucket.items()):
+                if not entity.is_alive or entity.status_effects.get(effect) != expiry:
+                    del bucket[entity]
+                    continue
+                if damage:
+                    entity.take_damage(damage)
+                    if not entity.is_alive:
+                        died.append(entity)
+                elif heal:
+                    entity.heal(heal + entity.bonuses.Регенерация)
+                events.append(Event(kind, entity))
+
+        heap = self.expiries
+        while heap and heap[0][0] <= self.turn:
+            expiry, _, entity, effect = heapq.heappop(heap)
+            if entity.status_effects.get(effect) != expiry:
+                continue
+            del entity.status_effects[effect]
+            bucket = self.active.get(effect)
+            if bucket is not None:
+                bucket.pop(entity, None)
+            if entity.is_alive:
+                events.append(Event(EventKind.STATUS_EXPIRED, entity, effect=effect))
+        return events, died
+
+
+# ========== ЖУРНАЛ СОБЫТИЙ ==========
+class EventLog:
+    """Кольцевой буфер событий с порядковыми номерами.
+
+    Старые события вытесняются без копирования списка, а каждое событие
+    получает номер, который только растет. Читатели запоминают последний
+    номер и запрашивают новые события через events_since().
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("Емкость журнала должна быть положительной")
+        self.capacity = capacity
+        self._buffer = [None] * capacity
+        self._start = 0
+        self._size = 0
+        self.last_seq = 0
+
+    def append(self, event):
+        end = (self._start + self._size) % self.capacity
+        self._buffer[end] = event
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+        self.last_seq += 1
+        return self.last_seq
+
+    @property
+    def first_seq(self):
+        """Номер самого старого события в буфере"""
+        return self.last_seq - self._size + 1
+
+    def events_since(self, seq):
+        """Список пар (номер, событие) с номером больше seq"""
+        return self.events_range(seq + 1, self.last_seq + 1)
+
+    def events_range(self, start, stop):
+        """Пары (номер, событие) с номерами из [start, stop), которые еще в буфере"""
+        first = self.first_seq
+        result = []
+        for offset in range(max(0, start - first), min(self._size, stop - first)):
+            result.append((first + offset, self._buffer[(self._start + offset) % self.capacity]))
+        return result
+
+    def clear(self):
+        """Очистка буфера; нумерация продолжается"""
+        self._buffer = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for offset in range(self._size):
+            yield self._buffer[(self._start + offset) % self.capacity]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("Индекс вне журнала")
+        return self._buffer[(self._start + index) % self.capacity]
+
+
+# ========== СИСТЕМА МИРА ==========
+# Неизменяемые снимки состояния для передачи между потоками
+HeroSnapshot = namedtuple(
+    "HeroSnapshot",
+    "id name class_name base_class level health max_health state is_alive"
+)
+WorldSnapshot = namedtuple(
+    "WorldSnapshot",
+    "turn_count locations alive_monsters is_running alive_npcs dead_npcs"
+)
+
+# Формат снимка мира: сигнатура, версия, длина сжатых данных, число ГСЧ.
+# В сжатых данных два pickle подряд: таблица персонажей по столбцам и граф
+# мира, где персонажи и ГСЧ записаны номерами. Состояния ГСЧ идут следом
+# несжатым блоком: это случайные байты, zlib их не уменьшает
+SNAPSHOT_MAGIC = b"RPGW"
+SNAPSHOT_VERSION = 9
+SNAPSHOT_HEADER = struct.Struct("<4sHQI")
+
+# Целые поля персонажей, которые таблица хранит столбцами array("q")
+ENTITY_COLUMNS = ("id", "health", "max_health", "level", "experience", "gold", "kills")
+# Поля, которые восстанавливает сама таблица; остальные - разреженными списками
+PACKED_FIELDS = ENTITY_COLUMNS + (
+    "name", "state", "is_alive", "stats_dirty", "base_bonuses", "bonuses", "known_spells"
+)
+# Флаги строки таблицы
+ALIVE, STATS_DIRTY, SHARED_BONUSES = 1, 2, 4
+# Состояние Mersenne Twister: 624 слова и позиция в них
+RNG_STATE = struct.Struct("<625I")
+
+
+def _restore_rng(internal, gauss):
+    # Без __init__: Random() сначала засевается из os.urandom, а состояние
+    # все равно целиком заменяет setstate
+    rng = random.Random.__new__(random.Random)
+    rng.setstate((random.Random.VERSION, internal, gauss))
+    return rng
+
+
+def _pack_entities(entities):
+    """Таблица персонажей для снимка и их поля-объекты.
+
+    Числа, флаги и бонусы ложатся столбцами array; поля-объекты (ГСЧ,
+    инвентарь, локация, цель...) - списками (номера строк, значения) и
+    только там, где они отличаются от полей нового персонажа.
+    """
+    classes = list(dict.fromkeys(type(entity) for entity in entities))
+    codes = {cls: code for code, cls in enumerate(classes)}
+    table = {
+        "classes": classes,
+        "class": array("H", [codes[type(entity)] for entity in entities]),
+        "names": [entity.name for entity in entities],
+        "states": [entity.state for entity in entities],
+        "flags": array("B", [
+            (entity.is_alive and ALIVE) | (entity.stats_dirty and STATS_DIRTY)
+            | (entity.bonuses is entity.base_bonuses and SHARED_BONUSES)
+            for entity in entities
+        ]),
+        "base_bonuses": array("q", [
+            value for entity in entities for value in entity.base_bonuses.values()
+        ]),
+        # Итог хранится только у тех, у кого он не общий с бонусами класса
+        "bonuses": array("q", [
+            value for entity in entities if entity.bonuses is not entity.base_bonuses
+            for value in entity.bonuses.values()
+        ])
+    }
+    fields = {}
+    for key in ENTITY_COLUMNS:
+        values = [getattr(entity, key) for entity in entities]
+        try:
+            table[key] = array("q", values)
+        except TypeError:
+            # Дробное здоровье после множителей урона: в столбце 0, само
+            # значение - в разреженных полях, чтобы не потерять тип
+            odd = [row for row, value in enumerate(values) if type(value) is not int]
+            fields[key] = (odd, [values[row] for row in odd])
+            for row in odd:
+                values[row] = 0
+            table[key] = array("q", values)
+
+    defaults = NPC_DEFAULTS
+    for row, entity in enumerate(entities):
+        for key in _slot_names(type(entity)):
+            if key in PACKED_FIELDS:
+                continue
+            value = getattr(entity, key)
+            if value is random or key in defaults and value == defaults[key]:
+                continue
+            if key == "inventory" and not value.buckets and value.capacity == BUCKET_CAPACITY:
+                continue
+            rows, values = fields.setdefault(key, ([], []))
+            rows.append(row)
+            values.append(value)
+    fields = {key: (array("I", rows), values) for key, (rows, values) in fields.items()}
+    return table, fields
+
+
+def _unpack_stats(column):
+    """Столбец бонусов (len(BONUS_TYPES) значений подряд) -> список Stats"""
+    width = len(BONUS_TYPES)
+    tables = [object.__new__(Stats) for _ in range(len(column) // width)]
+    for offset, key in enumerate(BONUS_TYPES):
+        for stats, value in zip(tables, column[offset::width]):
+            setattr(stats, key, value)
+    return tables
+
+
+def _unpack_entities(table):
+    """Персонажи из таблицы снимка, без конструкторов; поля-объекты ставит _restore_fields"""
+    classes = table["classes"]
+    entities = [object.__new__(classes[code]) for code in table["class"]]
+    for key in ENTITY_COLUMNS:
+        for entity, value in zip(entities, table[key]):
+            setattr(entity, key, value)
+
+    no_equipment = NPC_DEFAULTS["equipment"]
+    bonuses = iter(_unpack_stats(table["bonuses"]))
+    rows = zip(entities, table["names"], table["states"], table["flags"],
+               _unpack_stats(table["base_bonuses"]))
+    for entity, name, state, flags, base_bonuses in rows:
+        entity.name = name
+        entity.rng = random
+        entity.inventory = Inventory()
+        entity.status_effects = {}
+        entity.effects = None
+        entity.is_alive = bool(flags & ALIVE)
+        entity.current_location = None
+        entity.equipment = no_equipment.copy()
+        entity.state = state
+        entity.target = None
+        entity.base_bonuses = base_bonuses
+        entity.modifiers = {}
+        entity.bonuses = base_bonuses if flags & SHARED_BONUSES else next(bonuses)
+        entity.stats_dirty = bool(flags & STATS_DIRTY)
+        entity.known_spells = known_spells_for(type(entity))
+    return entities
+
+
+def _restore_fields(entities, fields):
+    """Поля-объекты из _pack_entities поверх значений нового персонажа"""
+    for key, (rows, values) in fields.items():
+        for row, value in zip(rows, values):
+            setattr(entities[row], key, value)
+
+
+@contextmanager
+def _gc_paused():
+    """Сборщик циклов выключен на время разбора или записи снимка.
+
+    Снимок создает сотни тысяч объектов, и сборщик многократно обходит их
+    все, хотя мусора среди них нет.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """Граф мира для снимка.
+
+    Персонажи из таблицы пишутся номером строки, генераторы - отрицательным
+    номером в списке rngs, их состояния сохраняются отдельным блоком.
+    """
+
+    def __init__(self, file, entities):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows = {id(entity): row for row, entity in enumerate(entities)}
+        self.rng_ids = {}
+        self.rngs = []
+
+    def persistent_id(self, obj):
+        row = self.rows.get(id(obj))
+        if row is not None:
+            return row
+        if type(obj) is random.Random:
+            index = self.rng_ids.get(id(obj))
+            if index is None:
+                index = self.rng_ids[id(obj)] = len(self.rngs)
+                self.rngs.append(obj)
+            return -1 - index
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, entities, rngs):
+        super().__init__(file)
+        self.entities = entities
+        self.rngs = rngs
+
+    def persistent_load(self, pid):
+        return self.entities[pid] if pid >= 0 else self.rngs[-1 - pid]
+
+
+LOCATIONS = (
+    ("Лес", 1),
+    ("Пещеры", 2),
+    ("Горы", 3),
+    ("Подземелье", 4),
+    ("Храм", 3),
+    ("Лаборатория", 5)
+)
+
+# Виды местности для процедурных локаций
+REGION_KINDS = (
+    "Лес", "Пещеры", "Горы", "Подземелье", "Храм", "Лаборатория",
+    "Болота", "Руины", "Пустоши", "Крепость"
+)
+
+# Дороги между локациями: (индекс, индекс, стоимость пути)
+ROUTES = (
+    (0, 1, 1),
+    (0, 4, 2),
+    (1, 2, 2),
+    (1, 3, 3),
+    (2, 4, 2),
+    (2, 5, 3),
+    (3, 4, 3),
+    (3, 5, 2)
+)
+
+
+# Фазы хода по порядку: имя для замеров и метод GameWorld (см. rpg_profiler)
+TURN_PHASES = (
+    ("npcs", "update_npcs"),
+    ("effects", "tick_effects"),
+    ("events", "random_events")
+)
+
+
+class GameWorld:
+    def __init__(self, seed=None, event_log_capacity=1000):
+        self.seed = seed
+        self.rng = self.spawn_rng("world")
+        self.npcs = []
+        self.locations = [
+            Location(name, danger_level, self.spawn_rng("location", i))
+            for i, (name, danger_level) in enumerate(LOCATIONS)
+        ]
+        for a, b, cost in ROUTES:
+            self.locations[a].connect(self.locations[b], cost)
+        self.region_rng = self.spawn_rng("regions")  # Общий поток для процедурных локаций
+        self.event_log = EventLog(event_log_capacity)
+        self.effects = StatusScheduler()
+        self.sinks = []  # Приемники хроники событий (см. rpg_sinks)
+        self.profiler = None  # Замер фаз хода (см. rpg_profiler)
+        self.metrics = None  # Публикация метрик после хода (см. rpg_metrics)
+        self.is_running = False
+        self.simulation_speed = 1.0
+        self.turn_count = 0
+
+    def spawn_rng(self, *key):
+        """Независимый поток случайных чисел для части мира.
+
+        С заданным seed поток определяется ключом, поэтому прогон
+        повторяется один в один; без seed берется случайное зерно.
+        """
+        if self.seed is None:
+            return random.Random()
+        return random.Random(":".join(str(part) for part in (self.seed,) + key))
+
+    def add_npc(self, npc):
+        if npc.rng is random:
+            npc.rng = self.spawn_rng("npc", len(self.npcs))
+        if npc.current_location is None and npc.is_alive:
+            npc.move_to(self.locations[0])  # Все начинают путь с первой локации
+        self.effects.bind(npc)
+        if npc.stats_dirty:
+            npc.refresh_stats()
+        self.npcs.append(npc)
+        self.log_event(npc.join_party())
+
+    def add_multiple_npcs(self, npc_list):
+        for npc in npc_list:
+            self.add_npc(npc)
+
+    def add_location(self, location, links=()):
+        """Новая локация с дорогами (соседняя локация, стоимость пути)"""
+        self.locations.append(location)
+        for neighbor, cost in links:
+            location.connect(neighbor, cost)
+        return location
+
+    def generate_locations(self, count):
+        """Процедурные локации: дешево создаются пустыми и заполняются бюджетом.
+
+        Каждая новая локация примыкает к случайной существующей, опасность
+        отличается от соседней не больше чем на единицу.
+        """
+        rng = self.region_rng
+        created = []
+        for _ in range(count):
+            parent = rng.choice(self.locations)
+            danger = min(5, max(1, parent.danger_level + rng.randint(-1, 1)))
+            name = f"{rng.choice(REGION_KINDS)} {len(self.locations) + 1}"
+            links = [(parent, rng.randint(1, 3))]
+            if rng.random() < 0.3:
+                other = rng.choice(self.locations)
+                if other is not parent:
+                    links.append((other, rng.randint(2, 4)))
+            location = Location(name, danger, rng, populate=False)
+            location.updated_at = self.turn_count
+            created.append(self.add_location(location, links))
+        return created
+
+    def add_sink(self, sink):
+        """Подключение приемника: он получает каждое событие вместе с seq и ходом"""
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+        sink.close()
+
+    def flush_sinks(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close_sinks(self):
+        for sink in self.sinks:
+            sink.close()
+        self.sinks.clear()
+
+    def log_event(self, event):
+        seq = self.event_log.append(event)
+        for sink in self.sinks:
+            sink.write(seq, self.turn_count, event)
+        return seq
+
+    def simulate_turn(self):
+        if not self.is_running:
+            return
+
+        self.turn_count += 1
+        if self.profiler is not None:
+            self.profiler.run_turn(self)  # Те же фазы, но с замером времени
+        else:
+            self.update_npcs()
+            self.tick_effects()
+            self.random_events()
+        if self.metrics is not None:
+            self.metrics.publish(self)
+
+    def update_npcs(self):
+        for npc in self.npcs:
+            if npc.is_alive:
+                npc_events = npc.update(self)
+                for event in npc_events:
+                    self.log_event(event)
+
+    def tick_effects(self):
+        """Эффекты срабатывают раз в ход для всех носителей сразу"""
+        events, died = self.effects.tick()
+        for event in events:
+            self.log_event(event)
+        for entity in died:
+            self.bury(entity)
+            for event in self.effect_death(entity):
+                self.log_event(event)
+
+    def random_events(self):
+        if self.rng.random() < 0.1:
+            self.log_event(Event(EventKind.OMEN, effect=self.rng.choice(WORLD_OMENS)))
+
+    def bury(self, entity):
+        """Погибший монстр уходит в очередь возрождения своей локации"""
+        if isinstance(entity, Monster) and entity.home is not None:
+            entity.home.bury(entity, self.turn_count)
+
+    def effect_death(self, entity):
+        """Гибель от эффекта: победу получает первый герой, сражавшийся с жертвой"""
+        if isinstance(entity, Monster):
+            for npc in self.npcs:
+                if npc.target is entity and npc.is_alive:
+                    return npc.claim_victory()
+            return [Event(EventKind.DEFEATED, entity)]
+        if entity.target is not None:
+            return [Event(EventKind.KILLED, entity, entity.target)]
+        return [Event(EventKind.DEFEATED, entity)]
+
+    def start_simulation(self):
+        self.is_running = True
+        # Счетчик ходов не сбрасывается: по нему идут пополнение локаций и
+        # таймеры возрождения, а после перезапуска или загрузки снимка они
+        # должны продолжаться, а не ждать, пока счетчик их догонит
+        if self.turn_count:
+            text = f"=== СИМУЛЯЦИЯ ПРОДОЛЖАЕТСЯ С ХОДА {self.turn_count} ==="
+        else:
+            text = "=== СИМУЛЯЦИЯ НАЧИНАЕТСЯ ==="
+        self.log_event(Event(EventKind.SYSTEM, effect=text))
+
+    def stop_simulation(self):
+        self.is_running = False
+        self.log_event(Event(EventKind.SYSTEM, effect="=== СИМУЛЯЦИЯ ОСТАНОВЛЕНА ==="))
+        self.flush_sinks()
+
+    def get_stats(self):
+        stats = {
+            "alive_npcs": [npc for npc in self.npcs if npc.is_alive],
+            "dead_npcs": [npc for npc in self.npcs if not npc.is_alive],
+            "alive_monsters": sum(len(loc.monsters) for loc in self.locations),
+            "dead_monsters": sum(len(loc.dead_monsters) for loc in self.locations),
+            "locations": len(self.locations),
+            "occupancy": {loc.name: loc.occupancy() for loc in self.locations},
+            "turn_count": self.turn_count
+        }
+        return stats
+
+    def __getstate__(self):
+        # Открытые файлы хроники, профайлер и метрики в снимок не попадают
+        state = self.__dict__.copy()
+        state["sinks"] = []
+        state["profiler"] = None
+        state["metrics"] = None
+        # Дороги - номерами локаций в исходном порядке соседей
+        index = {location: i for i, location in enumerate(self.locations)}
+        state["routes"] = [
+            [(index[neighbor], cost) for neighbor, cost in location.neighbors.items()]
+            for location in self.locations
+        ]
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault("sinks", [])
+        state.setdefault("profiler", None)
+        state.setdefault("metrics", None)
+        routes = state.pop("routes")
+        self.__dict__.update(state)
+        for location, links in zip(self.locations, routes):
+            location.neighbors = {self.locations[i]: cost for i, cost in links}
+            location.exits = None
+
+    def entities(self):
+        """Все персонажи мира: герои и монстры из пулов локаций"""
+        return self.npcs + [
+            monster for location in self.locations
+            for pool in (location.monsters, location.dead_monsters) for monster in pool
+        ]
+
+    def save(self, path):
+        """Сохранение мира в сжатый двоичный снимок (вместе с состоянием ГСЧ)"""
+        entities = self.entities()
+        with _gc_paused():
+            table, fields = _pack_entities(entities)
+            graph = io.BytesIO()
+            pickler = _SnapshotPickler(graph, entities)
+            pickler.dump((self, fields))
+            states = [rng.getstate() for rng in pickler.rngs]
+            table["rng_gauss"] = [gauss for _, _, gauss in states]
+
+            buffer = io.BytesIO()
+            pickle.dump(table, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+            buffer.write(graph.getbuffer())
+            payload = zlib.compress(buffer.getbuffer(), 1)
+            rng_block = b"".join(RNG_STATE.pack(*internal) for _, internal, _ in states)
+        with open(path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(payload), len(states)))
+            f.write(payload)
+            f.write(rng_block)
+
+    @classmethod
+    def load(cls, path):
+        """Загрузка мира из снимка, созданного save().
+
+        Снимок использует pickle, поэтому открывать стоит только свои файлы.
+        """
+        with open(path, "rb") as f:
+            header = f.read(SNAPSHOT_HEADER.size)
+            if len(header) < SNAPSHOT_HEADER.size:
+                raise ValueError("Файл слишком короткий для снимка мира")
+            magic, version, size, rng_count = SNAPSHOT_HEADER.unpack(header)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("Файл не является снимком мира")
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+            payload = f.read(size)
+            states = f.read(rng_count * RNG_STATE.size)
+        if len(states) < rng_count * RNG_STATE.size:
+            raise ValueError("Снимок мира обрезан")
+
+        with _gc_paused():
+            stream = io.BytesIO(zlib.decompress(payload))
+            table = pickle.load(stream)
+            entities = _unpack_entities(table)
+            rngs = [_restore_rng(internal, gauss)
+                    for internal, gauss in zip(RNG_STATE.iter_unpack(states), table["rng_gauss"])]
+            world, fields = _SnapshotUnpickler(stream, entities, rngs).load()
+            if not isinstance(world, cls):
+                raise ValueError("Снимок содержит не мир")
+            _restore_fields(entities, fields)
+
+        # Новые персонажи не должны получить id, уже занятые в снимке
+        next_id = max(table["id"], default=0) + 1
+        NPC._ids = itertools.count(max(next_id, next(NPC._ids)))
+        return world
+
+    def snapshot(self):
+        """Неизменяемый снимок мира для отображения в другом потоке"""
+        alive, dead = [], []
+        for npc in self.npcs:
+            hero = HeroSnapshot(
+                npc.id, npc.name, type(npc).__name__, type(npc).__bases__[0].__name__,
+                npc.level, npc.health, npc.max_health, npc.state, npc.is_alive
+            )
+            (alive if npc.is_alive else dead).append(hero)
+        return WorldSnapshot(
+            self.turn_count,
+            len(self.locations),
+            sum(len(loc.monsters) for loc in self.locations),
+            self.is_running,
+            tuple(alive),
+            tuple(dead)
+        )
+
+
+# ========== СОЗДАНИЕ ПЕРСОНАЖЕЙ ==========
+CLASS_MAP = {
+    "Маг": {
+        "Архимаг": Archmage,
+        "Некромант": Necromancer
+    },
+    "Воин": {
+        "Берсерк": Berserker,
+        "Паладин": Paladin
+    },
+    "Разбойник": {
+        "Ассасин": Assassin,
+        "Теневой плясун": Shadowdancer
+    },
+    "Жрец": {
+        "Инквизитор": Inquisitor,
+        "Друид": Druid
+    },
+    "Лучник": {
+        "Снайпер": Sniper,
+        "Рейнджер": Ranger
+    },
+    "Алхимик": {
+        "Бомбардир": Bomber,
+        "Трансмутатор": Transmuter
+    }
+}
+
+
+def create_character(class_name, subclass, name, rng=None):
+    """Создание экземпляра персонажа"""
+    return CLASS_MAP[class_name][subclass](name, rng)
+
+
+def create_party(count, prefix="Герой", class_name=None, rng=None):
+    """Создание отряда из случайных (или заданного) классов.
+
+    С переданным rng каждый герой получает собственный поток, выведенный из него.
+    """
+    rng = rng or random
+    party = []
+    for i in range(1, count + 1):
+        char_class = class_name or rng.choice(list(CLASS_MAP))
+        subclass = rng.choice(list(CLASS_MAP[char_class]))
+        hero_rng = random.Random(rng.getrandbits(64)) if rng is not random else None
+        party.append(create_character(char_class, subclass, f"{prefix} {i}", hero_rng))
+    return party
+
+
+# ========== БЕЗ ИНТЕРФЕЙСА ==========
+def run_headless(world, turns, vectorized=False):
+    """Прогон симуляции без интерфейса и задержек между ходами.
+
+    При vectorized=True ходы считаются в массивах NumPy (см. rpg_soa),
+    а итоговое состояние переносится обратно в объекты мира.
+    """
+    if not world.is_running:
+        world.start_simulation()
+
+    if vectorized:
+        from rpg_soa import ArrayWorld
+        array_world = ArrayWorld(world, seed=world.rng.getrandbits(64))
+        start = time.perf_counter()
+        for _ in range(turns):
+            array_world.simulate_turn()
+        elapsed = time.perf_counter() - start
+        array_world.write_back()
+    else:
+        start = time.perf_counter()
+        for _ in range(turns):
+            world.simulate_turn()
+        elapsed = time.perf_counter() - start
+
+    stats = world.get_stats()
+    return {
+        "turns": turns,
+        "elapsed": elapsed,
+        "turns_per_second": turns / elapsed if elapsed > 0 else float("inf"),
+        "alive_npcs": len(stats["alive_npcs"]),
+        "dead_npcs": len(stats["dead_npcs"]),
+        "alive_monsters": stats["alive_monsters"],
+        "turn_count": stats["turn_count"]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Симуляция мира без графического интерфейса")
+    parser.add_argument("--turns", type=int, default=1000, help="число ходов")
+    parser.add_argument("--heroes", type=int, default=10, help="размер отряда")
+    parser.add_argument("--class", dest="class_name", choices=list(CLASS_MAP), help="основной класс отряда")
+    parser.add_argument("--seed", type=int, help="зерно для воспроизводимого прогона")
+    parser.add_argument("--locations", type=int, default=0, help="добавить процедурных локаций")
+    parser.add_argument("--load", help="продолжить мир из снимка")
+    parser.add_argument("--save", help="сохранить мир в снимок после прогона")
+    parser.add_argument("--vectorized", action="store_true", help="векторизованный режим (нужен NumPy)")
+    parser.add_argument("--chronicle", help="записывать все события в файл (.jsonl или .csv)")
+    parser.add_argument("--compress", choices=("gzip", "zstd"), help="сжатие файлов хроники")
+    parser.add_argument("--rotate-mb", type=float, default=64, help="размер файла хроники до ротации, МБ")
+    parser.add_argument("--data", help="таблицы игры из файла JSON/TOML")
+    parser.add_argument("--dump-data", help="сохранить текущие таблицы игры в JSON и выйти")
+    parser.add_argument("--profile", action="store_true", help="замер фаз хода, перцентили в конце")
+    parser.add_argument("--profile-classes", action="store_true", help="замер update по подклассам NPC")
+    parser.add_argument("--trace", help="записать трассу Chrome/Perfetto (JSON) для окна ходов")
+    parser.add_argument("--trace-turns", type=int, default=100, help="ходов в трассе")
+    parser.add_argument("--trace-skip", type=int, default=0, help="пропустить ходов перед трассой")
+    parser.add_argument("--metrics-port", type=int, help="метрики Prometheus на http://127.0.0.1:PORT/metrics")
+    args = parser.parse_args(argv)
+    profiling = args.profile or args.profile_classes or args.trace
+    if (profiling or args.metrics_port is not None) and args.vectorized:
+        parser.error("замер фаз и метрики доступны только в объектном режиме")
+
+    if args.data:
+        load_game_data(args.data)
+    if args.dump_data:
+        dump_game_data(args.dump_data)
+        return None
+
+    world = GameWorld.load(args.load) if args.load else GameWorld(seed=args.seed)
+    if args.chronicle:
+        from rpg_sinks import open_sink
+        world.add_sink(open_sink(args.chronicle, args.compress, max_bytes=int(args.rotate_mb * 1024 * 1024)))
+    if args.locations:
+        world.generate_locations(args.locations)
+    if not args.load:
+        world.add_multiple_npcs(create_party(args.heroes, class_name=args.class_name, rng=world.spawn_rng("party")))
+    if profiling:
+        from rpg_profiler import TurnProfiler
+        world.profiler = TurnProfiler(per_class=args.profile_classes)
+        if args.trace:
+            world.profiler.start_trace(args.trace_turns, args.trace, args.trace_skip)
+    server = None
+    if args.metrics_port is not None:
+        from rpg_metrics import MetricsServer, WorldMetrics
+        world.metrics = WorldMetrics()
+        server = MetricsServer(world.metrics, port=args.metrics_port).start()
+        print(f"Метрики: http://127.0.0.1:{server.port}/metrics")
+    result = run_headless(world, args.turns, vectorized=args.vectorized)
+    if server is not None:
+        world.metrics.publish(world, force=True)
+        server.stop()
+    if args.save:
+        world.save(args.save)
+    else:
+        world.stop_simulation()
+    world.close_sinks()
+
+    print(f"Ходов: {result['turns']} за {result['elapsed']:.3f} с "
+          f"({result['turns_per_second']:.1f} ходов/с)")
+    print(f"Живые герои: {result['alive_npcs']}, погибшие: {result['dead_npcs']}, "
+          f"монстры: {result['alive_monsters']}")
+    if world.profiler is not None:
+        if world.profiler.tracing and args.trace:
+            world.profiler.dump_trace(args.trace)  # Прогон закончился раньше окна трассы
+        print(world.profiler.format_summary())
+    return result
+
+
+if __name__ == "__main__":
+    # Запуск через имя модуля, чтобы классы не дублировались в __main__
+    import rpg_engine
+    rpg_engine.main()
@@ -1,944 +1,192 @@
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-from PIL import Image, ImageTk
 import random
-from enum import Enum
 import threading
-import time
 import os
-from tkinter import PhotoImage
-from PIL import Image, ImageTk, ImageDraw, ImageFont
-
-# ========== БАЗОВЫЕ КЛАССЫ ==========
-class StatusEffect(Enum):
-    POISONED = "Отравление"
-    BURNING = "Горение"
-    FROZEN = "Заморозка"
-    BLESSED = "Благословение"
-    REGENERATION = "Регенерация"
-    SHIELDED = "Щит"
-    STUNNED = "Оглушение"
-
-
-class SpellType(Enum):
-    FIREBALL = "Огненный шар"
-    ICE_SHACKLES = "Оковы льда"
-    HEAL = "Исцеление"
-    LIGHTNING = "Молния"
-    HOLY_LIGHT = "Священный свет"
-    POISON_CLOUD = "Ядовитое облако"
-    SHIELD = "Магический щит"
-    STUN = "Оглушение"
-
-
-class ArtifactType(Enum):
-    WEAPON = "Оружие"
-    ARMOR = "Броня"
-    POTION = "Зелье"
-    SCROLL = "Свиток"
-    RING = "Кольцо"
-    AMULET = "Амулет"
-    RELIC = "Реліквія"
-    TOME = "Том"
-
-
-class MonsterType(Enum):
-    GOBLIN = "Гоблин"
-    ORC = "Орк"
-    TROLL = "Тролль"
-    DRAGON = "Дракон"
-    UNDEAD = "Нежить"
-    DEMON = "Демон"
-    ELEMENTAL = "Элементаль"
-
-
-class Artifact:
-    def __init__(self, name, artifact_type, power, bonus_type):
-        self.name = name
-        self.type = artifact_type
-        self.power = power
-        self.bonus_type = bonus_type
-
-    def __str__(self):
-        return f"{self.type.value}: {self.name} ({self.bonus_type} +{self.power})"
-
-# ========== КЛАССЫ ПЕРСОНАЖЕЙ ==========
-class NPC:
-    def __init__(self, name):
-        self.name = name
-        self.health = 100
-        self.max_health = 100
-        self.level = 1
-        self.experience = 0
-        self.inventory = []
-        self.status_effects = {}
-        self.is_alive = True
-        self.current_location = None
-        self.equipment = {
-            "weapon": None,
-            "armor": None,
-            "ring": None,
-            "amulet": None,
-            "relic": None
-        }
-        self.gold = random.randint(0, 50)
-        self.state = "exploring"
-        self.target = None
-        self.bonuses = {
-            "HP": 0,
-            "Мана": 0,
-            "Урон": 0,
-            "Защита": 0,
-            "Крит": 0,
-            "Скорость": 0,
-            "Регенерация": 0
-        }
-        self.known_spells = []
-
-    def apply_bonuses(self):
-        self.clear_bonuses()
-        for item in self.equipment.values():
-            if item:
-                self.bonuses[item.bonus_type] += item.power
-
-    def clear_bonuses(self):
-        for key in self.bonuses:
-            self.bonuses[key] = 0
-
-    def join_party(self):
-        return f"К партии присоединяется {self.name} ({self.__class__.__name__})"
-
-    def gain_exp(self, amount):
-        self.experience += amount
-        if self.experience >= 100 * self.level:
-            return self.level_up()
-        return f"{self.name} получает {amount} опыта."
-
-    def level_up(self):
-        self.level += 1
-        self.max_health += 20 + self.bonuses["HP"]
-        self.health = self.max_health
-        self.experience = 0
-        return f"{self.name} достигает {self.level} уровня!"
-
-    def add_status(self, effect: StatusEffect, duration: int):
-        self.status_effects[effect] = duration
-        return f"{self.name} получает эффект '{effect.value}' ({duration} ходов)"
-
-    def update_statuses(self):
-        results = []
-        for effect in list(self.status_effects.keys()):
-            self.status_effects[effect] -= 1
-            if self.status_effects[effect] <= 0:
-                del self.status_effects[effect]
-                results.append(f"Эффект '{effect.value}' на {self.name} рассеивается")
-
-            if effect == StatusEffect.POISONED:
-                self.take_damage(5)
-                results.append(f"{self.name} страдает от отравления")
-            elif effect == StatusEffect.BURNING:
-                self.take_damage(10)
-                results.append(f"{self.name} горит!")
-            elif effect == StatusEffect.REGENERATION:
-                self.heal(5 + self.bonuses["Регенерация"])
-                results.append(f"{self.name} восстанавливается благодаря регенерации")
-            elif effect == StatusEffect.SHIELDED:
-                results.append(f"{self.name} защищен магическим щитом")
-            elif effect == StatusEffect.STUNNED:
-                results.append(f"{self.name} оглушен и пропускает ход")
-
-        return results
-
-    def take_damage(self, damage):
-        armor_defense = self.equipment["armor"].power if self.equipment["armor"] else 0
-        actual_damage = max(1, damage - (armor_defense // 2 + self.bonuses["Защита"]))
-
-        if StatusEffect.SHIELDED in self.status_effects:
-            actual_damage = max(0, actual_damage - 10)
-
-        self.health = max(0, self.health - actual_damage)
-        if self.health == 0:
-            self.die()
-            return f"{self.name} повержен!"
-        return f"{self.name} теряет {actual_damage} здоровья. Осталось: {self.health} HP"
-
-    def heal(self, amount):
-        heal_amount = min(self.max_health - self.health, amount + self.bonuses["HP"] // 2)
-        self.health += heal_amount
-        return f"{self.name} восстанавливает {heal_amount} здоровья."
-
-    def attack(self, target):
-        """Базовый метод атаки"""
-        if StatusEffect.STUNNED in self.status_effects:
-            return f"{self.name} оглушен и не может атаковать!"
-
-        weapon_power = self.equipment["weapon"].power if self.equipment["weapon"] else 0
-        base_damage = random.randint(5 + weapon_power, 10 + weapon_power * 2)
-
-        # Учет критического урона
-        crit_chance = self.bonuses["Крит"] / 100
-        if random.random() < crit_chance:
-            base_damage *= 2
-            damage_msg = f"Критический удар! {base_damage} урона"
-        else:
-            damage_msg = f"{base_damage} урона"
-
-        total_damage = base_damage + self.bonuses["Урон"]
-        result = target.take_damage(total_damage)
-        return f"{self.name} атакует {target.name} ({damage_msg}): {result}"
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell not in self.known_spells:
-            return f"{self.name} не знает это заклинание"
-
-        if StatusEffect.STUNNED in self.status_effects:
-            return f"{self.name} оглушен и не может кастовать!"
-
-        return "Заклинание не реализовано"
-
-    def die(self):
-        self.is_alive = False
-        self.state = "dead"
-        return f"{self.name} умирает!"
-
-    def explore(self, world):
-        if not self.is_alive:
-            return []
-
-        events = []
-        # Выбираем случайную локацию
-        self.current_location = random.choice(world.locations)
-        events.append(f"{self.name} исследует {self.current_location.name}")
-
-        # Поиск артефактов
-        artifact = self.current_location.get_artifact()
-        if artifact:
-            self.inventory.append(artifact)
-            events.append(f"{self.name} находит {artifact}!")
-
-        # Встреча с монстром
-        if random.random() < self.current_location.danger_level * 0.3:
-            monster = self.current_location.get_monster()
-            if monster:
-                self.state = "fighting"
-                self.target = monster
-                events.append(f"{self.name} встречает {monster.name} и готовится к бою!")
-
-        # Шанс найти золото
-        if random.random() < 0.3:
-            gold_found = random.randint(1, 20) * self.current_location.danger_level
-            self.gold += gold_found
-            events.append(f"{self.name} находит {gold_found} золота!")
-
-        return events
-
-    def fight(self, world):
-        if not self.is_alive or not self.target or not self.target.is_alive:
-            self.state = "exploring"
-            self.target = None
-            return []
-
-        events = []
-
-        # Атака цели
-        if self.known_spells and random.random() < 0.5:
-            spell = random.choice(self.known_spells)
-            events.append(self.cast_spell(spell, self.target))
-        else:
-            events.append(self.attack(self.target))
-
-        # Проверка статусов
-        status_events = self.target.update_statuses()
-        events.extend(status_events)
-
-        # Если цель мертва
-        if not self.target.is_alive:
-            events.append(f"{self.name} побеждает {self.target.name}!")
-            exp_gain = random.randint(10, 30) * self.target.power // 10
-            events.append(self.gain_exp(exp_gain))
-            self.gold += self.target.gold
-            events.append(f"{self.name} забирает {self.target.gold} золота у {self.target.name}")
-            self.state = "exploring"
-            self.target = None
-
-        # Ответный удар
-        elif random.random() < 0.8 and self.target.is_alive:
-            if isinstance(self.target, Monster):
-                events.append(self.target.special_attack(self))
-            else:
-                events.append(self.target.attack(self))
-
-            # Проверка статусов
-            status_events = self.update_statuses()
-            events.extend(status_events)
-
-            if not self.is_alive:
-                events.append(f"{self.name} был убит {self.target.name}!")
-                if isinstance(self.target, NPC):
-                    self.target.gain_exp(random.randint(15, 25))
-                    self.target.gold += self.gold // 2
-                    events.append(f"{self.target.name} забирает {self.gold // 2} золота у {self.name}")
-
-        return events
-
-    def rest(self):
-        if not self.is_alive:
-            return []
-
-        events = []
-        heal_amount = random.randint(5, 15) + self.bonuses["Регенерация"]
-        events.append(self.heal(heal_amount))
-
-        # Использование зелий
-        potions = [item for item in self.inventory if item.type == ArtifactType.POTION]
-        if potions and self.health < self.max_health * 0.5:
-            potion = random.choice(potions)
-            self.inventory.remove(potion)
-            heal_amount = potion.power * 5
-            events.append(f"{self.name} использует {potion.name}!")
-            events.append(self.heal(heal_amount))
-
-        # Случайное событие во время отдыха
-        if random.random() < 0.2:
-            event = random.choice([
-                f"{self.name} размышляет о жизни...",
-                f"{self.name} чистит свое снаряжение",
-                f"{self.name} перекусывает"
-            ])
-            events.append(event)
-
-        # Возвращение к исследованию
-        if self.health > self.max_health * 0.7 or random.random() < 0.5:
-            self.state = "exploring"
-            events.append(f"{self.name} возобновляет исследование.")
-
-        return events
-
-    def update(self, world):
-        if not self.is_alive:
-            return []
-
-        events = []
-        self.apply_bonuses()
-
-        # Выбор действия в зависимости от состояния
-        if self.state == "exploring":
-            events.extend(self.explore(world))
-        elif self.state == "fighting":
-            events.extend(self.fight(world))
-        elif self.state == "resting":
-            events.extend(self.rest())
-
-        # Проверка необходимости отдыха
-        if self.health < self.max_health * 0.4 and self.state != "fighting":
-            self.state = "resting"
-            events.append(f"{self.name} решает отдохнуть.")
-
-        # Случайная смена состояния
-        if random.random() < 0.1:
-            if self.state == "exploring":
-                self.state = "resting"
-                events.append(f"{self.name} решает сделать перерыв.")
-            elif self.state == "resting":
-                self.state = "exploring"
-                events.append(f"{self.name} решает продолжить исследование.")
-
-        return events
-
-    def equip_artifact(self, artifact):
-        if artifact.type == ArtifactType.WEAPON:
-            slot = "weapon"
-        elif artifact.type == ArtifactType.ARMOR:
-            slot = "armor"
-        elif artifact.type == ArtifactType.RING:
-            slot = "ring"
-        elif artifact.type == ArtifactType.AMULET:
-            slot = "amulet"
-        elif artifact.type == ArtifactType.RELIC:
-            slot = "relic"
-        else:
-            return f"{artifact.name} нельзя экипировать"
-
-        old_item = self.equipment[slot]
-        if old_item:
-            self.inventory.append(old_item)
-
-        self.equipment[slot] = artifact
-        self.inventory.remove(artifact)
-        return f"{self.name} экипирует {artifact.name}"
-
-class Monster(NPC):
-    def __init__(self, name, monster_type, power):
-        super().__init__(name)
-        self.monster_type = monster_type
-        self.power = power
-        self.health = power * 2
-        self.max_health = self.health
-        self.gold = random.randint(5, 20) * power // 10
-
-    def special_attack(self, target):
-        attacks = {
-            MonsterType.DRAGON: ("Огненное дыхание", 50),
-            MonsterType.UNDEAD: ("Проклятие", 30),
-            MonsterType.DEMON: ("Адское пламя", 40),
-            MonsterType.TROLL: ("Мощный удар", 35),
-            MonsterType.GOBLIN: ("Грязный трюк", 20),
-            MonsterType.ORC: ("Берсеркерская ярость", 30),
-            MonsterType.ELEMENTAL: ("Стихийный удар", 45)
-        }
-        name, base_damage = attacks.get(self.monster_type, ("Атака", 25))
-        damage = base_damage + random.randint(0, self.power)
-        result = target.take_damage(damage)
-
-        # Специальные эффекты
-        if self.monster_type == MonsterType.UNDEAD:
-            target.add_status(StatusEffect.POISONED, 3)
-        elif self.monster_type == MonsterType.DEMON:
-            target.add_status(StatusEffect.BURNING, 2)
-        elif self.monster_type == MonsterType.ELEMENTAL:
-            target.add_status(StatusEffect.FROZEN if random.random() < 0.5 else StatusEffect.BURNING, 2)
-        return f"{self.name} использует {name}! {result}"
-
-class Location:
-    def __init__(self, name, danger_level):
-        self.name = name
-        self.danger_level = danger_level
-        self.artifacts = []
-        self.monsters = []
-        self.generate_content()
-
-    def generate_content(self):
-        # Генерация артефактов
-        artifact_count = random.randint(0, 3 + self.danger_level)
-        bonus_types = [
-            "HP", "Мана", "Урон", "Защита",
-            "Крит", "Скорость", "Регенерация"
-        ]
-        for _ in range(artifact_count):
-            artifact_type = random.choice(list(ArtifactType))
-            power = random.randint(1, 10) * self.danger_level
-            bonus_type = random.choice(bonus_types)
-
-            names = {
-                ArtifactType.WEAPON: ["Меч", "Топор", "Кинжал", "Посох", "Лук", "Молот"],
-                ArtifactType.ARMOR: ["Доспех", "Щит", "Шлем", "Перчатки", "Сапоги"],
-                ArtifactType.POTION: ["Зелье здоровья", "Зелье маны", "Яд", "Эликсир"],
-                ArtifactType.SCROLL: ["Свиток огня", "Свиток льда", "Свиток молнии"],
-                ArtifactType.RING: ["Кольцо силы", "Кольцо защиты", "Кольцо магии"],
-                ArtifactType.AMULET: ["Амулет здоровья", "Амулет маны", "Амулет защиты"],
-                ArtifactType.RELIC: ["Реліквія древних", "Священный артефакт"],
-                ArtifactType.TOME: ["Том знаний", "Гримуар"]
-            }
-            name = random.choice(names.get(artifact_type, ["Таинственный предмет"]))
-            self.artifacts.append(Artifact(name, artifact_type, power, bonus_type))
-
-        # Генерация монстров
-        monster_count = random.randint(1, 2 + self.danger_level)
-        for _ in range(monster_count):
-            monster_type = random.choice(list(MonsterType))
-            power = random.randint(5, 15) * self.danger_level
-            name = f"{monster_type.value} ур.{self.danger_level}"
-            self.monsters.append(Monster(name, monster_type, power))
-
-    def get_artifact(self):
-        if self.artifacts:
-            return self.artifacts.pop()
-        return None
-
-    def get_monster(self):
-        if self.monsters:
-            return random.choice(self.monsters)
-        return None
-
-# ========== КЛАССЫ ИГРОВЫХ ПЕРСОНАЖЕЙ ==========
-class Mage(NPC):
-    def __init__(self, name):
-        super().__init__(name)
-        self.mana = 150 + random.randint(0, 50)
-        self.max_mana = self.mana
-        self.known_spells = [SpellType.FIREBALL, SpellType.ICE_SHACKLES]
-        self.bonuses["Мана"] += 20
-
-    def cast_spell(self, spell: SpellType, target=None):
-        base_result = super().cast_spell(spell, target)
-        if "не может" in base_result or "не знает" in base_result:
-            return base_result
-
-        if self.mana < 20:
-            return "Недостаточно маны"
-
-        self.mana -= 20
-        message = f"{self.name} кастует {spell.value}"
-
-        if spell == SpellType.FIREBALL and target:
-            damage = 25 + self.bonuses["Урон"]
-            target.take_damage(damage)
-            target.add_status(StatusEffect.BURNING, 3)
-            message += f". {target.name} получает {damage} урона!"
-
-        elif spell == SpellType.ICE_SHACKLES and target:
-            target.add_status(StatusEffect.FROZEN, 2)
-            message += f". {target.name} заморожен!"
-
-        return message
-
-
-class Archmage(Mage):
-    def __init__(self, name):
-        super().__init__(name)
-        self.known_spells.append(SpellType.LIGHTNING)
-        self.known_spells.append(SpellType.SHIELD)
-        self.bonuses["Урон"] += 10
-        self.bonuses["Мана"] += 30
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.LIGHTNING and target:
-            if self.mana < 30:
-                return "Недостаточно маны"
-            self.mana -= 30
-            damage = 40 + self.bonuses["Урон"]
-            target.take_damage(damage)
-            return f"{self.name} поражает {target.name} молнией ({damage} урона)"
-
-        elif spell == SpellType.SHIELD:
-            if self.mana < 25:
-                return "Недостаточно маны"
-            self.mana -= 25
-            self.add_status(StatusEffect.SHIELDED, 3)
-            return f"{self.name} создает магический щит"
-
-        return super().cast_spell(spell, target)
-
-
-class Necromancer(Mage):
-    def __init__(self, name):
-        super().__init__(name)
-        self.known_spells.append(SpellType.POISON_CLOUD)
-        self.bonuses["Регенерация"] += 5
-        self.max_health += 20
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.POISON_CLOUD and target:
-            if self.mana < 35:
-                return "Недостаточно маны"
-            self.mana -= 35
-            target.add_status(StatusEffect.POISONED, 4)
-            return f"{self.name} создает ядовитое облако вокруг {target.name}"
-        return super().cast_spell(spell, target)
-
-
-class Warrior(NPC):
-    def __init__(self, name):
-        super().__init__(name)
-        self.max_health = 150 + random.randint(0, 30)
-        self.health = self.max_health
-        self.bonuses["Защита"] += 5
-
-    def attack(self, target):
-        weapon_power = self.equipment["weapon"].power if self.equipment["weapon"] else 0
-        damage = random.randint(15 + weapon_power, 25 + weapon_power * 2) + self.bonuses["Урон"]
-        return f"{self.name} мощно атакует {target.name}: {target.take_damage(damage)}"
-
-
-class Berserker(Warrior):
-    def __init__(self, name):
-        super().__init__(name)
-        self.bonuses["Урон"] += 15
-        self.bonuses["Защита"] -= 3
-        self.max_health += 20
-
-    def attack(self, target):
-        damage_bonus = self.max_health - self.health  # Чем меньше HP, тем сильнее атака
-        weapon_power = self.equipment["weapon"].power if self.equipment["weapon"] else 0
-        damage = random.randint(20 + weapon_power, 30 + weapon_power * 2) + damage_bonus // 2
-        return f"{self.name} впадает в ярость! {target.take_damage(damage)}"
-
-
-class Paladin(Warrior):
-    def __init__(self, name):
-        super().__init__(name)
-        self.known_spells = [SpellType.HEAL, SpellType.HOLY_LIGHT]
-        self.bonuses["Защита"] += 10
-        self.max_health += 30
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.HEAL:
-            if target:
-                heal_amount = 30 + self.bonuses["HP"]
-                return f"{self.name} исцеляет {target.name}: {target.heal(heal_amount)}"
-        elif spell == SpellType.HOLY_LIGHT:
-            if isinstance(self.target, Monster) and self.target.monster_type == MonsterType.UNDEAD:
-                damage = 50 + self.bonuses["Урон"]
-                return f"{self.name} изгоняет нечисть: {self.target.take_damage(damage)}"
-            return f"{self.name} излучает священный свет, но ничего не происходит"
-        return super().cast_spell(spell, target)
-
-class Rogue(NPC):
-    def __init__(self, name):
-        super().__init__(name)
-        self.stealth = True
-        self.bonuses["Крит"] += 15
-        self.bonuses["Скорость"] += 5
-
-    def attack(self, target):
-        if self.stealth:
-            weapon_power = self.equipment["weapon"].power if self.equipment["weapon"] else 0
-            damage = random.randint(20 + weapon_power * 2, 35 + weapon_power * 2) + self.bonuses["Урон"]
-            self.stealth = False
-            return f"{self.name} бьёт в спину: {target.take_damage(damage)}"
-        else:
-            weapon_power = self.equipment["weapon"].power if self.equipment["weapon"] else 0
-            damage = random.randint(10 + weapon_power, 15 + weapon_power) + self.bonuses["Урон"]
-            self.stealth = random.random() < 0.5  # 50% шанс скрыться
-            return f"{self.name} атакует {target.name}: {target.take_damage(damage)}"
-
-
-class Assassin(Rogue):
-    def __init__(self, name):
-        super().__init__(name)
-        self.bonuses["Урон"] += 20
-        self.bonuses["Защита"] -= 5
-        self.known_spells = [SpellType.POISON_CLOUD]
-
-    def attack(self, target):
-        result = super().attack(target)
-        if not self.stealth and random.random() < 0.3:
-            target.add_status(StatusEffect.POISONED, 3)
-            result += f" и отравляет {target.name}"
-        return result
-
-
-class Shadowdancer(Rogue):
-    def __init__(self, name):
-        super().__init__(name)
-        self.bonuses["Скорость"] += 10
-        self.bonuses["Крит"] += 10
-        self.known_spells = [SpellType.STUN]
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.STUN and target:
-            target.add_status(StatusEffect.STUNNED, 2)
-            return f"{self.name} оглушает {target.name}"
-        return super().cast_spell(spell, target)
-
-
-class Priest(NPC):
-    def __init__(self, name):
-        super().__init__(name)
-        self.mana = 100
-        self.max_mana = 100
-        self.known_spells = [SpellType.HEAL, SpellType.HOLY_LIGHT]
-        self.bonuses["HP"] += 30
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.HEAL:
-            if self.mana < 25:
-                return "Недостаточно маны"
-            self.mana -= 25
-            heal_amount = 40 + self.bonuses["HP"]
-            if target:
-                return f"{self.name} исцеляет {target.name}: {target.heal(heal_amount)}"
-            return f"{self.name} исцеляет себя: {self.heal(heal_amount)}"
-
-        elif spell == SpellType.HOLY_LIGHT:
-            if self.mana < 40:
-                return "Недостаточно маны"
-            self.mana -= 40
-            if isinstance(self.target, Monster) and self.target.monster_type in [MonsterType.UNDEAD, MonsterType.DEMON]:
-                damage = 35 + self.bonuses["Урон"]
-                return f"{self.name} изгоняет нечисть: {self.target.take_damage(damage)}"
-            return f"{self.name} излучает священный свет, но ничего не происходит"
-
-        return super().cast_spell(spell, target)
-
-
-class Inquisitor(Priest):
-    def __init__(self, name):
-        super().__init__(name)
-        self.known_spells.append(SpellType.FIREBALL)
-        self.bonuses["Урон"] += 10
-        self.bonuses["Мана"] += 20
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.FIREBALL and target:
-            if self.mana < 30:
-                return "Недостаточно маны"
-            self.mana -= 30
-            damage = 30 + self.bonuses["Урон"]
-            target.take_damage(damage)
-            if isinstance(target, Monster) and target.monster_type == MonsterType.UNDEAD:
-                damage *= 1.5
-                target.take_damage(damage)
-                return f"{self.name} сжигает нежить священным огнем: {damage} урона"
-            return f"{self.name} метает огненный шар: {damage} урона"
-        return super().cast_spell(spell, target)
-
-
-class Druid(Priest):
-    def __init__(self, name):
-        super().__init__(name)
-        self.known_spells.append(SpellType.ICE_SHACKLES)
-        self.bonuses["Регенерация"] += 10
-        self.max_health += 20
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.ICE_SHACKLES and target:
-            if self.mana < 25:
-                return "Недостаточно маны"
-            self.mana -= 25
-            target.add_status(StatusEffect.FROZEN, 2)
-            target.add_status(StatusEffect.REGENERATION, 3)  # Друид замораживает и одновременно лечит
-            return f"{self.name} сковывает {target.name} льдом и дает регенерацию"
-        return super().cast_spell(spell, target)
-
-class Archer(NPC):
-    def __init__(self, name):
-        super().__init__(name)
-        self.bonuses["Крит"] += 20
-        self.bonuses["Скорость"] += 10
-        self.max_health += 10
-
-    def attack(self, target):
-        weapon_power = self.equipment["weapon"].power if self.equipment["weapon"] else 0
-        base_damage = random.randint(10 + weapon_power, 20 + weapon_power)
-
-        # Учет критического урона
-        crit_chance = (self.bonuses["Крит"] + 20) / 100  # +20% базовый шанс крита для лучника
-        if random.random() < crit_chance:
-            base_damage *= 2.5  # Больший множитель крита для лучника
-            damage_msg = f"Критический выстрел! {base_damage} урона"
-        else:
-            damage_msg = f"{base_damage} урона"
-
-        total_damage = base_damage + self.bonuses["Урон"]
-        result = target.take_damage(total_damage)
-        return f"{self.name} стреляет в {target.name} ({damage_msg}): {result}"
-
-
-class Sniper(Archer):
-    def __init__(self, name):
-        super().__init__(name)
-        self.bonuses["Урон"] += 15
-        self.bonuses["Скорость"] += 5
-        self.bonuses["Крит"] += 10
-
-    def attack(self, target):
-        # Снайпер имеет шанс на мгновенное убийство слабых врагов
-        if isinstance(target, Monster) and target.health < target.max_health * 0.3 and random.random() < 0.3:
-            target.health = 0
-            target.die()
-            return f"{self.name} убивает {target.name} одним точным выстрелом!"
-        return super().attack(target)
-
-
-class Ranger(Archer):
-    def __init__(self, name):
-        super().__init__(name)
-        self.known_spells = [SpellType.POISON_CLOUD]
-        self.bonuses["Регенерация"] += 5
-        self.max_health += 20
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.POISON_CLOUD and target:
-            target.add_status(StatusEffect.POISONED, 4)
-            return f"{self.name} стреляет отравленной стрелой в {target.name}"
-        return super().cast_spell(spell, target)
-
-
-class Alchemist(NPC):
-    def __init__(self, name):
-        super().__init__(name)
-        self.bonuses["Регенерация"] += 15
-        self.max_health += 50
-        self.known_spells = [SpellType.POISON_CLOUD]
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.POISON_CLOUD and target:
-            target.add_status(StatusEffect.POISONED, 5)
-            return f"{self.name} бросает ядовитую бомбу в {target.name}"
-        return super().cast_spell(spell, target)
-
-    def rest(self):
-        events = super().rest()
-        # Алхимик создает зелья во время отдыха
-        if random.random() < 0.5:
-            potion_type = random.choice(["health", "mana"])
-            power = random.randint(5, 15)
-            potion = Artifact(f"Зелье {'здоровья' if potion_type == 'health' else 'маны'}",
-                              ArtifactType.POTION, power, "HP" if potion_type == "health" else "Мана")
-            self.inventory.append(potion)
-            events.append(f"{self.name} создает {potion.name} во время отдыха")
-        return events
-
-
-class Bomber(Alchemist):
-    def __init__(self, name):
-        super().__init__(name)
-        self.known_spells.append(SpellType.FIREBALL)
-        self.bonuses["Урон"] += 10
-        self.max_health -= 20
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.FIREBALL and target:
-            damage = 40 + self.bonuses["Урон"]
-            target.take_damage(damage)
-            target.add_status(StatusEffect.BURNING, 3)
-            return f"{self.name} бросает взрывную смесь: {damage} урона"
-        return super().cast_spell(spell, target)
-
-
-class Transmuter(Alchemist):
-    def __init__(self, name):
-        super().__init__(name)
-        self.bonuses["Мана"] += 50
-        self.known_spells = [SpellType.HEAL, SpellType.SHIELD]
-
-    def cast_spell(self, spell: SpellType, target=None):
-        if spell == SpellType.SHIELD:
-            if target:
-                target.add_status(StatusEffect.SHIELDED, 4)
-                return f"{self.name} создает защитный барьер вокруг {target.name}"
-            self.add_status(StatusEffect.SHIELDED, 4)
-            return f"{self.name} создает защитный барьер"
-        return super().cast_spell(spell, target)
-
-
-# ========== КЛАСС МОНСТРА ==========
-class Monster(NPC):
-    def __init__(self, name, monster_type, power):
-        super().__init__(name)
-        self.monster_type = monster_type
-        self.power = power
-        self.health = power * 2
-        self.max_health = self.health
-        self.gold = random.randint(5, 20) * power // 10
-
-    def special_attack(self, target):
-        attacks = {
-            MonsterType.DRAGON: ("Огненное дыхание", 50),
-            MonsterType.UNDEAD: ("Проклятие", 30),
-            MonsterType.DEMON: ("Адское пламя", 40),
-            MonsterType.TROLL: ("Мощный удар", 35),
-            MonsterType.GOBLIN: ("Грязный трюк", 20),
-            MonsterType.ORC: ("Берсеркерская ярость", 30),
-            MonsterType.ELEMENTAL: ("Стихийный удар", 45)
-        }
-        name, base_damage = attacks.get(self.monster_type, ("Атака", 25))
-        damage = base_damage + random.randint(0, self.power)
-        result = target.take_damage(damage)
-
-        # Специальные эффекты
-        if self.monster_type == MonsterType.UNDEAD:
-            target.add_status(StatusEffect.POISONED, 3)
-        elif self.monster_type == MonsterType.DEMON:
-            target.add_status(StatusEffect.BURNING, 2)
-        elif self.monster_type == MonsterType.ELEMENTAL:
-            target.add_status(StatusEffect.FROZEN if random.random() < 0.5 else StatusEffect.BURNING, 2)
-        return f"{self.name} использует {name}! {result}"
-
-
-# ========== СИСТЕМА МИРА ==========
-class GameWorld:
-    def __init__(self):
-        self.npcs = []
-        self.monsters = []
-        self.locations = [
-            Location("Лес", 1),
-            Location("Пещеры", 2),
-            Location("Горы", 3),
-            Location("Подземелье", 4),
-            Location("Храм", 3),
-            Location("Лаборатория", 5)
-        ]
-        self.event_log = []
-        self.is_running = False
-        self.simulation_speed = 1.0
-        self.turn_count = 0
-
-    def add_npc(self, npc):
-        self.npcs.append(npc)
-        self.log_event(npc.join_party())
-
-    def add_multiple_npcs(self, npc_list):
-        for npc in npc_list:
-            self.add_npc(npc)
-
-    def log_event(self, event):
-        self.event_log.append(event)
-        if len(self.event_log) > 1000:
-            self.event_log = self.event_log[-1000:]
-
-    def simulate_turn(self):
-        if not self.is_running:
+from rpg_engine import GameWorld, create_character
+from rpg_bridge import SimulationBridge, TurnScheduler, RateMeter
+from rpg_profiler import TurnProfiler
+
+# tkinter и Pillow импортируются в load_gui() при создании GameGUI:
+# импорт этого модуля не требует ни дисплея, ни библиотек интерфейса
+tk = ttk = messagebox = filedialog = None
+Image = ImageTk = ImageDraw = ImageFont = None
+
+MAX_FPS = 20  # Предел частоты обновления интерфейса
+LOG_WINDOW = 500  # Строк журнала в виджете одновременно
+LOG_PAGE = 100  # Строк, подгружаемых при прокрутке к краю окна
+LOG_HISTORY = 50000  # Событий в журнале мира для прокрутки назад
+
+
+def load_gui():
+    """Отложенный импорт модулей интерфейса; повторный вызов ничего не делает"""
+    global tk, ttk, messagebox, filedialog, Image, ImageTk, ImageDraw, ImageFont
+    if tk is not None:
+        return
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+    from PIL import Image, ImageTk, ImageDraw, ImageFont
+
+
+# ========== ЖУРНАЛ СОБЫТИЙ ==========
+class LogView:
+    """Журнал событий с ограниченным окном строк в tk.Text.
+
+    Строки окна идут подряд: строка i показывает событие first_seq + i - 1.
+    Пока пользователь внизу, новые события добавляются одной вставкой за
+    кадр, а верхние строки срезаются. При прокрутке к краю окна страница
+    подгружается из журнала мира через fetch(start, stop), а противоположный
+    край срезается, так что в виджете не больше window строк.
+    """
+
+    def __init__(self, text, scrollbar, fetch, tag_for, window=LOG_WINDOW, page=LOG_PAGE):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.fetch = fetch
+        self.tag_for = tag_for
+        self.window = window
+        self.page = page
+        self.follow = True  # Окно прижато к последним событиям
+        self.check_scheduled = False
+        self.reset()
+        text.config(yscrollcommand=self.on_scroll)
+        text.bind("<End>", lambda e: self.follow_tail())
+
+    def reset(self, latest_seq=0):
+        """Пустое окно в конце журнала"""
+        self.latest_seq = latest_seq  # Последнее известное событие мира
+        self.first_seq = latest_seq + 1
+        self.last_seq = latest_seq
+        self.follow = True
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.config(state=tk.DISABLED)
+
+    @property
+    def lines(self):
+        return self.last_seq - self.first_seq + 1
+
+    @property
+    def unseen(self):
+        """Сколько новых событий не показано, пока окно прокручено назад"""
+        return self.latest_seq - self.last_seq
+
+    def chunks(self, events):
+        """Аргументы для одной вставки: текст и тег каждого события подряд"""
+        args = []
+        for seq, event in events:
+            args.append(f"{event}\n")
+            args.append(self.tag_for(event))
+        return args
+
+    def append(self, events):
+        """Новые события из моста; показываются, только если окно в конце"""
+        events = [(seq, event) for seq, event in events if seq > self.latest_seq]
+        if not events:
+            return
+        self.latest_seq = events[-1][0]
+        if not self.follow:
             return
 
-        self.turn_count += 1
-        events = []
-
-        # Обновляем всех NPC
-        for npc in self.npcs:
-            if npc.is_alive:
-                npc_events = npc.update(self)
-                for event in npc_events:
-                    self.log_event(event)
-
-        # Обновляем всех монстров
-        for monster in list(self.monsters):
-            if monster.is_alive:
-                monster_events = monster.update(self)
-                for event in monster_events:
-                    self.log_event(event)
+        self.text.config(state=tk.NORMAL)
+        if len(events) >= self.window or events[0][0] != self.last_seq + 1:
+            # Пачка больше окна (или мост склеил ходы): окно строится заново
+            events = events[-self.window:]
+            self.text.delete("1.0", tk.END)
+            self.first_seq = events[0][0]
+        self.text.insert(tk.END, *self.chunks(events))
+        self.last_seq = events[-1][0]
+        self.trim_top()
+        self.text.config(state=tk.DISABLED)
+        self.text.see(tk.END)
+
+    def trim_top(self):
+        excess = self.lines - self.window
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.first_seq += excess
+
+    def trim_bottom(self):
+        excess = self.lines - self.window
+        if excess > 0:
+            self.text.delete(f"{self.window + 1}.0", tk.END)
+            self.last_seq -= excess
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Подгрузка после обработки прокрутки, чтобы не менять виджет внутри колбэка
+        if not self.check_scheduled:
+            self.check_scheduled = True
+            self.text.after_idle(self.check_edges)
+
+    def check_edges(self):
+        self.check_scheduled = False
+        top, bottom = self.text.yview()
+        if bottom >= 1.0:
+            if self.last_seq < self.latest_seq:
+                self.page_newer()
             else:
-                self.monsters.remove(monster)
-
-        # Генерация случайных событий
-        if random.random() < 0.1:
-            event = random.choice([
-                "Над миром проносится странный ветер...",
-                "Где-то вдалеке слышен странный шум",
-                "Небо на мгновение становится красным",
-                "Земля слегка дрожит под ногами",
-                "В воздухе ощущается магическая энергия"
-            ])
-            self.log_event(event)
-
-        # Генерация новых монстров
-        if self.turn_count % 5 == 0:
-            for location in self.locations:
-                if random.random() < 0.3:
-                    monster = location.get_monster()
-                    if monster:
-                        self.monsters.append(monster)
-                        self.log_event(f"В локации {location.name} появился {monster.name}")
-
-    def start_simulation(self):
-        self.is_running = True
-        self.log_event("=== СИМУЛЯЦИЯ НАЧИНАЕТСЯ ===")
-        self.turn_count = 0
+                self.follow = True
+        else:
+            self.follow = False
+            if top <= 0.0:
+                self.page_older()
 
-    def stop_simulation(self):
-        self.is_running = False
-        self.log_event("=== СИМУЛЯЦИЯ ОСТАНОВЛЕНА ===")
-
-    def get_stats(self):
-        stats = {
-            "alive_npcs": [npc for npc in self.npcs if npc.is_alive],
-            "dead_npcs": [npc for npc in self.npcs if not npc.is_alive],
-            "alive_monsters": len([m for m in self.monsters if m.is_alive]),
-            "locations": len(self.locations),
-            "turn_count": self.turn_count
-        }
-        return stats
+    def page_older(self):
+        events = self.fetch(self.first_seq - self.page, self.first_seq)
+        if not events:
+            return
+        self.text.config(state=tk.NORMAL)
+        self.text.insert("1.0", *self.chunks(events))
+        self.first_seq = events[0][0]
+        self.trim_bottom()
+        self.text.config(state=tk.DISABLED)
+        # Прежняя верхняя строка остается на месте
+        self.text.yview(f"{len(events) + 1}.0")
+
+    def page_newer(self):
+        events = self.fetch(self.last_seq + 1, self.last_seq + 1 + self.page)
+        if not events or events[0][0] != self.last_seq + 1:
+            # Нужные события уже вытеснены из журнала
+            self.follow_tail()
+            return
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(tk.END, *self.chunks(events))
+        self.last_seq = events[-1][0]
+        self.trim_top()
+        self.text.config(state=tk.DISABLED)
+        self.follow = self.last_seq >= self.latest_seq
+        # Прежняя нижняя строка остается в поле зрения
+        self.text.see(tk.END if self.follow else f"{self.lines - len(events)}.0")
+
+    def follow_tail(self):
+        """Переход к последним событиям"""
+        latest = self.latest_seq
+        events = self.fetch(latest - self.window + 1, latest + 1)
+        self.reset(latest)
+        if events:
+            self.first_seq = events[0][0]
+            self.text.config(state=tk.NORMAL)
+            self.text.insert(tk.END, *self.chunks(events))
+            self.text.config(state=tk.DISABLED)
+        self.text.see(tk.END)
 
 
 # ========== ГРАФИЧЕСКИЙ ИНТЕРФЕЙС ==========
 class GameGUI:
     def __init__(self, root):
+        load_gui()
         self.root = root
-        self.game_world = GameWorld()
+        self.game_world = GameWorld(event_log_capacity=LOG_HISTORY)
         self.simulation_thread = None
+        self.world_lock = threading.Lock()  # Мир меняет только владелец блокировки
+        self.bridge = SimulationBridge()
+        self.scheduler = TurnScheduler(self.game_world.simulation_speed)
+        self.rate_meter = RateMeter()
+        self.frame_interval = 1000 // MAX_FPS  # Период кадра интерфейса, мс
         self.class_images = {}  # Для хранения изображений классов
-        self.prev_log_length = 0  # Добавляем инициализацию
+        self.log_view = None  # Создается в create_log_panel
+        self.log_title = None
+        self.hero_rows = {}  # Строки панели героев по id персонажа
+        self.dead_view = None  # Последний показанный список погибших
         self.image_dir = os.path.join(os.path.dirname(__file__), "images")
         self.load_images()
 
@@ -979,6 +227,7 @@ class GameGUI:
         self.center_window()
         self.setup_event_handlers()
         self.update_ui()
+        self.root.after(self.frame_interval, self.poll_simulation)
 
     def load_images(self):
         """Загрузка изображений для классов с улучшенной обработкой ошибок"""
@@ -1225,6 +474,27 @@ class GameGUI:
         )
         self.speed_label.pack(side=tk.LEFT)
 
+        self.unlimited_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            speed_frame,
+            text="Без ограничений",
+            variable=self.unlimited_var,
+            command=self.update_speed,
+            bg="#3b4252",
+            fg="#e5e9f0",
+            selectcolor="#434c5e",
+            activebackground="#3b4252",
+            font=("Georgia", 10)
+        ).pack(side=tk.LEFT, padx=(10, 0))
+
+        self.rate_label = ttk.Label(
+            speed_frame,
+            text="0.0 ход/с",
+            width=12,
+            font=("Georgia", 10)
+        )
+        self.rate_label.pack(side=tk.LEFT, padx=(10, 0))
+
     def create_log_panel(self):
         """Панель журнала событий"""
         log_frame = ttk.LabelFrame(
@@ -1233,6 +503,7 @@ class GameGUI:
             padding=(10, 10)
         )
         log_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
+        self.log_frame = log_frame
 
         # Создаем текстовое поле с тегами для цветов
         self.log_text = tk.Text(
@@ -1254,7 +525,7 @@ class GameGUI:
         # Настраиваем полосу прокрутки
         scrollbar = ttk.Scrollbar(log_frame, command=self.log_text.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.log_text.config(yscrollcommand=scrollbar.set)
+        self.log_view = LogView(self.log_text, scrollbar, self.fetch_events, self.determine_log_color)
 
         # Добавляем теги для цветного текста
         for tag_name, color in self.log_colors.items():
@@ -1393,11 +664,31 @@ class GameGUI:
             accelerator="F6"
         )
         world_menu.add_separator()
+        world_menu.add_command(
+            label="Сохранить мир...",
+            command=self.save_world,
+            accelerator="Ctrl+S"
+        )
+        world_menu.add_command(
+            label="Загрузить мир...",
+            command=self.load_world,
+            accelerator="Ctrl+O"
+        )
+        world_menu.add_separator()
         world_menu.add_command(
             label="Очистить лог",
             command=self.clear_log,
             accelerator="Ctrl+L"
         )
+        world_menu.add_separator()
+        self.profile_var = tk.BooleanVar(value=self.game_world.profiler is not None)
+        world_menu.add_checkbutton(
+            label="Замер фаз хода",
+            variable=self.profile_var,
+            command=self.toggle_profiler
+        )
+        world_menu.add_command(label="Время фаз хода", command=self.show_profile)
+        world_menu.add_command(label="Записать трассу (100 ходов)...", command=self.record_trace)
         menubar.add_cascade(label="Мир", menu=world_menu)
 
         # Меню "Помощь"
@@ -1428,6 +719,8 @@ class GameGUI:
         self.root.bind('<F5>', lambda e: self.start_simulation())
         self.root.bind('<F6>', lambda e: self.stop_simulation())
         self.root.bind('<Control-l>', lambda e: self.clear_log())
+        self.root.bind('<Control-s>', lambda e: self.save_world())
+        self.root.bind('<Control-o>', lambda e: self.load_world())
 
     def center_window(self):
         """Центрирование окна на экране"""
@@ -1442,14 +735,109 @@ class GameGUI:
         """Обновление скорости симуляции"""
         speed = round(self.speed_var.get(), 1)
         self.game_world.simulation_speed = speed
-        self.speed_label.config(text=f"{speed}x")
+        if self.unlimited_var.get():
+            self.scheduler.set_rate(None)
+            self.speed_label.config(text="∞")
+        else:
+            self.scheduler.set_rate(speed)
+            self.speed_label.config(text=f"{speed}x")
+
+    def fetch_events(self, start, stop):
+        """События из журнала мира для прокрутки назад"""
+        with self.world_lock:
+            return self.game_world.event_log.events_range(start, stop)
 
     def clear_log(self):
         """Очистка лога событий"""
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.config(state=tk.DISABLED)
-        self.game_world.event_log = []
+        with self.world_lock:
+            self.game_world.event_log.clear()
+        self.log_view.reset(self.log_view.latest_seq)
+
+    def toggle_profiler(self):
+        """Включение и выключение замера фаз хода"""
+        with self.world_lock:
+            self.game_world.profiler = TurnProfiler(per_class=True) if self.profile_var.get() else None
+
+    def show_profile(self):
+        """Перцентили длительности фаз за последние ходы"""
+        with self.world_lock:
+            profiler = self.game_world.profiler
+            text = profiler.format_summary() if profiler and profiler.samples else None
+        if text is None:
+            messagebox.showinfo("Время фаз хода", "Включите замер фаз и запустите симуляцию.", parent=self.root)
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Время фаз хода")
+        view = tk.Text(window, font=("Consolas", 10), width=70, height=min(30, text.count("\n") + 2))
+        view.insert(tk.END, text)
+        view.config(state=tk.DISABLED)
+        view.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    def record_trace(self):
+        """Трасса Chrome/Perfetto для следующих 100 ходов; файл пишется по их окончании"""
+        path = filedialog.asksaveasfilename(
+            parent=self.root,
+            title="Записать трассу",
+            defaultextension=".json",
+            filetypes=[("Trace Event JSON", "*.json"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        with self.world_lock:
+            if self.game_world.profiler is None:
+                self.game_world.profiler = TurnProfiler(per_class=True)
+            self.game_world.profiler.start_trace(100, path)
+        self.profile_var.set(True)
+
+    def save_world(self):
+        """Сохранение мира в файл снимка"""
+        path = filedialog.asksaveasfilename(
+            parent=self.root,
+            title="Сохранить мир",
+            defaultextension=".rpgw",
+            filetypes=[("Снимок мира", "*.rpgw"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            with self.world_lock:
+                self.game_world.save(path)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить мир: {e}", parent=self.root)
+
+    def load_world(self):
+        """Загрузка мира из файла снимка"""
+        path = filedialog.askopenfilename(
+            parent=self.root,
+            title="Загрузить мир",
+            filetypes=[("Снимок мира", "*.rpgw"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            world = GameWorld.load(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить мир: {e}", parent=self.root)
+            return
+
+        self.stop_simulation()
+        # Запуск продолжит снимок с его хода: start_simulation счетчик не сбрасывает
+        world.is_running = False
+        world.simulation_speed = self.game_world.simulation_speed
+        world.profiler = self.game_world.profiler
+        with self.world_lock:
+            self.game_world = world
+            self.bridge.reset(world.event_log.last_seq)
+        self.rate_meter.reset()
+
+        # Панели строятся заново для нового мира
+        for row in self.hero_rows.values():
+            row["frame"].destroy()
+        self.hero_rows = {}
+        self.dead_view = None
+        self.log_view.reset(world.event_log.last_seq)
+        self.update_ui()
 
     def on_close(self):
         """Обработчик закрытия окна"""
@@ -1502,6 +890,8 @@ class GameGUI:
         Ctrl+G - Создать отряд
         F5 - Начать приключение
         F6 - Остановить время
+        Ctrl+S - Сохранить мир
+        Ctrl+O - Загрузить мир
         Ctrl+Q - Выйти из программы
         F1 - Эта справка
 
@@ -1666,7 +1056,8 @@ class GameGUI:
                 return
 
             char = self.create_character(char_class, subclass, name)
-            self.game_world.add_npc(char)
+            with self.world_lock:
+                self.game_world.add_npc(char)
             self.update_ui()
             dialog.destroy()
 
@@ -1779,7 +1170,8 @@ class GameGUI:
                 subclass = random.choice(self.classes[char_class])
                 npc_list.append(self.create_character(char_class, subclass, name))
 
-            self.game_world.add_multiple_npcs(npc_list)
+            with self.world_lock:
+                self.game_world.add_multiple_npcs(npc_list)
             self.update_ui()
             dialog.destroy()
 
@@ -1803,7 +1195,7 @@ class GameGUI:
         frame.pack(fill=tk.X, pady=5)
 
         # Иконка класса
-        class_name = npc.__class__.__bases__[0].__name__
+        class_name = npc.base_class
         if class_name not in self.class_images:
             class_name = "Маг"  # Запасной вариант
 
@@ -1816,53 +1208,34 @@ class GameGUI:
 
         ttk.Label(
             info_frame,
-            text=f"{npc.name} ({npc.__class__.__name__})",
+            text=f"{npc.name} ({npc.class_name})",
             font=("Georgia", 10, "bold")
         ).pack(anchor="w")
 
-        ttk.Label(
-            info_frame,
-            text=f"Ур. {npc.level}, HP: {npc.health}/{npc.max_health}",
-            font=("Georgia", 9)
-        ).pack(anchor="w")
+        stats_label = ttk.Label(info_frame, font=("Georgia", 9))
+        stats_label.pack(anchor="w")
 
-        ttk.Label(
-            info_frame,
-            text=f"Состояние: {npc.state}",
-            font=("Georgia", 9)
-        ).pack(anchor="w")
+        state_label = ttk.Label(info_frame, font=("Georgia", 9))
+        state_label.pack(anchor="w")
 
-        return frame
+        row = {"frame": frame, "stats": stats_label, "state": state_label, "texts": {}}
+        self.update_character_display(row, npc)
+        return row
+
+    def update_character_display(self, row, npc):
+        """Обновление строки персонажа: меняются только изменившиеся метки"""
+        texts = {
+            "stats": f"Ур. {npc.level}, HP: {npc.health}/{npc.max_health}",
+            "state": f"Состояние: {npc.state}"
+        }
+        for key, text in texts.items():
+            if row["texts"].get(key) != text:
+                row[key].config(text=text)
+                row["texts"][key] = text
 
     def create_character(self, class_name, subclass, name):
         """Создание экземпляра персонажа"""
-        class_map = {
-            "Маг": {
-                "Архимаг": Archmage,
-                "Некромант": Necromancer
-            },
-            "Воин": {
-                "Берсерк": Berserker,
-                "Паладин": Paladin
-            },
-            "Разбойник": {
-                "Ассасин": Assassin,
-                "Теневой плясун": Shadowdancer
-            },
-            "Жрец": {
-                "Инквизитор": Inquisitor,
-                "Друид": Druid
-            },
-            "Лучник": {
-                "Снайпер": Sniper,
-                "Рейнджер": Ranger
-            },
-            "Алхимик": {
-                "Бомбардир": Bomber,
-                "Трансмутатор": Transmuter
-            }
-        }
-        return class_map[class_name][subclass](name)
+        return create_character(class_name, subclass, name)
 
     def start_simulation(self):
         """Запуск симуляции"""
@@ -1875,7 +1248,9 @@ class GameGUI:
             return
 
         if not self.game_world.is_running:
-            self.game_world.start_simulation()
+            with self.world_lock:
+                self.bridge.reset(self.game_world.event_log.last_seq)
+                self.game_world.start_simulation()
             self.simulation_thread = threading.Thread(
                 target=self.run_simulation,
                 daemon=True
@@ -1886,140 +1261,102 @@ class GameGUI:
     def stop_simulation(self):
         """Остановка симуляции"""
         if self.game_world.is_running:
-            self.game_world.stop_simulation()
+            with self.world_lock:
+                self.game_world.stop_simulation()
+            self.scheduler.wake()
             self.update_ui()
 
     def run_simulation(self):
         """Основной цикл симуляции"""
         while self.game_world.is_running:
-            self.game_world.simulate_turn()
-            self.root.after(100, self.update_ui)
-            time.sleep(1.0 / self.game_world.simulation_speed)
-
-    def determine_log_color(self, message):
-        """Определение цвета сообщения в логе"""
-        message_lower = message.lower()
-
-        if any(word in message_lower for word in ["повержен", "умирает", "погиб"]):
-            return "death"
-        elif any(word in message_lower for word in ["атакует", "урон", "бьёт", "поражает"]):
-            return "combat"
-        elif any(word in message_lower for word in ["исцеляет", "восстанавливает", "регенерация"]):
-            return "heal"
-        elif any(word in message_lower for word in ["находит", "золота", "артефакт"]):
-            return "loot"
-        elif any(word in message_lower for word in ["уровень", "опыта", "достигает"]):
-            return "level"
-        elif any(word in message_lower for word in ["заклинание", "кастует", "магический"]):
-            return "spell"
-        elif any(word in message_lower for word in ["эффект", "отравлен", "заморожен", "горит"]):
-            return "status"
-        elif any(word in message_lower for word in ["монстр", "дракон", "гоблин", "тролль"]):
-            return "monster"
-        elif message.startswith("==="):
-            return "system"
-        else:
-            return "default"
-
-    def update_ui(self):
-        """Обновление интерфейса"""
-        # Обновление лога событий
-        self.log_text.config(state=tk.NORMAL)
-
-        # Добавляем только новые события
-        current_log_length = len(self.game_world.event_log)
-        prev_log_length = getattr(self, 'prev_log_length', 0)
-
-        if current_log_length > prev_log_length:
-            new_events = self.game_world.event_log[prev_log_length:]
-            for event in new_events:
-                color_tag = self.determine_log_color(event)
-                self.log_text.insert(tk.END, event + "\n", color_tag)
+            with self.world_lock:
+                self.game_world.simulate_turn()
+                self.bridge.publish(self.game_world)
+            self.scheduler.wait()
+
+    def poll_simulation(self):
+        """Кадр интерфейса: забираем накопленные ходы из очереди"""
+        snapshot, events = self.bridge.drain()
+        if snapshot is not None:
+            self.update_ui(snapshot, events)
+        self.root.after(self.frame_interval, self.poll_simulation)
+
+    def determine_log_color(self, event):
+        """Определение цвета сообщения в логе по виду события"""
+        return event.category if event.category in self.log_colors else "default"
+
+    def update_ui(self, snapshot=None, events=None):
+        """Обновление интерфейса по снимку мира.
+
+        Без аргументов снимок и события берутся из мира под блокировкой.
+        """
+        if snapshot is None:
+            with self.world_lock:
+                snapshot = self.game_world.snapshot()
+                events = self.game_world.event_log.events_since(self.log_view.latest_seq)
+
+        # Обновление лога событий: одна вставка за кадр
+        self.log_view.append(events)
+        unseen = self.log_view.unseen
+        log_title = f" Хроники приключений (новых: {unseen}, End - к концу) " if unseen else " Хроники приключений "
+        if log_title != self.log_title:
+            self.log_title = log_title
+            self.log_frame.config(text=log_title)
+
+        # Фактический темп симуляции
+        rate = self.rate_meter.update(snapshot.turn_count)
+        self.rate_label.config(text=f"{rate:.1f} ход/с" if snapshot.is_running else "0.0 ход/с")
 
-            self.log_text.see(tk.END)
-            self.prev_log_length = current_log_length
+        # Общая статистика
+        self.turn_label.config(text=f"Ход: {snapshot.turn_count}")
+        self.locations_label.config(text=f"Локации: {snapshot.locations}")
+        self.monsters_label.config(text=f"Монстры: {snapshot.alive_monsters}")
+
+        # Герои: одна постоянная строка на персонажа
+        self.heroes_label.config(text=f"Герои ({len(snapshot.alive_npcs)})")
+
+        alive_ids = set()
+        for npc in snapshot.alive_npcs:
+            alive_ids.add(npc.id)
+            row = self.hero_rows.get(npc.id)
+            if row is None:
+                self.hero_rows[npc.id] = self.create_character_display(self.heroes_frame, npc)
+            else:
+                self.update_character_display(row, npc)
 
-        self.log_text.config(state=tk.DISABLED)
+        for npc_id in [npc_id for npc_id in self.hero_rows if npc_id not in alive_ids]:
+            self.hero_rows.pop(npc_id)["frame"].destroy()
 
-        # Обновление статистики
-        stats = self.game_world.get_stats()
+        # Погибшие: список перестраивается только при изменениях
+        self.dead_label.config(text=f"Погибшие ({len(snapshot.dead_npcs)})")
 
-        # Общая статистика
-        self.turn_label.config(text=f"Ход: {stats['turn_count']}")
-        self.locations_label.config(text=f"Локации: {stats['locations']}")
-        self.monsters_label.config(text=f"Монстры: {stats['alive_monsters']}")
-
-        # Очистка предыдущих героев
-        for widget in self.heroes_frame.winfo_children():
-            widget.destroy()
-
-            # Добавление текущих героев с иконками
-        self.heroes_label.config(text=f"Герои ({len(stats['alive_npcs'])})")
-
-        for npc in stats['alive_npcs']:
-            self.create_character_display(self.heroes_frame, npc)
-
-        # Добавление текущих героев
-        self.heroes_label.config(text=f"Герои ({len(stats['alive_npcs'])})")
-
-        for npc in stats['alive_npcs']:
-            char_frame = ttk.Frame(self.heroes_frame)
-            char_frame.pack(fill=tk.X, pady=5)
-
-            # Иконка класса
-            class_icon = ttk.Label(char_frame, text="⚔", font=("Arial", 14))
-            class_icon.pack(side=tk.LEFT, padx=5)
-
-            # Информация о персонаже
-            info_frame = ttk.Frame(char_frame)
-            info_frame.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-            ttk.Label(
-                info_frame,
-                text=f"{npc.name} ({npc.__class__.__name__})",
-                font=("Georgia", 10, "bold")
-            ).pack(anchor="w")
-
-            ttk.Label(
-                info_frame,
-                text=f"Ур. {npc.level}, HP: {npc.health}/{npc.max_health}",
-                font=("Georgia", 9)
-            ).pack(anchor="w")
-
-            ttk.Label(
-                info_frame,
-                text=f"Состояние: {npc.state}",
-                font=("Georgia", 9)
-            ).pack(anchor="w")
-
-            # Разделитель
-            ttk.Separator(char_frame).pack(fill=tk.X, pady=2)
-
-        # Очистка предыдущих погибших
-        for widget in self.dead_heroes_frame.winfo_children():
-            widget.destroy()
-
-        # Добавление погибших героев
-        self.dead_label.config(text=f"Погибшие ({len(stats['dead_npcs'])})")
-
-        for npc in stats['dead_npcs'][:5]:  # Показываем только первых 5
-            ttk.Label(
-                self.dead_heroes_frame,
-                text=f"{npc.name} (ур. {npc.level})",
-                font=("Georgia", 9),
-                foreground="#bf616a"
-            ).pack(anchor="w")
-
-        if len(stats['dead_npcs']) > 5:
-            ttk.Label(
-                self.dead_heroes_frame,
-                text=f"... и еще {len(stats['dead_npcs']) - 5}",
-                font=("Georgia", 8),
-                foreground="#bf616a"
-            ).pack(anchor="w")
+        dead_view = (
+            tuple((npc.name, npc.level) for npc in snapshot.dead_npcs[:5]),  # Показываем только первых 5
+            len(snapshot.dead_npcs)
+        )
+        if dead_view != self.dead_view:
+            self.dead_view = dead_view
+            for widget in self.dead_heroes_frame.winfo_children():
+                widget.destroy()
+
+            for name, level in dead_view[0]:
+                ttk.Label(
+                    self.dead_heroes_frame,
+                    text=f"{name} (ур. {level})",
+                    font=("Georgia", 9),
+                    foreground="#bf616a"
+                ).pack(anchor="w")
+
+            if len(snapshot.dead_npcs) > 5:
+                ttk.Label(
+                    self.dead_heroes_frame,
+                    text=f"... и еще {len(snapshot.dead_npcs) - 5}",
+                    font=("Georgia", 8),
+                    foreground="#bf616a"
+                ).pack(anchor="w")
 
         # Обновление состояния кнопок
-        running = self.game_world.is_running
+        running = snapshot.is_running
         self.start_btn.config(state=tk.DISABLED if running else tk.NORMAL)
         self.stop_btn.config(state=tk.NORMAL if running else tk.DISABLED)
         self.add_btn.config(state=tk.DISABLED if running else tk.NORMAL)
@@ -2027,6 +1364,7 @@ class GameGUI:
 
 
 if __name__ == "__main__":
+    load_gui()
     root = tk.Tk()
     app = GameGUI(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""Замер памяти на одну сущность: героя, монстра и артефакт.
+
+Объекты создаются так же, как их создает мир (create_character,
+Location.make_monster, Location.make_artifact), а прирост памяти
+считается через tracemalloc и делится на число объектов. Отчет можно
+сохранить в JSON и сравнить с отчетом другого коммита:
+
+    python rpg_memory.py --json before.json
+    python rpg_memory.py --compare before.json
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from rpg_engine import CLASS_MAP, Location, create_character
+
+
+def measure(factory, count):
+    """Средний прирост памяти в байтах на объект, созданный factory(i)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [factory(i) for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def run_benchmark(heroes=10000, monsters=100000, artifacts=100000, danger_level=3, seed=0):
+    rng = random.Random(seed)
+    location = Location("Замер", danger_level, rng, populate=False)
+    classes = [(class_name, subclass) for class_name, subclasses in CLASS_MAP.items()
+               for subclass in subclasses]
+
+    def make_hero(i):
+        # Общий поток случайных чисел: собственный считается отдельной строкой
+        class_name, subclass = classes[i % len(classes)]
+        hero = create_character(class_name, subclass, f"{subclass} {i}", rng)
+        hero.refresh_stats()
+        return hero
+
+    entities = {
+        "hero": measure(make_hero, heroes),
+        "monster": measure(lambda i: location.make_monster(), monsters),
+        "artifact": measure(lambda i: location.make_artifact(), artifacts),
+        "hero_rng": measure(lambda i: random.Random(seed + i), min(heroes, 10000))
+    }
+    return {
+        "counts": {"hero": heroes, "monster": monsters, "artifact": artifacts},
+        "bytes": entities,
+        # Оценка для мира из заданного числа сущностей (герои - со своими потоками)
+        "world_mb": (
+            heroes * (entities["hero"] + entities["hero_rng"])
+            + monsters * entities["monster"] + artifacts * entities["artifact"]
+        ) / 2 ** 20
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"{'Сущность':<10}{'Байт':>10}" + (f"{'Было':>10}{'Разница':>10}" if baseline else ""))
+    for name, size in report["bytes"].items():
+        line = f"{name:<10}{size:>10.0f}"
+        if baseline and name in baseline["bytes"]:
+            old = baseline["bytes"][name]
+            line += f"{old:>10.0f}{(size - old) / old:>+10.1%}"
+        print(line)
+    counts = report["counts"]
+    print(f"Мир из {counts['hero']} героев, {counts['monster']} монстров и {counts['artifact']} "
+          f"артефактов: {report['world_mb']:.1f} МБ"
+          + (f" (было {baseline['world_mb']:.1f} МБ)" if baseline else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Память на героя, монстра и артефакт")
+    parser.add_argument("--heroes", type=int, default=10000, help="число героев")
+    parser.add_argument("--monsters", type=int, default=100000, help="число монстров")
+    parser.add_argument("--artifacts", type=int, default=100000, help="число артефактов")
+    parser.add_argument("--danger", type=int, default=3, help="уровень опасности локации")
+    parser.add_argument("--seed", type=int, default=0, help="seed генератора")
+    parser.add_argument("--json", help="сохранить отчет в JSON")
+    parser.add_argument("--compare", help="отчет JSON для сравнения (например, с прошлого коммита)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.heroes, args.monsters, args.artifacts, args.danger, args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
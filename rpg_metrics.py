@@ -0,0 +1,150 @@
+"""Метрики работающей симуляции в текстовом формате Prometheus.
+
+Мир с подключенными метриками (world.metrics = WorldMetrics()) после
+каждого хода вызывает publish(); не чаще раза в interval секунд
+собирается готовый текст метрик. HTTP-сервер в фоновом потоке только
+отдает последний текст, поэтому мир не нужно блокировать на время
+запроса, а ход почти ничего не платит за метрики:
+
+    metrics = WorldMetrics()
+    world.metrics = metrics
+    server = MetricsServer(metrics, port=9464).start()
+    # curl http://127.0.0.1:9464/metrics
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows: память берется только из /proc, которого там нет
+    resource = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def resident_memory():
+    """Текущий RSS процесса в байтах; без /proc - пиковый, 0 - если неизвестен"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return 0
+
+
+class WorldMetrics:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.text = ""  # Последний собранный текст метрик
+        self.published_at = None
+        self._last = None  # (время, ход, номер события) для расчета скоростей
+
+    def publish(self, world, force=False):
+        """Вызывается в потоке симуляции после хода; собирает метрики раз в interval"""
+        now = time.perf_counter()
+        if not force and self.published_at is not None and now - self.published_at < self.interval:
+            return False
+        self.published_at = now
+        self.text = self.render(world, now)
+        return True
+
+    def render(self, world, now):
+        turn = world.turn_count
+        seq = world.event_log.last_seq
+        turn_rate = event_rate = 0.0
+        if self._last is not None:
+            then, last_turn, last_seq = self._last
+            elapsed = now - then
+            if elapsed > 0 and turn >= last_turn:
+                turn_rate = (turn - last_turn) / elapsed
+                event_rate = (seq - last_seq) / elapsed
+        self._last = (now, turn, seq)
+
+        alive = sum(1 for npc in world.npcs if npc.is_alive)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+
+        metric("rpg_turns_total", "counter", "Ходов с начала симуляции", [("", turn)])
+        metric("rpg_turns_per_second", "gauge", "Ходов в секунду с прошлой публикации", [("", turn_rate)])
+        metric("rpg_heroes", "gauge", "Героев по состоянию", [
+            ('{state="alive"}', alive), ('{state="dead"}', len(world.npcs) - alive)])
+        metric("rpg_monsters", "gauge", "Монстров: живых и ждущих возрождения", [
+            ('{state="alive"}', sum(len(loc.monsters) for loc in world.locations)),
+            ('{state="dead"}', sum(len(loc.dead_monsters) for loc in world.locations))])
+        metric("rpg_locations", "gauge", "Локаций в мире", [("", len(world.locations))])
+        metric("rpg_events_total", "counter", "Событий записано в журнал", [("", seq)])
+        metric("rpg_events_per_second", "gauge", "Событий в секунду с прошлой публикации", [("", event_rate)])
+        metric("rpg_event_log_size", "gauge", "Событий в кольцевом буфере журнала", [("", len(world.event_log))])
+        metric("rpg_event_log_capacity", "gauge", "Емкость кольцевого буфера журнала",
+               [("", world.event_log.capacity)])
+        metric("process_resident_memory_bytes", "gauge", "Резидентная память процесса", [("", resident_memory())])
+
+        profiler = world.profiler
+        if profiler is not None and profiler.samples:
+            # Summary: квантили - по скользящему окну профайлера, _sum и _count - за все ходы
+            samples = []
+            for phase, row in profiler.summary().items():
+                for key, value in row.items():
+                    if key.startswith("p"):
+                        quantile = int(key[1:]) / 100
+                        samples.append((f'{{phase="{phase}",quantile="{quantile}"}}', value / 1e6))
+                count, total = profiler.totals[phase]
+                samples.append((f'_sum{{phase="{phase}"}}', total / 1e9))
+                samples.append((f'_count{{phase="{phase}"}}', count))
+            metric("rpg_turn_phase_seconds", "summary", "Длительность фаз хода", samples)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """HTTP-сервер метрик в фоновом потоке: GET /metrics"""
+
+    def __init__(self, metrics, host="127.0.0.1", port=9464):
+        self.metrics = metrics
+        self.address = (host, port)
+        self.server = None
+        self.thread = None
+
+    @property
+    def port(self):
+        """Фактический порт (при port=0 его выбирает система)"""
+        return self.server.server_address[1] if self.server else self.address[1]
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.text.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Опросы каждые несколько секунд не засоряют вывод
+
+        self.server = ThreadingHTTPServer(self.address, Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
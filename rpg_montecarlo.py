@@ -0,0 +1,173 @@
+"""Прогон тысяч независимых миров в пуле процессов для проверки баланса классов.
+
+Каждый мир создается со своим seed, живет заданное число ходов без
+интерфейса, а результаты героев сводятся в отчет по подклассам.
+
+С --compare-modes те же миры прогоняются в объектном и векторизованном
+режимах, и средние исходы по всем героям сравниваются: расхождение больше
+--tolerance считается ошибкой (код выхода 1). Доля выживших мала, поэтому
+миров нужно несколько сотен:
+
+    python rpg_montecarlo.py --compare-modes --worlds 400 --turns 400 --heroes 3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rpg_engine import CLASS_MAP, GameWorld, create_character, load_game_data, run_headless
+
+
+# Подкласс по имени класса Python или по русскому названию
+SUBCLASSES = {}
+for _class_name, _subclasses in CLASS_MAP.items():
+    for _subclass, _cls in _subclasses.items():
+        SUBCLASSES[_cls.__name__] = (_class_name, _subclass)
+        SUBCLASSES[_subclass] = (_class_name, _subclass)
+
+
+def run_world(task):
+    """Один мир: возвращает кортежи (подкласс, жив, уровень, золото, победы)"""
+    seed, subclasses, heroes_per_class, turns, vectorized = task
+    world = GameWorld(seed=seed, event_log_capacity=1)
+    for name in subclasses:
+        class_name, subclass = SUBCLASSES[name]
+        for i in range(1, heroes_per_class + 1):
+            rng = world.spawn_rng("hero", name, i)
+            world.add_npc(create_character(class_name, subclass, f"{subclass} {i}", rng))
+    run_headless(world, turns, vectorized=vectorized)
+    return [
+        (type(npc).__name__, npc.is_alive, npc.level, npc.gold, npc.kills)
+        for npc in world.npcs
+    ]
+
+
+def aggregate(results):
+    """Сводка по подклассам из результатов всех миров"""
+    grouped = {}
+    for world_result in results:
+        for name, alive, level, gold, kills in world_result:
+            grouped.setdefault(name, []).append((alive, level, gold, kills))
+
+    report = {name: summarize(rows) for name, rows in sorted(grouped.items())}
+    if grouped:
+        report["Все"] = summarize([row for rows in grouped.values() for row in rows])
+    return report
+
+
+def summarize(rows):
+    alive, levels, gold, kills = zip(*rows)
+    return {
+        "heroes": len(rows),
+        "survival_rate": sum(alive) / len(rows),
+        "mean_level": statistics.fmean(levels),
+        "max_level": max(levels),
+        "mean_gold": statistics.fmean(gold),
+        "median_gold": statistics.median(gold),
+        "mean_kills": statistics.fmean(kills)
+    }
+
+
+# Исходы, по которым сравниваются режимы
+COMPARED = ("survival_rate", "mean_level", "mean_gold", "mean_kills")
+
+
+def compare_modes(objects, vectorized, tolerance):
+    """Средние исходы всех героев в двух режимах: (исход, объекты, массивы, доля расхождения, превышено)"""
+    rows = []
+    for key in COMPARED:
+        a, b = objects["classes"]["Все"][key], vectorized["classes"]["Все"][key]
+        diff = abs(b - a) / abs(a) if a else abs(b)
+        rows.append((key, a, b, diff, diff > tolerance))
+    return rows
+
+
+def run_sweep(subclasses, worlds=1000, turns=500, heroes_per_class=1, seed=0,
+              workers=None, vectorized=False):
+    """Запуск worlds миров в пуле процессов и сводка результатов"""
+    for name in subclasses:
+        if name not in SUBCLASSES:
+            raise ValueError(f"Неизвестный подкласс: {name}")
+
+    tasks = [(seed + i, tuple(subclasses), heroes_per_class, turns, vectorized) for i in range(worlds)]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, worlds // (workers * 4))
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [run_world(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_world, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "worlds": worlds,
+        "turns": turns,
+        "workers": workers,
+        "elapsed": elapsed,
+        "worlds_per_second": worlds / elapsed if elapsed > 0 else float("inf"),
+        "classes": aggregate(results)
+    }
+
+
+def print_report(report):
+    print(f"Миров: {report['worlds']} по {report['turns']} ходов, процессов: {report['workers']}, "
+          f"{report['elapsed']:.2f} с ({report['worlds_per_second']:.1f} миров/с)")
+    print(f"{'Подкласс':<14}{'Героев':>8}{'Выжили':>9}{'Уровень':>9}{'Золото':>9}{'Победы':>9}")
+    for name, row in report["classes"].items():
+        print(f"{name:<14}{row['heroes']:>8}{row['survival_rate']:>9.1%}{row['mean_level']:>9.2f}"
+              f"{row['mean_gold']:>9.1f}{row['mean_kills']:>9.2f}")
+
+
+def main(argv=None):
+    default_classes = [cls.__name__ for subclasses in CLASS_MAP.values() for cls in subclasses.values()]
+    parser = argparse.ArgumentParser(description="Монте-Карло прогон миров для баланса классов")
+    parser.add_argument("--classes", nargs="+", default=default_classes, help="подклассы в каждом мире")
+    parser.add_argument("--worlds", type=int, default=1000, help="число миров")
+    parser.add_argument("--turns", type=int, default=500, help="ходов в каждом мире")
+    parser.add_argument("--heroes", type=int, default=1, help="героев каждого подкласса в мире")
+    parser.add_argument("--seed", type=int, default=0, help="seed первого мира")
+    parser.add_argument("--workers", type=int, help="число процессов (по умолчанию все ядра)")
+    parser.add_argument("--vectorized", action="store_true", help="векторизованный режим (нужен NumPy)")
+    parser.add_argument("--compare-modes", action="store_true",
+                        help="прогнать те же миры в обоих режимах и сравнить исходы")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="допустимое расхождение режимов (0.05 = 5%%)")
+    parser.add_argument("--json", help="сохранить отчет в JSON")
+    parser.add_argument("--data", help="таблицы игры из файла JSON/TOML")
+    args = parser.parse_args(argv)
+
+    if args.data:
+        load_game_data(args.data)
+        # Дочерние процессы читают тот же файл при импорте rpg_engine
+        os.environ["RPG_DATA"] = args.data
+
+    if args.compare_modes:
+        reports = [run_sweep(args.classes, args.worlds, args.turns, args.heroes, args.seed,
+                             args.workers, vectorized) for vectorized in (False, True)]
+        rows = compare_modes(*reports, args.tolerance)
+        print(f"{'Исход':<16}{'Объекты':>10}{'Массивы':>10}{'Разница':>10}")
+        for key, a, b, diff, failed in rows:
+            print(f"{key:<16}{a:>10.3f}{b:>10.3f}{diff:>10.1%}" + (" !" if failed else ""))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"objects": reports[0], "vectorized": reports[1]}, f, ensure_ascii=False, indent=2)
+        if any(failed for *_, failed in rows):
+            sys.exit(1)
+        return reports
+
+    report = run_sweep(args.classes, args.worlds, args.turns, args.heroes, args.seed,
+                       args.workers, args.vectorized)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Замер фаз хода с перцентилями и выгрузкой трассы Chrome/Perfetto.
+
+Профайлер подключается к миру как world.profiler = TurnProfiler(); пока
+он не подключен, simulate_turn проверяет лишь один атрибут. Каждая фаза
+хода (см. TURN_PHASES) измеряется отдельно, длительности последних
+window ходов хранятся для скользящих перцентилей. По желанию
+измеряется и update каждого подкласса NPC.
+
+Для окна ходов можно записать трассу в формате Trace Event JSON: файл
+открывается в chrome://tracing и ui.perfetto.dev.
+"""
+import json
+import math
+import time
+from collections import deque
+
+from rpg_engine import TURN_PHASES
+
+PERCENTILES = (50, 90, 99)
+
+
+class TurnProfiler:
+    def __init__(self, window=1000, per_class=False):
+        self.window = window
+        self.per_class = per_class  # Отдельный замер update для каждого подкласса
+        self.samples = {}  # Фаза -> длительности последних ходов, нс
+        self.totals = {}  # Фаза -> [число замеров, сумма длительностей, нс] за все ходы
+        self.turns = 0  # Ходов, выполненных с профайлером
+        self.origin = time.perf_counter_ns()
+        self.trace_events = []
+        self.trace_window = None  # (первый, последний) номер хода профайлера
+        self.trace_path = None
+
+    def record(self, name, duration):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+            self.totals[name] = [0, 0]
+        samples.append(duration)
+        total = self.totals[name]
+        total[0] += 1
+        total[1] += duration
+
+    def start_trace(self, turns, path=None, skip=0):
+        """Трасса следующих turns ходов после пропуска skip; с path файл пишется сам"""
+        first = self.turns + skip + 1
+        self.trace_window = (first, first + turns - 1)
+        self.trace_path = path
+        self.trace_events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "rpg_engine"}}]
+
+    @property
+    def tracing(self):
+        return self.trace_window is not None
+
+    def span(self, name, category, start, end, **args):
+        self.trace_events.append({
+            "name": name, "cat": category, "ph": "X", "pid": 1, "tid": 1,
+            "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000, "args": args
+        })
+
+    def run_turn(self, world):
+        """Ход мира с замером фаз; вызывается из GameWorld.simulate_turn"""
+        clock = time.perf_counter_ns
+        self.turns += 1
+        window = self.trace_window
+        tracing = window is not None and window[0] <= self.turns <= window[1]
+        turn = world.turn_count
+
+        turn_start = clock()
+        for phase, method in TURN_PHASES:
+            start = clock()
+            if phase == "npcs" and self.per_class:
+                self.update_by_class(world, tracing)
+            else:
+                getattr(world, method)()
+            end = clock()
+            self.record(phase, end - start)
+            if tracing:
+                self.span(phase, "phase", start, end, turn=turn)
+        self.record("turn", end - turn_start)
+
+        if tracing:
+            self.span(f"Ход {turn}", "turn", turn_start, end, turn=turn)
+            if self.turns == window[1]:
+                self.trace_window = None
+                if self.trace_path:
+                    self.dump_trace(self.trace_path)
+
+    def update_by_class(self, world, tracing):
+        """Фаза NPC с замером update по подклассам (как GameWorld.update_npcs)"""
+        clock = time.perf_counter_ns
+        totals = {}
+        for npc in world.npcs:
+            if npc.is_alive:
+                start = clock()
+                events = npc.update(world)
+                end = clock()
+                name = type(npc).__name__
+                totals[name] = totals.get(name, 0) + end - start
+                if tracing:
+                    self.span(name, "update", start, end, npc=npc.name)
+                for event in events:
+                    world.log_event(event)
+        for name, total in totals.items():
+            self.record(f"update/{name}", total)
+
+    def summary(self):
+        """Перцентили и среднее по скользящему окну, мкс"""
+        report = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            row = {"count": len(ordered), "mean": sum(ordered) / len(ordered) / 1000}
+            for p in PERCENTILES:
+                # Ближайший ранг: значение, не меньше которого p% замеров
+                row[f"p{p}"] = ordered[max(0, math.ceil(len(ordered) * p / 100) - 1)] / 1000
+            report[name] = row
+        return report
+
+    def format_summary(self):
+        lines = [f"{'Фаза':<22}" + "".join(f"{f'p{p}, мкс':>12}" for p in PERCENTILES) + f"{'среднее':>12}"]
+        for name, row in self.summary().items():
+            lines.append(f"{name:<22}" + "".join(f"{row[f'p{p}']:>12.1f}" for p in PERCENTILES)
+                         + f"{row['mean']:>12.1f}")
+        return "\n".join(lines)
+
+    def dump_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
@@ -0,0 +1,164 @@
+"""Приемники хроники событий для долгих прогонов.
+
+Мир передает каждое событие всем подключенным приемникам
+(GameWorld.add_sink). Файловые приемники копят записи в памяти и пишут
+их пачками одним вызовом write, а при достижении max_bytes переходят
+к следующему файлу: chronicle-00001.jsonl.gz, chronicle-00002.jsonl.gz...
+Поэтому даже миллион ходов дает полную хронику без роста памяти.
+
+Сжатие gzip есть всегда, zstd - если доступен модуль compression.zstd
+(Python 3.14+) или пакет zstandard.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:  # Сжатие zstd недоступно
+        zstd = None
+
+
+FIELDS = (
+    "seq", "turn", "kind", "category", "actor_id", "actor", "target_id", "target",
+    "amount", "effect", "extra", "detail", "text"
+)
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+class EventSink:
+    """Основа приемника: фильтр по категориям и запись пачками"""
+
+    def __init__(self, batch_size=1000, categories=None):
+        self.batch_size = batch_size
+        self.categories = frozenset(categories) if categories else None
+        self.pending = []
+        self.events_written = 0
+
+    def write(self, seq, turn, event):
+        if self.categories is not None and event.kind.category not in self.categories:
+            return
+        # Записи собираются только при сбросе пачки
+        self.pending.append((seq, turn, event))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        records = []
+        for seq, turn, event in pending:
+            record = {"seq": seq, "turn": turn}
+            record.update(event.to_dict())
+            records.append(record)
+        self.write_batch(records)
+        self.events_written += len(records)
+
+    def write_batch(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RotatingFileSink(EventSink):
+    """Файловый приемник с ротацией по размеру и необязательным сжатием"""
+    suffix = ""
+
+    def __init__(self, path, compression=None, max_bytes=64 * 1024 * 1024,
+                 batch_size=1000, categories=None):
+        super().__init__(batch_size, categories)
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Неизвестное сжатие: {compression}")
+        if compression == "zstd" and zstd is None:
+            raise RuntimeError("Для сжатия zstd нужен Python 3.14+ или пакет zstandard")
+
+        root, ext = os.path.splitext(path)
+        self.base = root
+        self.ext = (ext or self.suffix) + COMPRESSION_SUFFIXES[compression]
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.paths = []
+        self.file = None
+        self.bytes_in_file = 0
+
+    def open_next(self):
+        if self.file is not None:
+            self.file.close()
+        path = f"{self.base}-{len(self.paths) + 1:05d}{self.ext}"
+        if self.compression == "gzip":
+            self.file = gzip.open(path, "wb", compresslevel=1)
+        elif self.compression == "zstd":
+            self.file = zstd.open(path, "wb")
+        else:
+            self.file = open(path, "wb")
+        self.paths.append(path)
+        self.bytes_in_file = 0
+        header = self.header()
+        if header:
+            self.write_bytes(header.encode("utf-8"))
+
+    def write_bytes(self, data):
+        self.file.write(data)
+        self.bytes_in_file += len(data)
+
+    def write_batch(self, records):
+        # Ротация только между пачками: файл может превысить max_bytes на одну пачку
+        if self.file is None or (self.max_bytes and self.bytes_in_file >= self.max_bytes):
+            self.open_next()
+        self.write_bytes(self.encode(records).encode("utf-8"))
+
+    def header(self):
+        return ""
+
+    def encode(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class JsonlSink(RotatingFileSink):
+    """Хроника в JSON Lines: одно событие - одна строка"""
+    suffix = ".jsonl"
+
+    def encode(self, records):
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        return "".join([dumps(record) + "\n" for record in records])
+
+
+class CsvSink(RotatingFileSink):
+    """Хроника в CSV с заголовком в каждом файле"""
+    suffix = ".csv"
+
+    def header(self):
+        return ",".join(FIELDS) + "\r\n"
+
+    def encode(self, records):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([[record.get(field) for field in FIELDS] for record in records])
+        return buffer.getvalue()
+
+
+def open_sink(path, compression=None, **kwargs):
+    """Файловый приемник по расширению пути: .csv - CSV, иначе JSON Lines"""
+    if path.lower().endswith(".csv"):
+        return CsvSink(path, compression, **kwargs)
+    return JsonlSink(path, compression, **kwargs)
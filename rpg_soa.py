@@ -0,0 +1,816 @@
+"""Векторизованный режим мира: характеристики героев и монстров хранятся
+в столбцах NumPy, а атаки, защита и эффекты за ход считаются пакетами.
+
+NumPy нужен только для этого режима; объектная модель в rpg_engine
+работает без него.
+"""
+from collections import deque
+
+from rpg_engine import (StatusEffect, ArtifactType, MonsterType, Artifact, REGEN_PERIOD,
+                        BONUS_TYPES, MONSTER_ATTACKS, DEFAULT_MONSTER_ATTACK, SpellDef, spell_for,
+                        EQUIP_SLOTS, BUCKET_CAPACITY, SELL_PRICE, Inventory)
+
+try:
+    import numpy as np
+except ImportError:  # Векторизованный режим недоступен без NumPy
+    np = None
+
+
+STATES = ("exploring", "fighting", "resting", "dead")
+EXPLORING, FIGHTING, RESTING, DEAD = range(4)
+
+BONUS_KEYS = BONUS_TYPES
+B_HP, B_MANA, B_DAMAGE, B_DEFENSE, B_CRIT, B_SPEED, B_REGEN = range(len(BONUS_KEYS))
+
+SLOTS = ("weapon", "armor", "ring", "amulet", "relic")
+S_WEAPON, S_ARMOR = 0, 1
+
+EFFECTS = list(StatusEffect)
+EFFECT_INDEX = {effect: i for i, effect in enumerate(EFFECTS)}
+E_POISONED = EFFECT_INDEX[StatusEffect.POISONED]
+E_BURNING = EFFECT_INDEX[StatusEffect.BURNING]
+E_FROZEN = EFFECT_INDEX[StatusEffect.FROZEN]
+E_REGENERATION = EFFECT_INDEX[StatusEffect.REGENERATION]
+E_SHIELDED = EFFECT_INDEX[StatusEffect.SHIELDED]
+E_STUNNED = EFFECT_INDEX[StatusEffect.STUNNED]
+
+MONSTER_TYPES = list(MonsterType)
+MONSTER_INDEX = {monster_type: i for i, monster_type in enumerate(MONSTER_TYPES)}
+
+# Виды атак
+BASIC, BERSERK, ROGUE = range(3)
+
+# Профили атак по классам: (мин., макс., множитель оружия для мин. и макс.,
+# бонус к шансу крита, множитель крита, оглушение мешает атаке, вид атаки,
+# добивание слабых, отравление после атаки). Повторяют формулы attack().
+ATTACK_PROFILES = {
+    "NPC": (5, 10, 1, 2, 0, 2.0, True, BASIC, False, False),
+    "Warrior": (15, 25, 1, 2, -100, 1.0, False, BASIC, False, False),
+    "Berserker": (20, 30, 1, 2, -100, 1.0, False, BERSERK, False, False),
+    "Rogue": (10, 15, 1, 1, -100, 1.0, False, ROGUE, False, False),
+    "Assassin": (10, 15, 1, 1, -100, 1.0, False, ROGUE, False, True),
+    "Archer": (10, 20, 1, 1, 20, 2.5, False, BASIC, False, False),
+    "Sniper": (10, 20, 1, 1, 20, 2.5, False, BASIC, True, False),
+}
+
+# Удар из скрытности у разбойников
+STEALTH_PROFILE = (20, 35, 2, 2)
+
+# Заклинания (rpg_engine.spell_for) и особые атаки монстров берутся из общих
+# таблиц движка, поэтому правки данных действуют в обоих режимах
+
+# Классы, которые варят зелья на отдыхе
+BREWING_CLASSES = ("Alchemist",)
+
+
+def _lookup(cls, table):
+    """Поиск записи таблицы по цепочке наследования класса"""
+    for klass in cls.__mro__:
+        entry = table.get(klass.__name__)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _mitigate(damage, armor, defense, shielded):
+    """Векторная версия расчета урона из NPC.take_damage"""
+    actual = np.maximum(1, damage - (armor // 2 + defense))
+    return np.where(shielded, np.maximum(0, actual - 10), actual)
+
+
+class ArrayWorld:
+    """Мир в виде структуры массивов поверх объектов GameWorld.
+
+    Воспроизводит правила объектной модели для героев (исследование, бой,
+    отдых, заклинания, эффекты) с тем же распределением исходов; проверка -
+    rpg_montecarlo.py --compare-modes. Герои с общей целью бьют по очереди.
+    Монстры живут в пулах локаций: погибшие возвращаются по таймеру
+    respawn_delay, пока живых меньше monster_cap.
+    """
+
+    def __init__(self, world, seed=None):
+        if np is None:
+            raise RuntimeError("Для векторизованного режима требуется NumPy")
+
+        self.world = world
+        self.rng = np.random.default_rng(seed)
+        self.turn_count = world.turn_count
+        self._build_locations(world.locations)
+        self._build_heroes(world.npcs)
+        self._build_spells()
+
+    # ---------- Построение столбцов ----------
+    def _build_locations(self, locations):
+        self.locations = locations
+        n = len(locations)
+        self.danger = np.array([loc.danger_level for loc in locations], dtype=np.int64)
+        self.location_index = {id(loc): i for i, loc in enumerate(locations)}
+
+        # Дороги в виде таблицы соседей: exit_to[i, k] - сосед, exit_cum[i, k] -
+        # накопленная вероятность перехода; без соседей герой остается на месте
+        degree = max([len(loc.neighbors) for loc in locations] + [1])
+        self.exit_to = np.repeat(np.arange(n)[:, None], degree, axis=1)
+        self.exit_cum = np.ones((n, degree))
+        for i, loc in enumerate(locations):
+            if loc.neighbors:
+                weights = np.array([1 / cost for cost in loc.neighbors.values()])
+                self.exit_to[i, :len(weights)] = [self.location_index[id(nb)] for nb in loc.neighbors]
+                self.exit_cum[i, :len(weights)] = np.cumsum(weights) / weights.sum()
+
+        # Пополнение локаций (см. Location.update)
+        self.updated_at = np.array([loc.updated_at for loc in locations], dtype=np.int64)
+        self.artifact_budget = np.array([loc.artifact_budget for loc in locations])
+        self.monster_budget = np.array([loc.monster_budget for loc in locations])
+        self.artifact_credit = np.array([loc.artifact_credit for loc in locations])
+        self.monster_credit = np.array([loc.monster_credit for loc in locations])
+        self.artifact_cap = np.array([loc.artifact_cap for loc in locations], dtype=np.int64)
+        self.respawn_delay = np.array([loc.respawn_delay for loc in locations], dtype=np.int64)
+        self.monster_cap = np.array([loc.monster_cap for loc in locations], dtype=np.int64)
+
+        # Участок монстров локации: живые, погибшие и свободные места до лимита
+        pools = [loc.monsters + list(loc.dead_monsters) for loc in locations]
+        sizes = np.maximum([len(pool) for pool in pools], self.monster_cap) if n else np.zeros(0, np.int64)
+        self.mon_start = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+        self.mon_used = np.array([len(pool) for pool in pools], dtype=np.int64)
+        self.m_loc = np.repeat(np.arange(n), sizes)
+        self.monster_objects = [None] * len(self.m_loc)
+        for start, pool in zip(self.mon_start.tolist(), pools):
+            self.monster_objects[start:start + len(pool)] = pool
+        self.monster_ids = {id(m): i for i, m in enumerate(self.monster_objects) if m is not None}
+
+        size = len(self.m_loc)
+        self.m_health = np.zeros(size)
+        self.m_max_health = np.zeros(size)
+        self.m_power = np.zeros(size, dtype=np.int64)
+        self.m_gold = np.zeros(size, dtype=np.int64)
+        self.m_level = np.ones(size, dtype=np.int64)
+        self.m_exp = np.zeros(size, dtype=np.int64)
+        self.m_type = np.zeros(size, dtype=np.int64)
+        self.m_status = np.zeros((size, len(EFFECTS)), dtype=np.int64)
+        self.m_attack = np.zeros(size, dtype=np.int64)
+        self.m_alive = np.zeros(size, dtype=bool)
+        self.m_respawn_at = np.full(size, -1, dtype=np.int64)  # -1: таймера нет, монстр жив
+        self.m_respawned = np.zeros(size, dtype=bool)
+        for i, m in enumerate(self.monster_objects):
+            if m is not None:
+                self._load_monster(i, m)
+        # Монстры под эффектами; пополняется целями героев в _fight
+        self.m_afflicted = np.flatnonzero(self.m_alive & self.m_status.any(axis=1))
+
+        # Стопки артефактов локаций с местом до лимита; в стопке - номера объектов
+        self.artifact_objects = [a for loc in locations for a in loc.artifacts]
+        art_counts = np.array([len(loc.artifacts) for loc in locations], dtype=np.int64)
+        art_sizes = np.maximum(art_counts, self.artifact_cap)
+        self.art_start = np.concatenate(([0], np.cumsum(art_sizes)[:-1])).astype(np.int64)
+        self.art_top = art_counts.copy()
+        self.art_stack = np.full(int(art_sizes.sum()), -1, dtype=np.int64)
+        first = np.concatenate(([0], np.cumsum(art_counts)[:-1])).astype(np.int64)
+        for start, begin, count in zip(self.art_start.tolist(), first.tolist(), art_counts.tolist()):
+            self.art_stack[start:start + count] = np.arange(begin, begin + count)
+        self.art_potion = np.zeros(0, dtype=bool)
+        self.art_power = np.zeros(0)
+        self.art_slot = np.zeros(0, dtype=np.int64)
+        self.art_bonus = np.zeros(0, dtype=np.int64)
+        self._add_artifact_columns(self.artifact_objects)
+
+    def _add_artifact_columns(self, items):
+        """Столбцы для новых объектов в конце artifact_objects"""
+        def column(values, old):
+            # Тип задается явно: пустой список иначе превратил бы номера в float
+            return np.concatenate((old, np.array(values, dtype=old.dtype)))
+        self.art_potion = column([a.type == ArtifactType.POTION for a in items], self.art_potion)
+        self.art_power = column([a.power for a in items], self.art_power)
+        self.art_slot = column([
+            SLOTS.index(EQUIP_SLOTS[a.type]) if a.type in EQUIP_SLOTS else -1 for a in items], self.art_slot)
+        self.art_bonus = column([
+            BONUS_KEYS.index(a.bonus_type) if a.bonus_type in BONUS_KEYS else 0 for a in items], self.art_bonus)
+
+    def _register(self, items):
+        """Номера объектов для предметов героев, которых нет в стопках локаций"""
+        start = len(self.artifact_objects)
+        self.artifact_objects.extend(items)
+        self._add_artifact_columns(items)
+        return list(range(start, start + len(items)))
+
+    def _load_monster(self, i, monster):
+        self.m_health[i] = monster.health
+        self.m_max_health[i] = monster.max_health
+        self.m_power[i] = monster.power
+        self.m_gold[i] = monster.gold
+        self.m_level[i] = monster.level
+        self.m_exp[i] = monster.experience
+        self.m_type[i] = MONSTER_INDEX[monster.monster_type]
+        self.m_attack[i] = MONSTER_ATTACKS.get(monster.monster_type, DEFAULT_MONSTER_ATTACK).damage
+        self.m_alive[i] = monster.is_alive
+        self.m_status[i] = 0
+        for effect, duration in monster.status_durations().items():
+            self.m_status[i, EFFECT_INDEX[effect]] = duration
+        if monster.respawn_at is not None:
+            self.m_respawn_at[i] = monster.respawn_at
+
+    def _build_heroes(self, npcs):
+        self.npcs = npcs
+        n = len(npcs)
+        self.health = np.array([npc.health for npc in npcs], dtype=np.float64)
+        self.max_health = np.array([npc.max_health for npc in npcs], dtype=np.float64)
+        self.level = np.array([npc.level for npc in npcs], dtype=np.int64)
+        self.experience = np.array([npc.experience for npc in npcs], dtype=np.int64)
+        self.gold = np.array([npc.gold for npc in npcs], dtype=np.int64)
+        self.kills = np.array([npc.kills for npc in npcs], dtype=np.int64)
+        self.mana = np.array([getattr(npc, "mana", 0) for npc in npcs], dtype=np.float64)
+        self.stealth = np.array([getattr(npc, "stealth", False) for npc in npcs], dtype=bool)
+        self.state = np.array(
+            [DEAD if not npc.is_alive else STATES.index(npc.state) for npc in npcs], dtype=np.int64)
+        self.target = np.array(
+            [self.monster_ids.get(id(npc.target), -1) for npc in npcs], dtype=np.int64)
+        self.state[(self.state == FIGHTING) & (self.target < 0)] = EXPLORING
+        self.loc = np.array(
+            [self.location_index.get(id(npc.current_location), -1) for npc in npcs], dtype=np.int64)
+
+        # Итоговые бонусы (класс + экипировка + модификаторы) берутся из NPC.bonuses
+        self.equip_power = np.zeros((n, len(SLOTS)), dtype=np.int64)
+        self.equip_item = np.full((n, len(SLOTS)), -1, dtype=np.int64)
+        self.bags = []  # Сумки героев без зелий: тип -> номера объектов, как в Inventory
+        self.bonuses = np.zeros((n, len(BONUS_KEYS)), dtype=np.int64)
+        self.status = np.zeros((n, len(EFFECTS)), dtype=np.int64)
+        # Корзина зелий в порядке Inventory: сила и номер объекта (-1 - сваренное)
+        # в каждой ячейке; лишняя ячейка - для зелья сверх лимита до продажи
+        width = max([len(npc.inventory.bucket(ArtifactType.POTION)) for npc in npcs] + [BUCKET_CAPACITY]) + 1
+        self.potions = np.zeros(n, dtype=np.int64)
+        self.potion_power = np.zeros((n, width), dtype=np.int64)
+        self.potion_item = np.full((n, width), -1, dtype=np.int64)
+        for i, npc in enumerate(npcs):
+            for s, slot in enumerate(SLOTS):
+                item = npc.equipment[slot]
+                if item:
+                    self.equip_power[i, s] = item.power
+                    self.equip_item[i, s] = self._register([item])[0]
+            self.bags.append({
+                artifact_type: self._register(list(bucket))
+                for artifact_type, bucket in npc.inventory.buckets.items() if artifact_type != ArtifactType.POTION
+            })
+            if npc.stats_dirty:
+                npc.refresh_stats()
+            self.bonuses[i] = [npc.bonuses[key] for key in BONUS_KEYS]
+            for effect, duration in npc.status_durations().items():
+                self.status[i, EFFECT_INDEX[effect]] = duration
+            potions = list(npc.inventory.bucket(ArtifactType.POTION))
+            self.potions[i] = len(potions)
+            self.potion_power[i, :len(potions)] = [item.power for item in potions]
+            self.potion_item[i, :len(potions)] = self._register(potions)
+
+        profiles = [_lookup(type(npc), ATTACK_PROFILES) for npc in npcs]
+        columns = list(zip(*profiles)) if profiles else [()] * 10
+        (self.a_lo, self.a_hi, self.a_lo_w, self.a_hi_w, self.a_crit, self.a_crit_mult,
+         self.a_stun, self.a_kind, self.a_execute, self.a_poison) = (np.array(c) for c in columns)
+        self.brews = np.array(
+            [any(k.__name__ in BREWING_CLASSES for k in type(npc).__mro__) for npc in npcs], dtype=bool)
+
+    def _build_spells(self):
+        index = {}
+        rows = [SpellDef()]  # Строка 0 - заклинание без эффекта
+        known = []
+        for npc in self.npcs:
+            spells = []
+            for spell in npc.known_spells:
+                profile = spell_for(type(npc), spell)
+                key = id(profile) if profile is not None else None
+                if key not in index:
+                    index[key] = len(rows) if profile is not None else 0
+                    if profile is not None:
+                        rows.append(profile)
+                spells.append(index[key])
+            known.append(spells)
+
+        width = max([len(s) for s in known] + [1])
+        self.spells = np.zeros((len(self.npcs), width), dtype=np.int64)
+        self.spell_count = np.array([len(s) for s in known], dtype=np.int64)
+        for i, spells in enumerate(known):
+            self.spells[i, :len(spells)] = spells
+
+        def column(getter, dtype=np.int64):
+            return np.array([getter(row) for row in rows], dtype=dtype)
+
+        def mask(types):
+            return sum(1 << MONSTER_INDEX[t] for t in types) if types else (1 << len(MONSTER_TYPES)) - 1
+
+        def status(row, i):
+            statuses = row.statuses
+            return statuses[i] if i < len(statuses) else None
+
+        self.sp_cost = column(lambda r: r.cost)
+        self.sp_damage = column(lambda r: r.damage)
+        self.sp_mask = column(lambda r: mask(r.only))
+        self.sp_undead_mult = column(lambda r: r.undead_mult, np.float64)
+        self.sp_heal = column(lambda r: r.heal)
+        self.sp_stun_blocks = column(lambda r: r.stun_blocks, bool)
+        self.sp_status = [
+            (column(lambda r: EFFECT_INDEX[status(r, i)[0]] if status(r, i) else -1),
+             column(lambda r: status(r, i)[1] if status(r, i) else 0))
+            for i in range(2)
+        ]
+        self.sp_self_status = column(lambda r: EFFECT_INDEX[r.self_status[0]] if r.self_status else -1)
+        self.sp_self_duration = column(lambda r: r.self_status[1] if r.self_status else 0)
+
+    # ---------- Общие операции ----------
+    def _randint(self, low, high):
+        """Аналог random.randint для массивов границ"""
+        return self.rng.integers(low, np.asarray(high) + 1)
+
+    def _heal(self, idx, amount):
+        amount = np.minimum(self.max_health[idx] - self.health[idx], amount + self.bonuses[idx, B_HP] // 2)
+        self.health[idx] += amount
+
+    def _gain_exp(self, idx, amount):
+        self.experience[idx] += amount
+        up = idx[self.experience[idx] >= 100 * self.level[idx]]
+        self.level[up] += 1
+        self.max_health[up] += 20 + self.bonuses[up, B_HP]
+        self.health[up] = self.max_health[up]
+        self.experience[up] = 0
+
+    def _tick(self, health, max_health, status, ticks, armor, defense, regen, hp_bonus):
+        """Пакетное обновление эффектов: ticks срабатываний подряд"""
+        applied = np.minimum(status, ticks[:, None])
+        shielded = status[:, E_SHIELDED] > 0
+        damage = (applied[:, E_POISONED] * _mitigate(5, armor, defense, shielded)
+                  + applied[:, E_BURNING] * _mitigate(10, armor, defense, shielded))
+        health = np.maximum(0, health - damage)
+        heal = applied[:, E_REGENERATION] * (5 + regen + hp_bonus // 2)
+        health = np.where(health > 0, np.minimum(max_health, health + heal), health)
+        return health, np.maximum(0, status - ticks[:, None])
+
+    # ---------- Фазы хода ----------
+    def _explore(self, idx):
+        if not len(idx):
+            return
+        rng = self.rng
+        loc = self.loc[idx]
+        u = rng.random(len(idx))
+        nowhere = loc < 0
+        loc[nowhere] = (u[nowhere] * len(self.locations)).astype(np.int64)
+        moved = ~nowhere
+        choice = np.minimum((self.exit_cum[loc[moved]] <= u[moved, None]).sum(axis=1), self.exit_to.shape[1] - 1)
+        loc[moved] = self.exit_to[loc[moved], choice]
+        self.loc[idx] = loc
+
+        # Локации пополняются к приходу героев
+        visited = np.unique(loc)
+        periods = (self.turn_count - self.updated_at[visited]) // REGEN_PERIOD
+        if (periods > 0).any():
+            self._catch_up(visited[periods > 0], periods[periods > 0])
+
+        # Артефакты снимаются с вершины стека локации по очереди
+        order = np.argsort(loc, kind="stable")
+        sorted_loc = loc[order]
+        rank = np.arange(len(idx)) - np.searchsorted(sorted_loc, sorted_loc, side="left")
+        got = rank < self.art_top[sorted_loc]
+        finders = idx[order][got]
+        art = self.art_stack[self.art_start[sorted_loc[got]] + self.art_top[sorted_loc[got]] - 1 - rank[got]]
+        np.subtract.at(self.art_top, sorted_loc[got], 1)
+        if len(finders):
+            self._pick_up(finders, art)
+
+        # Встреча с монстром: случайный живой монстр локации
+        danger = self.danger[loc]
+        alive_before = np.concatenate(([0], np.cumsum(self.m_alive)))
+        first_alive = alive_before[self.mon_start]
+        live = np.bincount(self.m_loc[self.m_alive], minlength=len(self.locations))
+        meet = (rng.random(len(idx)) < danger * 0.3) & (live[loc] > 0)
+        rank = first_alive[loc] + (rng.random(len(idx)) * live[loc]).astype(np.int64)
+        pick = np.searchsorted(alive_before, rank + 1) - 1
+        self.target[idx[meet]] = pick[meet]
+        self.state[idx[meet]] = FIGHTING
+
+        # Золото
+        lucky = rng.random(len(idx)) < 0.3
+        self.gold[idx[lucky]] += rng.integers(1, 21, size=int(lucky.sum())) * danger[lucky]
+
+    def _attack(self, idx, target):
+        rng = self.rng
+        weapon = self.equip_power[idx, S_WEAPON]
+        lo = self.a_lo[idx] + self.a_lo_w[idx] * weapon
+        hi = self.a_hi[idx] + self.a_hi_w[idx] * weapon
+        rogue = self.a_kind[idx] == ROGUE
+        sneak = rogue & self.stealth[idx]
+        s_lo, s_hi, s_lo_w, s_hi_w = STEALTH_PROFILE
+        lo = np.where(sneak, s_lo + s_lo_w * weapon, lo)
+        hi = np.where(sneak, s_hi + s_hi_w * weapon, hi)
+        damage = self._randint(lo, hi).astype(np.float64)
+
+        crit = rng.random(len(idx)) < (self.bonuses[idx, B_CRIT] + self.a_crit[idx]) / 100
+        damage = np.where(crit, damage * self.a_crit_mult[idx], damage)
+        berserk = self.a_kind[idx] == BERSERK
+        damage += np.where(berserk, (self.max_health[idx] - self.health[idx]) // 2, self.bonuses[idx, B_DAMAGE])
+
+        hidden = rng.random(len(idx)) < 0.5
+        self.stealth[idx[rogue]] = np.where(sneak[rogue], False, hidden[rogue])
+
+        stunned = self.a_stun[idx] & (self.status[idx, E_STUNNED] > 0)
+        damage[stunned] = 0
+        execute = (self.a_execute[idx] & (self.m_health[target] < self.m_max_health[target] * 0.3)
+                   & (rng.random(len(idx)) < 0.3))
+        hits = ~stunned & ~execute
+        dealt = _mitigate(damage[hits], 0, 0, self.m_status[target[hits], E_SHIELDED] > 0)
+        np.subtract.at(self.m_health, target[hits], dealt)
+        self.m_health[target[execute]] = 0
+
+        poison = self.a_poison[idx] & ~self.stealth[idx] & (rng.random(len(idx)) < 0.3) & hits
+        self.m_status[target[poison], E_POISONED] = 3
+
+    def _cast(self, idx, target):
+        rng = self.rng
+        slot = (rng.random(len(idx)) * self.spell_count[idx]).astype(np.int64)
+        spell = self.spells[idx, slot]
+
+        blocked = self.sp_stun_blocks[spell] & (self.status[idx, E_STUNNED] > 0)
+        paid = ~blocked & (self.mana[idx] >= self.sp_cost[spell])
+        self.mana[idx[paid]] -= self.sp_cost[spell[paid]]
+        idx, target, spell = idx[paid], target[paid], spell[paid]
+
+        # Промах по типу цели (only) тратит ману, но не дает ни урона, ни эффектов
+        kind = self.m_type[target]
+        hit = (self.sp_mask[spell] >> kind) & 1 == 1
+        idx, target, spell, kind = idx[hit], target[hit], spell[hit], kind[hit]
+        damage = (self.sp_damage[spell] + self.bonuses[idx, B_DAMAGE]).astype(np.float64)
+        damage[self.sp_damage[spell] == 0] = 0
+        shielded = self.m_status[target, E_SHIELDED] > 0
+        dealt = np.where(damage > 0, _mitigate(damage, 0, 0, shielded), 0)
+        undead = (kind == MONSTER_INDEX[MonsterType.UNDEAD]) & (self.sp_undead_mult[spell] > 0)
+        dealt = dealt + np.where(undead, _mitigate(damage * self.sp_undead_mult[spell], 0, 0, shielded), 0)
+        np.subtract.at(self.m_health, target, dealt)
+
+        heal = self.sp_heal[spell] > 0
+        healed = target[heal]
+        amount = self.sp_heal[spell[heal]] + self.bonuses[idx[heal], B_HP]
+        self.m_health[healed] = np.minimum(self.m_max_health[healed], self.m_health[healed] + amount)
+
+        for effects, durations in self.sp_status:
+            on = effects[spell] >= 0
+            self.m_status[target[on], effects[spell[on]]] = durations[spell[on]]
+        on_self = self.sp_self_status[spell] >= 0
+        self.status[idx[on_self], self.sp_self_status[spell[on_self]]] = self.sp_self_duration[spell[on_self]]
+
+    def _pick_up(self, finders, art):
+        """Векторная версия NPC.pick_up: у каждого героя не больше одной находки за ход"""
+        slot = self.art_slot[art]
+        power = self.art_power[art].astype(np.int64)
+
+        # Экипировка: более сильный предмет надевается, худший продается
+        eq = slot >= 0
+        f, a, sl, p = finders[eq], art[eq], slot[eq], power[eq]
+        worn = self.equip_item[f, sl]
+        better = (worn < 0) | (p > self.equip_power[f, sl])
+        self.gold[f[~better]] += p[~better] * SELL_PRICE
+        f, a, sl, p, old = f[better], a[better], sl[better], p[better], worn[better]
+        had = old >= 0
+        self.gold[f[had]] += self.equip_power[f[had], sl[had]] * SELL_PRICE
+        self.bonuses[f[had], self.art_bonus[old[had]]] -= self.equip_power[f[had], sl[had]]
+        self.bonuses[f, self.art_bonus[a]] += p
+        self.equip_item[f, sl] = a
+        self.equip_power[f, sl] = p
+
+        potion = self.art_potion[art]
+        self._store_potions(finders[potion], power[potion], art[potion])
+
+        # Прочие предметы - в сумку; находок мало, поэтому обычным циклом
+        rest = ~eq & ~potion
+        for i, a in zip(finders[rest].tolist(), art[rest].tolist()):
+            item = self.artifact_objects[a]
+            bag = self.bags[i].setdefault(item.type, [])
+            bag.append(a)
+            if len(bag) > BUCKET_CAPACITY:
+                weakest = min(range(len(bag)), key=lambda k: self.art_power[bag[k]])
+                self.gold[i] += int(self.art_power[bag[weakest]]) * SELL_PRICE
+                bag[weakest] = bag[-1]
+                bag.pop()
+
+    def _store_potions(self, f, power, items):
+        """Зелья героям f (без повторов), как Inventory.add: при переполнении продается самое слабое"""
+        slot = self.potions[f]
+        self.potion_power[f, slot] = power
+        self.potion_item[f, slot] = items
+        self.potions[f] += 1
+        full = f[self.potions[f] > BUCKET_CAPACITY]
+        if len(full):
+            count = self.potions[full]
+            filled = np.arange(self.potion_power.shape[1]) < count[:, None]
+            weakest = np.where(filled, self.potion_power[full], np.iinfo(np.int64).max).argmin(axis=1)
+            self.gold[full] += self._pop_potions(full, weakest) * SELL_PRICE
+
+    def _pop_potions(self, f, slot):
+        """Извлечение зелий как Inventory.pop: на место взятого встает последнее; возвращает силу"""
+        last = self.potions[f] - 1
+        power = self.potion_power[f, slot]
+        self.potion_power[f, slot] = self.potion_power[f, last]
+        self.potion_item[f, slot] = self.potion_item[f, last]
+        self.potions[f] = last
+        return power
+
+    def _fight(self, idx):
+        if not len(idx):
+            return
+        target = self.target[idx]
+        casting = (self.spell_count[idx] > 0) & (self.rng.random(len(idx)) < 0.5)
+
+        # Герои с общей целью бьют по очереди, как в объектном режиме: каждый,
+        # кто не добил монстра, получает ответный удар. Номер в очереди к своей
+        # цели - это раунд; в раунде у монстра не больше одного противника
+        order = np.argsort(target, kind="stable")
+        ordered = target[order]
+        first = np.concatenate(([True], ordered[1:] != ordered[:-1]))
+        position = np.arange(len(order))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = position - np.maximum.accumulate(np.where(first, position, 0))
+        for r in range(int(rank.max()) + 1):
+            turn = rank == r
+            self._fight_round(idx[turn], target[turn], casting[turn])
+
+    def _fight_round(self, idx, target, casting):
+        """Один удар каждого героя по своей цели; цели героев не повторяются"""
+        rng = self.rng
+        valid = self.m_health[target] > 0
+        self.state[idx[~valid]] = EXPLORING
+        self.target[idx[~valid]] = -1
+        idx, target, casting = idx[valid], target[valid], casting[valid]
+        if not len(idx):
+            return
+
+        self._cast(idx[casting], target[casting])
+        self._attack(idx[~casting], target[~casting])
+        self.m_health[target] = np.maximum(self.m_health[target], 0)
+        self.m_afflicted = np.union1d(self.m_afflicted, target)
+
+        dead = self.m_health[target] <= 0
+        self._victory(idx[dead], target[dead])
+
+        # Ответный удар монстра
+        idx, target = idx[~dead], target[~dead]
+        strike = rng.random(len(idx)) < 0.8
+        idx, target = idx[strike], target[strike]
+        if not len(idx):
+            return
+        damage = self.m_attack[target] + self._randint(0, self.m_power[target])
+        dealt = _mitigate(damage, self.equip_power[idx, S_ARMOR] , self.bonuses[idx, B_DEFENSE],
+                          self.status[idx, E_SHIELDED] > 0)
+        self.health[idx] = np.maximum(0, self.health[idx] - dealt)
+
+        kind = self.m_type[target]
+        for monster_type, attack in MONSTER_ATTACKS.items():
+            hit = idx[kind == MONSTER_INDEX[monster_type]]
+            if not attack.statuses or not len(hit):
+                continue
+            if attack.choose:
+                pick = (rng.random(len(hit)) * len(attack.statuses)).astype(np.int64)
+                for k, (effect, duration) in enumerate(attack.statuses):
+                    self.status[hit[pick == k], EFFECT_INDEX[effect]] = duration
+            else:
+                for effect, duration in attack.statuses:
+                    self.status[hit, EFFECT_INDEX[effect]] = duration
+
+        # Монстр, убивший героя, забирает половину его золота и получает опыт, как в NPC.fight
+        killed = self.health[idx] <= 0
+        self.state[idx[killed]] = DEAD
+        winners = target[killed]
+        self.m_gold[winners] += self.gold[idx[killed]] // 2
+        self._monster_exp(winners, rng.integers(15, 26, size=len(winners)))
+
+    def _monster_exp(self, m, amount):
+        """NPC.gain_exp для монстров; бонусов здоровья у них нет"""
+        self.m_exp[m] += amount
+        up = m[self.m_exp[m] >= 100 * self.m_level[m]]
+        self.m_level[up] += 1
+        self.m_max_health[up] += 20
+        self.m_health[up] = self.m_max_health[up]
+        self.m_exp[up] = 0
+
+    def _victory(self, idx, target):
+        """Победа: награду получает первый герой, остальные ищут новую цель"""
+        _, first = np.unique(target, return_index=True)
+        winners = idx[first]
+        won_from = target[first]
+        self._gain_exp(winners, self._randint(10, np.full(len(winners), 30)) * self.m_power[won_from] // 10)
+        self.gold[winners] += self.m_gold[won_from]
+        self.kills[winners] += 1
+        self.state[idx] = EXPLORING
+        self.target[idx] = -1
+
+    def _tick_effects(self):
+        """Срабатывание эффектов раз в ход, как StatusScheduler.tick()"""
+        idx = np.flatnonzero((self.state != DEAD) & self.status.any(axis=1))
+        self.health[idx], self.status[idx] = self._tick(
+            self.health[idx], self.max_health[idx], self.status[idx], np.ones(len(idx), dtype=np.int64),
+            self.equip_power[idx, S_ARMOR], self.bonuses[idx, B_DEFENSE],
+            self.bonuses[idx, B_REGEN], self.bonuses[idx, B_HP])
+        self.state[idx[self.health[idx] <= 0]] = DEAD
+
+        m = self.m_afflicted
+        m = m[self.m_alive[m] & (self.m_health[m] > 0)]
+        self.m_health[m], self.m_status[m] = self._tick(
+            self.m_health[m], self.m_max_health[m], self.m_status[m], np.ones(len(m), dtype=np.int64),
+            0, 0, 0, 0)
+        killed = m[self.m_health[m] <= 0]
+        self.m_afflicted = m[(self.m_health[m] > 0) & self.m_status[m].any(axis=1)]
+
+        # Жертву эффекта засчитывают первому герою, который с ней сражался
+        fighting = np.flatnonzero(self.state == FIGHTING)
+        target = self.target[fighting]
+        won = np.isin(target, killed)
+        self._victory(fighting[won], target[won])
+
+    def _rest(self, idx):
+        if not len(idx):
+            return
+        rng = self.rng
+        self._heal(idx, self._randint(5, np.full(len(idx), 15)) + self.bonuses[idx, B_REGEN])
+
+        # Выпивается случайное зелье, как в NPC.rest
+        drink = idx[(self.potions[idx] > 0) & (self.health[idx] < self.max_health[idx] * 0.5)]
+        slot = (rng.random(len(drink)) * self.potions[drink]).astype(np.int64)
+        self._heal(drink, self._pop_potions(drink, slot) * 5)
+
+        brew = idx[self.brews[idx] & (rng.random(len(idx)) < 0.5)]
+        self._store_potions(brew, rng.integers(5, 16, size=len(brew)), -1)
+
+        back = (self.health[idx] > self.max_health[idx] * 0.7) | (rng.random(len(idx)) < 0.5)
+        self.state[idx[back]] = EXPLORING
+
+    def simulate_turn(self):
+        self.turn_count += 1
+        rng = self.rng
+        active = np.flatnonzero(self.state != DEAD)
+        state = self.state[active]
+        self._explore(active[state == EXPLORING])
+        self._fight(active[state == FIGHTING])
+        self._rest(active[state == RESTING])
+
+        active = active[self.state[active] != DEAD]
+        tired = (self.health[active] < self.max_health[active] * 0.4) & (self.state[active] != FIGHTING)
+        self.state[active[tired]] = RESTING
+        switch = active[rng.random(len(active)) < 0.1]
+        state = self.state[switch]
+        self.state[switch[state == EXPLORING]] = RESTING
+        self.state[switch[state == RESTING]] = EXPLORING
+
+        self._tick_effects()
+        self._bury()
+
+    def _bury(self):
+        # Погибшие за ход уходят из живых; таймер идет с хода гибели, как в Location.bury()
+        died = np.flatnonzero(self.m_alive & (self.m_health <= 0))
+        self.m_alive[died] = False
+        self.m_respawn_at[died] = self.turn_count + self.respawn_delay[self.m_loc[died]]
+
+    def _catch_up(self, locs, periods):
+        """Векторная версия Location.update для локаций, куда пришли герои"""
+        turn = self.turn_count
+        self.updated_at[locs] += periods * REGEN_PERIOD
+        here = np.zeros(len(self.locations), dtype=bool)
+        here[locs] = True
+        slot = np.arange(len(self.m_loc)) - self.mon_start[self.m_loc]
+        exists = slot < self.mon_used[self.m_loc]
+        dead = exists & ~self.m_alive & here[self.m_loc]
+
+        # Раньше погибшие возвращаются первыми, пока живых меньше лимита
+        due = np.flatnonzero(dead & (self.m_respawn_at >= 0) & (self.m_respawn_at <= turn))
+        if len(due):
+            due = due[np.lexsort((self.m_respawn_at[due], self.m_loc[due]))]
+            loc = self.m_loc[due]
+            rank = np.arange(len(due)) - np.searchsorted(loc, loc, side="left")
+            live = np.bincount(self.m_loc[self.m_alive], minlength=len(self.locations))
+            back = due[rank < (self.monster_cap - live)[loc]]
+
+            power = self.m_power[back]
+            self.m_alive[back] = True
+            self.m_respawned[back] = True
+            self.m_max_health[back] = power * 2
+            self.m_health[back] = power * 2
+            self.m_status[back] = 0
+            self.m_level[back] = 1
+            self.m_exp[back] = 0
+            self.m_gold[back] = self.rng.integers(5, 21, size=len(back)) * power // 10
+
+        # Новые предметы и монстры по бюджету; объекты создает сама локация
+        self.artifact_credit[locs] += self.artifact_budget[locs] * periods
+        self.monster_credit[locs] += self.monster_budget[locs] * periods
+        new_artifacts = []
+        for l in locs[self.artifact_credit[locs] >= 1].tolist():
+            location = self.locations[l]
+            while self.artifact_credit[l] >= 1 and self.art_top[l] < self.artifact_cap[l]:
+                new_artifacts.append(location.make_artifact())
+                self.art_stack[self.art_start[l] + self.art_top[l]] = len(self.artifact_objects) + len(new_artifacts) - 1
+                self.art_top[l] += 1
+                self.artifact_credit[l] -= 1
+        if new_artifacts:
+            self.artifact_objects.extend(new_artifacts)
+            self._add_artifact_columns(new_artifacts)
+
+        for l in locs[self.monster_credit[locs] >= 1].tolist():
+            location = self.locations[l]
+            while self.monster_credit[l] >= 1 and self.mon_used[l] < self.monster_cap[l]:
+                monster = location.make_monster()
+                i = self.mon_start[l] + self.mon_used[l]
+                self.monster_objects[i] = monster
+                self.monster_ids[id(monster)] = i
+                self._load_monster(i, monster)
+                self.mon_used[l] += 1
+                self.monster_credit[l] -= 1
+        self.artifact_credit[locs] = np.minimum(self.artifact_credit[locs], 1.0)
+        self.monster_credit[locs] = np.minimum(self.monster_credit[locs], 1.0)
+
+    def get_stats(self):
+        alive = self.state != DEAD
+        return {
+            "alive_npcs": int(alive.sum()),
+            "dead_npcs": int((~alive).sum()),
+            "alive_monsters": int(self.m_alive.sum()),
+            "dead_monsters": int(self.mon_used.sum() - self.m_alive.sum()),
+            "locations": len(self.locations),
+            "turn_count": self.turn_count
+        }
+
+    # ---------- Возврат в объектную модель ----------
+    def write_back(self):
+        """Перенос состояния столбцов обратно в объекты GameWorld"""
+        def number(value):
+            value = float(value)
+            return int(value) if value.is_integer() else value
+
+        for i, npc in enumerate(self.npcs):
+            npc.health = number(self.health[i])
+            npc.max_health = number(self.max_health[i])
+            npc.level = int(self.level[i])
+            npc.experience = int(self.experience[i])
+            npc.gold = int(self.gold[i])
+            npc.kills = int(self.kills[i])
+            npc.set_statuses({EFFECTS[e]: int(d) for e, d in enumerate(self.status[i]) if d > 0})
+            if hasattr(npc, "mana"):
+                npc.mana = number(self.mana[i])
+            if hasattr(npc, "stealth"):
+                npc.stealth = bool(self.stealth[i])
+            target = int(self.target[i])
+            npc.target = self.monster_objects[target] if target >= 0 else None
+            npc.is_alive = bool(self.state[i] != DEAD)
+            npc.state = STATES[self.state[i]]
+            loc = int(self.loc[i])
+            npc.move_to(self.locations[loc] if loc >= 0 else None)
+            if not npc.is_alive and npc.current_location is not None:
+                npc.current_location.leave(npc)
+
+            for s, slot in enumerate(SLOTS):
+                a = int(self.equip_item[i, s])
+                npc.equipment[slot] = self.artifact_objects[a] if a >= 0 else None
+            npc.refresh_stats()
+
+            # Зелья: найденные - своими объектами, сваренные создаются заново
+            inventory = Inventory(npc.inventory.capacity)
+            for artifact_type, items in self.bags[i].items():
+                inventory.buckets[artifact_type] = [self.artifact_objects[a] for a in items]
+            count = int(self.potions[i])
+            potions = [
+                self.artifact_objects[a] if a >= 0 else Artifact("Зелье здоровья", ArtifactType.POTION, p, "HP")
+                for a, p in zip(self.potion_item[i, :count].tolist(), self.potion_power[i, :count].tolist())
+            ]
+            if potions:
+                inventory.buckets[ArtifactType.POTION] = potions
+            npc.inventory = inventory
+
+        for i, monster in enumerate(self.monster_objects):
+            if monster is None:
+                continue
+            if self.m_alive[i] and (self.m_respawned[i] or not monster.is_alive):
+                monster.respawn()
+            elif not self.m_alive[i] and monster.is_alive:
+                monster.die()
+            monster.health = number(self.m_health[i])
+            monster.max_health = number(self.m_max_health[i])
+            monster.gold = int(self.m_gold[i])
+            monster.level = int(self.m_level[i])
+            monster.experience = int(self.m_exp[i])
+            monster.respawn_at = int(self.m_respawn_at[i]) if self.m_respawn_at[i] >= 0 else None
+            statuses = {EFFECTS[e]: int(d) for e, d in enumerate(self.m_status[i]) if d > 0}
+            if statuses:
+                self.world.effects.bind(monster)
+            monster.set_statuses(statuses)
+        self.m_respawned[:] = False
+
+        # Пулы локаций собираются заново по итоговому состоянию
+        # Погибшие без таймера (убитые вне хода мира) идут в конец очереди
+        for i, loc in enumerate(self.locations):
+            start = int(self.mon_start[i])
+            pool = self.monster_objects[start:start + int(self.mon_used[i])]
+            loc.monsters = []
+            for monster in pool:
+                if monster.is_alive:
+                    loc.add_monster(monster)
+            loc.dead_monsters = deque(sorted(
+                (m for m in pool if not m.is_alive),
+                key=lambda m: (m.respawn_at is None, m.respawn_at or 0)))
+
+            start, top = int(self.art_start[i]), int(self.art_top[i])
+            loc.artifacts = [self.artifact_objects[a] for a in self.art_stack[start:start + top].tolist()]
+            loc.updated_at = int(self.updated_at[i])
+            loc.artifact_credit = float(self.artifact_credit[i])
+            loc.monster_credit = float(self.monster_credit[i])
+
+        self.world.turn_count = self.turn_count